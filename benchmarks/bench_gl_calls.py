@@ -0,0 +1,159 @@
+"""
+Cost of the OpenGL calls of the per frame paths through PyOpenGL and through the entry points resolved by GL_CALLS
+
+Run from the repository root: python -m benchmarks.bench_gl_calls [--calls 100000] [--repeats 5]
+Rendering goes through the headless context, set PYOPENGL_PLATFORM to pick its backend.
+"""
+from controller.headless_context import HeadlessContext
+
+import argparse
+import time
+
+import numpy as np
+
+from OpenGL.GL import *
+from OpenGL.GL.shaders import compileProgram, compileShader
+
+from model.gl_calls import GL_CALLS
+from settings import GL_DEBUG
+from view.framebuffer import Framebuffer
+
+VERTEX_SOURCE = """
+#version 330 core
+layout (location = 0) in vec3 position;
+uniform mat4 model;
+uniform vec3 tint;
+uniform int layer;
+out vec3 color;
+void main() {
+    gl_Position = model * vec4(position, 1.0);
+    color = tint * float(layer);
+}
+"""
+
+FRAGMENT_SOURCE = """
+#version 330 core
+in vec3 color;
+out vec4 fragment;
+void main() {
+    fragment = vec4(color, 1.0);
+}
+"""
+
+
+def per_call(function, calls: int, repeats: int) -> float:
+    """
+    Returns the smallest duration of a call over several runs, in nanoseconds
+    :param function: Function making the calls, taking their number
+    :param calls: Number of calls of each run
+    :param repeats: Number of timed runs
+    """
+    function(calls // 10)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(calls)
+        glFinish()
+        best = min(best, time.perf_counter() - start)
+    return 1e9 * best / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    context = HeadlessContext(64, 64)
+    framebuffer = Framebuffer(64, 64)
+    framebuffer.use()
+    print(f"{glGetString(GL_RENDERER).decode()}, OpenGL {glGetString(GL_VERSION).decode()}, GL_DEBUG={GL_DEBUG}")
+
+    program = compileProgram(compileShader(VERTEX_SOURCE, GL_VERTEX_SHADER),
+                             compileShader(FRAGMENT_SOURCE, GL_FRAGMENT_SHADER))
+    glUseProgram(program)
+    model = glGetUniformLocation(program, 'model')
+    tint = glGetUniformLocation(program, 'tint')
+    layer = glGetUniformLocation(program, 'layer')
+
+    # Draws of no index still go through the validation of the draw state, without rasterizing anything
+    vao = glGenVertexArrays(1)
+    glBindVertexArray(vao)
+    ebo = glGenBuffers(1)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ebo)
+    glBufferData(GL_ELEMENT_ARRAY_BUFFER, 12, np.arange(3, dtype=np.uint32), GL_STATIC_DRAW)
+
+    # Transforms of as many items as the calls, as gathered by a draw run, uploaded from the address of each row
+    rows = 1024
+    models = np.tile(np.eye(4, dtype=np.float32), (rows, 1, 1))
+    colors = np.ones((rows, 3), dtype=np.float32)
+    model_address = models.ctypes.data
+    color_address = colors.ctypes.data
+
+    def pyopengl_matrix(calls: int) -> None:
+        for i in range(calls):
+            glUniformMatrix4fv(model, 1, GL_FALSE, models[i % rows])
+
+    def raw_matrix(calls: int) -> None:
+        for i in range(calls):
+            GL_CALLS.glUniformMatrix4fv(model, 1, GL_FALSE, model_address + 64 * (i % rows))
+
+    def pyopengl_vector(calls: int) -> None:
+        for i in range(calls):
+            glUniform3fv(tint, 1, colors[i % rows])
+
+    def raw_vector(calls: int) -> None:
+        for i in range(calls):
+            GL_CALLS.glUniform3fv(tint, 1, color_address + 12 * (i % rows))
+
+    def pyopengl_int(calls: int) -> None:
+        for i in range(calls):
+            glUniform1i(layer, i & 1)
+
+    def raw_int(calls: int) -> None:
+        for i in range(calls):
+            GL_CALLS.glUniform1i(layer, i & 1)
+
+    def pyopengl_bind(calls: int) -> None:
+        for i in range(calls):
+            glBindVertexArray(vao)
+
+    def raw_bind(calls: int) -> None:
+        for i in range(calls):
+            GL_CALLS.glBindVertexArray(vao)
+
+    def pyopengl_draw(calls: int) -> None:
+        for _ in range(calls):
+            glDrawElements(GL_TRIANGLES, 0, GL_UNSIGNED_INT, None)
+
+    def raw_draw(calls: int) -> None:
+        for _ in range(calls):
+            GL_CALLS.glDrawElements(GL_TRIANGLES, 0, GL_UNSIGNED_INT, None)
+
+    def empty(calls: int) -> None:
+        for i in range(calls):
+            pass
+
+    loop = per_call(empty, args.calls, args.repeats)
+    print(f"\nper call, without the {loop:.0f} ns of the loop")
+    print(f"{'call':24s} {'PyOpenGL':>10s} {'GL_CALLS':>10s} {'speedup':>8s}")
+    for name, pyopengl, raw in (
+            ('glUniformMatrix4fv', pyopengl_matrix, raw_matrix),
+            ('glUniform3fv', pyopengl_vector, raw_vector),
+            ('glUniform1i', pyopengl_int, raw_int),
+            ('glBindVertexArray', pyopengl_bind, raw_bind),
+            ('glDrawElements', pyopengl_draw, raw_draw),
+    ):
+        before = per_call(pyopengl, args.calls, args.repeats) - loop
+        after = per_call(raw, args.calls, args.repeats) - loop
+        print(f"{name:24s} {before:8.0f} ns {after:8.0f} ns {before / after:7.1f}x")
+
+    glDeleteBuffers(1, (ebo,))
+    glDeleteVertexArrays(1, (vao,))
+    glDeleteProgram(program)
+    framebuffer.destroy()
+    context.destroy()
+
+
+if __name__ == '__main__':
+    main()
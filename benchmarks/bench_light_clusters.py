@@ -0,0 +1,51 @@
+"""
+Per frame cost of binning point lights in the clusters of the view frustum
+
+Run from the repository root: python -m benchmarks.bench_light_clusters [--lights 500 1000 5000] [--radius 1.0]
+"""
+import argparse
+import time
+
+import numpy as np
+import pyrr
+
+from model.cluster_grid import ClusterGrid
+from settings import CLUSTER_GRID, FAR, FOVY, HEIGHT, NEAR, WIDTH
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lights', type=int, nargs='+', default=[100, 500, 1000, 5000, 20000])
+    parser.add_argument('--radius', type=float, default=1.0, help="Largest influence radius")
+    parser.add_argument('--frames', type=int, default=50)
+    args = parser.parse_args()
+
+    projection = pyrr.matrix44.create_perspective_projection(FOVY, WIDTH / HEIGHT, NEAR, FAR, dtype=np.float32)
+    view = pyrr.matrix44.create_look_at(
+        eye=np.array([0, 0, 0], dtype=np.float32),
+        target=np.array([1, 0, 0], dtype=np.float32),
+        up=np.array([0, 0, 1], dtype=np.float32),
+        dtype=np.float32
+    )
+    grid = ClusterGrid(CLUSTER_GRID, NEAR, FAR, projection)
+    rng = np.random.default_rng(0)
+
+    print(f"grid {CLUSTER_GRID}, {np.prod(CLUSTER_GRID)} clusters")
+    for count in args.lights:
+        # Lights spread in a box around the view frustum
+        positions = rng.uniform((-1, -FAR / 2, -FAR / 2), (FAR, FAR / 2, FAR / 2), (count, 3)).astype(np.float32)
+        radii = rng.uniform(args.radius / 4, args.radius, count).astype(np.float32)
+
+        grid.assign(positions, radii, view)
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            ranges, lights = grid.assign(positions, radii, view)
+        elapsed = (time.perf_counter() - start) / args.frames
+
+        used = ranges[:, 1]
+        print(f"{count:6d} lights: {elapsed * 1e3:7.2f} ms/frame  {len(lights):8d} pairs  "
+              f"{used.mean():6.1f} lights/cluster on average, {used.max()} at most")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Throughput of the bulk OBJ loader against the previous line by line loader
+
+Run from the repository root: python -m benchmarks.bench_obj_loader [--segments 512] [--rings 256]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from model.obj_loader import ObjLoader
+
+
+def write_sphere(filepath: str, segments: int, rings: int) -> None:
+    """
+    Write a UV sphere with shared positions, texture coordinates and normals
+    :param filepath: Path of the OBJ file to write
+    :param segments: Number of segments around the sphere
+    :param rings: Number of rings from pole to pole
+    """
+    theta, phi = np.meshgrid(np.linspace(0, 2 * np.pi, segments + 1), np.linspace(0, np.pi, rings + 1))
+    positions = np.stack((np.sin(phi) * np.cos(theta), np.sin(phi) * np.sin(theta), np.cos(phi)), axis=-1)
+    positions = positions.reshape(-1, 3)
+    tex_coords = np.stack((theta / (2 * np.pi), phi / np.pi), axis=-1).reshape(-1, 2)
+
+    a = (np.arange(rings)[:, None] * (segments + 1) + np.arange(segments)[None, :]).reshape(-1) + 1
+    b, c = a + 1, a + segments + 1
+    d = c + 1
+    triangles = np.concatenate((np.stack((a, c, b), axis=1), np.stack((b, c, d), axis=1)))
+
+    with open(filepath, 'w') as f:
+        np.savetxt(f, positions, fmt='v %.6f %.6f %.6f')
+        np.savetxt(f, tex_coords, fmt='vt %.6f %.6f')
+        np.savetxt(f, positions, fmt='vn %.6f %.6f %.6f')
+        np.savetxt(f, np.repeat(triangles, 3, axis=1), fmt='f %d/%d/%d %d/%d/%d %d/%d/%d')
+
+
+def check_mixed_layouts(directory: str) -> bool:
+    """
+    Returns whether faces mixing the v, v/vt, v//vn and v/vt/vn layouts and relative indices load as the same
+    faces written with every index, missing texture coordinates being (0, 0) and missing normals flat
+    :param directory: Directory where the two OBJ files are written
+    """
+    records = 'v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nvt 0 0\nvt 1 0\nvt 1 1\nvt 0 1\n'
+    mixed = records + ('vn 0 0 1\n'
+                       'f 1 2 3\n'
+                       'f 1/1 3/3 4/4\n'
+                       'f 1//1 2//1 4//1\n'
+                       'f 2/2/1 3/3/1 4/4/1\n'
+                       'f -4/-4 -2/-2 -1/-1 # relative\n')
+    full = records + ('vt 0 0\nvn 0 0 1\n'
+                      'f 1/5/1 2/5/1 3/5/1\n'
+                      'f 1/1/1 3/3/1 4/4/1\n'
+                      'f 1/5/1 2/5/1 4/5/1\n'
+                      'f 2/2/1 3/3/1 4/4/1\n'
+                      'f 1/1/1 3/3/1 4/4/1\n')
+
+    triangles = []
+    for name, text in (('mixed.obj', mixed), ('full.obj', full)):
+        filepath = os.path.join(directory, name)
+        with open(filepath, 'w') as f:
+            f.write(text)
+        vertices, indices = ObjLoader(filepath).load()
+        triangles.append(vertices[indices])
+
+    return np.array_equal(*triangles)
+
+
+def legacy_load_mesh(filepath: str) -> np.ndarray:
+    """
+    Returns the non indexed vertices of the mesh, read one line at a time as the original loader did
+    :param filepath: Path to the file
+    """
+    v, vt, vn = [], [], []
+    vertices = []
+    with open(filepath, 'r') as f:
+        line = f.readline()
+        while line:
+            words = line.split(' ')
+            if words[0] == 'v':
+                v.append([float(w) for w in words[1:]])
+            if words[0] == 'vt':
+                vt.append([float(w) for w in words[1:]])
+            if words[0] == 'vn':
+                vn.append([float(w) for w in words[1:]])
+            if words[0] == 'f':
+                for w in words[1:]:
+                    idx = [int(e) - 1 for e in w.split('/')]
+                    vertices.extend(v[idx[0]])
+                    vertices.extend(vt[idx[1]])
+                    vertices.extend(vn[idx[2]])
+            line = f.readline()
+
+    return np.array(vertices, dtype=np.float32)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--segments', type=int, default=512)
+    parser.add_argument('--rings', type=int, default=256)
+    parser.add_argument('--skip-legacy', action='store_true', help="Only time the bulk loader")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, 'sphere.obj')
+        write_sphere(filepath, args.segments, args.rings)
+        size = os.path.getsize(filepath) / 2 ** 20
+        faces = 2 * args.segments * args.rings
+        print(f"sphere.obj: {size:.1f} MiB, {faces} faces")
+        print(f"mixed face layouts load as the full layout: {check_mixed_layouts(directory)}")
+
+        start = time.perf_counter()
+        vertices, indices = ObjLoader(filepath).load()
+        bulk = time.perf_counter() - start
+        print(f"bulk loader:   {bulk:8.3f} s  {size / bulk:8.1f} MiB/s  "
+              f"{len(vertices)} unique vertices, {len(indices)} indices")
+
+        if args.skip_legacy:
+            return None
+
+        start = time.perf_counter()
+        legacy = legacy_load_mesh(filepath)
+        elapsed = time.perf_counter() - start
+        print(f"legacy loader: {elapsed:8.3f} s  {size / elapsed:8.1f} MiB/s  "
+              f"{len(legacy) // 8} vertices")
+        print(f"speedup: {elapsed / bulk:.1f}x, same triangles: "
+              f"{np.array_equal(vertices[indices].reshape(-1), legacy)}")
+
+
+if __name__ == '__main__':
+    main()
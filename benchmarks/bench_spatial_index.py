@@ -0,0 +1,102 @@
+"""
+Insert, update, remove and query costs of the spatial index against linear scans
+
+Run from the repository root: python -m benchmarks.bench_spatial_index [--entities 100000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pyrr
+
+from model.frustum import Frustum
+from model.spatial_index import SpatialIndex
+from settings import FAR, FOVY, HEIGHT, NEAR, SPATIAL_INDEX_MARGIN, WIDTH
+
+
+def timed(label: str, count: int, function, *args) -> object:
+    """
+    Run a function, print the time it took per operation and returns its result
+    :param label: Name of the operation
+    :param count: Number of operations done by the function
+    :param function: Function to run
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:32s} {elapsed * 1e3:9.2f} ms  {elapsed / count * 1e6:9.2f} us/op  {count / elapsed:11.0f} op/s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entities', type=int, default=100000)
+    parser.add_argument('--extent', type=float, default=500.0, help="Size of the cube the entities are spread in")
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    count = args.entities
+    centers = rng.uniform(-args.extent / 2, args.extent / 2, (count, 3)).astype(np.float32)
+    radii = rng.uniform(0.5, 2.0, (count, 1)).astype(np.float32)
+    data = np.arange(count)
+
+    index = SpatialIndex(SPATIAL_INDEX_MARGIN)
+    timed("build", count, index.build, centers - radii, centers + radii, data)
+    print(f"tree height {index.height[index.root]}")
+
+    index = SpatialIndex(SPATIAL_INDEX_MARGIN)
+
+    def insert_all() -> np.ndarray:
+        return np.array([index.insert(centers[i] - radii[i], centers[i] + radii[i], i) for i in range(count)])
+
+    proxies = timed("insert one by one", count, insert_all)
+    print(f"tree height {index.height[index.root]}")
+
+    # Small moves stay in the fattened boxes, large moves take the entities out of them
+    for label, step in (("update, moves under the margin", SPATIAL_INDEX_MARGIN / 4),
+                        ("update, 10% moved by 5 units", None)):
+        if step is None:
+            moved = rng.random(count) < 0.1
+            offsets = np.where(moved[:, None], rng.normal(0, 5, (count, 3)), 0.0)
+        else:
+            offsets = rng.uniform(-step, step, (count, 3))
+        centers += offsets.astype(np.float32)
+        moved = timed(label, count, index.update, proxies, centers - radii, centers + radii)
+        print(f"{'':32s} {moved} boxes moved in the tree")
+
+    removed = rng.choice(count, count // 10, replace=False)
+    timed("remove 10%", len(removed), lambda: [index.remove(int(proxies[i])) for i in removed])
+    alive = np.ones(count, dtype=bool)
+    alive[removed] = False
+    live_centers, live_radii = centers[alive], radii[alive, 0]
+
+    projection = pyrr.matrix44.create_perspective_projection(FOVY, WIDTH / HEIGHT, NEAR, FAR, dtype=np.float32)
+    eyes = rng.uniform(-args.extent / 2, args.extent / 2, (args.queries, 3)).astype(np.float32)
+    targets = eyes + rng.normal(0, 1, (args.queries, 3)).astype(np.float32)
+    frustums = [
+        Frustum(pyrr.matrix44.create_look_at(eye, target, np.array([0, 0, 1], dtype=np.float32),
+                                             dtype=np.float32) @ projection)
+        for eye, target in zip(eyes, targets)
+    ]
+    directions = targets - eyes
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+
+    print(f"\n{args.queries} queries on {int(alive.sum())} entities, far plane at {FAR}")
+    queries = (
+        ("frustum", lambda i: index.query_frustum(frustums[i].planes),
+         lambda i: np.flatnonzero(frustums[i].intersects_spheres(live_centers, live_radii))),
+        ("radius 10", lambda i: index.query_sphere(eyes[i], 10.0),
+         lambda i: np.flatnonzero(np.linalg.norm(live_centers - eyes[i], axis=1) <= 10.0 + live_radii)),
+        ("ray 100", lambda i: index.ray_cast(eyes[i], directions[i], 100.0)[0],
+         None),
+    )
+    for name, query, scan in queries:
+        found = timed(f"{name}: spatial index", args.queries, lambda: [len(query(i)) for i in range(args.queries)])
+        print(f"{'':32s} {np.mean(found):.1f} results on average")
+        if scan is not None:
+            timed(f"{name}: linear scan", args.queries, lambda: [len(scan(i)) for i in range(args.queries)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Benchmark suite of the scene update, the draw submission and the asset loading at several scales.
+Results are written to a JSON file, and compared against a baseline file when one is given.
+
+Run from the repository root: python -m benchmarks.bench_suite [--scales 100 1000 10000] [--output bench.json]
+                              [--baseline baseline.json] [--threshold 0.1]
+Rendering goes through the headless context, set PYOPENGL_PLATFORM to pick its backend.
+"""
+from controller.headless_context import HeadlessContext
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from platform import machine, python_version
+
+import numpy as np
+
+from OpenGL.GL import *
+from PIL import Image
+
+from benchmarks.bench_obj_loader import write_sphere
+from benchmarks.synthetic_scene import populate_scene
+from model.material import Material
+from model.obj_mesh import ObjMesh
+from model.scene import Scene
+from model.texture_manager import TextureManager
+from settings import HEIGHT, TEXTURE_BUDGET, WIDTH
+from view.framebuffer import Framebuffer
+from view.graphics_engine import GraphicsEngine
+
+
+def measure(function, repeats: int, warmup: int = 2) -> dict[str, float]:
+    """
+    Returns statistics of the duration of a function, in milliseconds
+    :param function: Function to time, called without arguments
+    :param repeats: Number of timed calls
+    :param warmup: Number of calls before timing
+    """
+    for _ in range(warmup):
+        function()
+
+    durations = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations[i] = time.perf_counter() - start
+
+    return describe(1e3 * durations)
+
+
+def describe(durations: np.ndarray) -> dict[str, float]:
+    """
+    Returns the median, 95th percentile and minimum of durations
+    :param durations: Durations in milliseconds
+    """
+    return {
+        'median_ms': float(np.median(durations)),
+        'p95_ms': float(np.percentile(durations, 95)),
+        'min_ms': float(np.min(durations)),
+    }
+
+
+def bench_scene(engine: GraphicsEngine, scales: list[int], frames: int) -> dict[str, dict[str, float]]:
+    """
+    Time the scene update and the rendering of synthetic scenes,
+    each scale has that many cubes and billboards and a tenth as many lights
+    :param engine: Engine drawing the scenes
+    :param scales: Number of cubes of each scene
+    :param frames: Number of timed frames
+    """
+    results = {}
+    for scale in scales:
+        lights = max(1, scale // 10)
+        label = f'cubes={scale},billboards={scale},lights={lights}'
+        scene = populate_scene(Scene(engine.get_bounding_radii()), scale, scale, lights)
+
+        results[f'scene_update[{label}]'] = measure(lambda: scene.update(1.0), frames)
+
+        for _ in range(2):
+            engine.render(scene)
+            glFinish()
+
+        # Submission is the time spent in render, the GPU or the software rasterizer works until the finish
+        submissions = np.empty(frames)
+        durations = np.empty(frames)
+        for frame in range(frames):
+            start = time.perf_counter()
+            engine.render(scene)
+            submissions[frame] = time.perf_counter() - start
+            glFinish()
+            durations[frame] = time.perf_counter() - start
+
+        results[f'render[{label}]'] = describe(1e3 * durations)
+        results[f'render_submission[{label}]'] = describe(1e3 * submissions)
+        print(f"{label}: drawn {engine.drawn}, culled {engine.culled}")
+
+    return results
+
+
+def bench_obj_parse(sizes: list[int], repeats: int) -> dict[str, dict[str, float]]:
+    """
+    Time the parsing of UV spheres, the mesh cache is not involved
+    :param sizes: Number of segments of each sphere, it has half as many rings
+    :param repeats: Number of timed parses
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for segments in sizes:
+            filepath = os.path.join(directory, f'sphere_{segments}.obj')
+            write_sphere(filepath, segments, segments // 2)
+            size = os.path.getsize(filepath) / 2 ** 20
+
+            stats = measure(lambda: ObjMesh.load_mesh(filepath), repeats, warmup=1)
+            stats['mib_per_s'] = size / (stats['median_ms'] / 1e3)
+            results[f'obj_parse[faces={segments * segments}]'] = stats
+
+    return results
+
+
+def bench_material_load(sizes: list[int], repeats: int) -> dict[str, dict[str, float]]:
+    """
+    Time the decoding and upload of images by a material, with a new texture manager each time
+    :param sizes: Width and height of each image
+    :param repeats: Number of timed loads
+    """
+    results = {}
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            filepath = os.path.join(directory, f'noise_{size}.png')
+            Image.fromarray(rng.integers(0, 256, (size, size, 4), dtype=np.uint8)).save(filepath)
+
+            def load() -> None:
+                material = Material(filepath, TextureManager(TEXTURE_BUDGET))
+                glFinish()
+                material.destroy()
+
+            results[f'material_load[size={size}]'] = measure(load, repeats, warmup=1)
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Print the change of every benchmark against a baseline, and returns the names of the regressions
+    :param results: Results of this run
+    :param baseline: Results of the baseline run
+    :param threshold: Relative slow down of the median past which a benchmark is a regression
+    """
+    regressions = []
+    print(f"\n{'benchmark':64s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for name, stats in results.items():
+        if name not in baseline:
+            print(f"{name:64s} {'':>10s} {stats['median_ms']:10.3f} {'new':>8s}")
+            continue
+
+        before = baseline[name]['median_ms']
+        change = stats['median_ms'] / before - 1.0 if before > 0 else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:64s} {before:10.3f} {stats['median_ms']:10.3f} {100 * change:+7.1f}%{flag}")
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--frames', type=int, default=10)
+    parser.add_argument('--obj-segments', type=int, nargs='+', default=[64, 256, 512])
+    parser.add_argument('--texture-sizes', type=int, nargs='+', default=[256, 1024, 2048])
+    parser.add_argument('--repeats', type=int, default=5, help="Timed runs of the asset loading benchmarks")
+    parser.add_argument('--output', default='bench.json', help="JSON file the results are written to")
+    parser.add_argument('--baseline', default=None, help="JSON file written by an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Relative slow down flagged as a regression")
+    args = parser.parse_args()
+
+    context = HeadlessContext(WIDTH, HEIGHT)
+    framebuffer = Framebuffer(WIDTH, HEIGHT)
+    framebuffer.use()
+    engine = GraphicsEngine()
+    engine.wait_for_shaders()
+
+    environment = {
+        'python': python_version(),
+        'numpy': np.__version__,
+        'machine': machine(),
+        'renderer': glGetString(GL_RENDERER).decode(),
+        'version': glGetString(GL_VERSION).decode(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    print(f"{environment['renderer']}, OpenGL {environment['version']}")
+
+    results = {}
+    results.update(bench_scene(engine, args.scales, args.frames))
+    results.update(bench_obj_parse(args.obj_segments, args.repeats))
+    results.update(bench_material_load(args.texture_sizes, args.repeats))
+
+    engine.quit()
+    framebuffer.destroy()
+    context.destroy()
+
+    print(f"\n{'benchmark':64s} {'median':>10s} {'p95':>10s} {'min':>10s}")
+    for name, stats in results.items():
+        print(f"{name:64s} {stats['median_ms']:10.3f} {stats['p95_ms']:10.3f} {stats['min_ms']:10.3f}")
+
+    with open(args.output, 'w') as file:
+        json.dump({'environment': environment, 'results': results}, file, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline is None:
+        return None
+
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)
+    if baseline['environment']['renderer'] != environment['renderer']:
+        print(f"warning: the baseline was measured on {baseline['environment']['renderer']}")
+
+    regressions = compare(results, baseline['results'], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regressions past {100 * args.threshold:.0f}%")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Synthetic scenes of any size for the benchmarks, the same seed always gives the same scene
+"""
+import numpy as np
+
+from model.billboard import BillBoard
+from model.cube import Cube
+from model.pointlight import PointLight
+from model.scene import Scene
+from settings import ENTITY_TYPE, FAR
+
+
+def populate_scene(scene: Scene, cubes: int, billboards: int, lights: int, seed: int = 0,
+                   extent: float = FAR) -> Scene:
+    """
+    Add random cubes, billboards and point lights to a scene, spread in a box in front of the player
+    :param scene: Scene to fill
+    :param cubes: Number of cubes
+    :param billboards: Number of medkit billboards
+    :param lights: Number of point lights
+    :param seed: Seed of the random generator
+    :param extent: Size of the box the entities are spread in
+    """
+    rng = np.random.default_rng(seed)
+    lower = np.array([0.0, -extent / 2, -extent / 4], dtype=np.float32)
+    upper = np.array([extent, extent / 2, extent / 4], dtype=np.float32)
+
+    def positions(count: int) -> np.ndarray:
+        return rng.uniform(lower, upper, (count, 3)).astype(np.float32)
+
+    store = scene.transforms[ENTITY_TYPE['CUBE']]
+    eulers = np.zeros((cubes, 3), dtype=np.float32)
+    eulers[:, 1:] = rng.uniform(0, 360, (cubes, 2))
+    scene.entities[ENTITY_TYPE['CUBE']].extend(
+        Cube(position, rotation, store=store) for position, rotation in zip(positions(cubes), eulers)
+    )
+
+    store = scene.transforms[ENTITY_TYPE['MEDKIT']]
+    scene.entities[ENTITY_TYPE['MEDKIT']].extend(
+        BillBoard(position, store=store) for position in positions(billboards)
+    )
+
+    store = scene.transforms[ENTITY_TYPE['POINTLIGHT']]
+    colors = rng.uniform(0.2, 1.0, (lights, 3)).astype(np.float32)
+    strengths = rng.uniform(0.005, 0.05, lights)
+    scene.lights.extend(
+        PointLight(position, color, float(strength), store=store)
+        for position, color, strength in zip(positions(lights), colors, strengths)
+    )
+
+    return scene
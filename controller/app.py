@@ -1,3 +1,5 @@
+import time
+
 import pyrr
 
 import glfw
@@ -7,6 +9,8 @@ from OpenGL.GL import *
 
 from settings import *
 from view.graphics_engine import GraphicsEngine
+from model.gl_state import GL_STATE
+from model.profiler import Profiler
 from model.scene import Scene
 
 
@@ -14,7 +18,8 @@ class App:
     """
     Controller class
     """
-    __slots__ = ('window', 'renderer', 'scene', 'last_time', 'current_time', 'fps', 'frame_time', '_keys')
+    __slots__ = ('window', 'renderer', 'scene', 'profiler', 'last_time', 'current_time', 'fps', 'frame_time',
+                 'previous_time', 'accumulator', '_keys', '_mouse')
 
     def __init__(self):
         """
@@ -38,11 +43,13 @@ class App:
         glfw.window_hint(GLFW_CONSTANTS.GLFW_CONTEXT_VERSION_MINOR, 3)
         glfw.window_hint(GLFW_CONSTANTS.GLFW_OPENGL_PROFILE, GLFW_CONSTANTS.GLFW_OPENGL_CORE_PROFILE)
         glfw.window_hint(GLFW_CONSTANTS.GLFW_OPENGL_FORWARD_COMPAT, GLFW_CONSTANTS.GLFW_TRUE)
-        glfw.window_hint(GLFW_CONSTANTS.GLFW_DOUBLEBUFFER, GL_FALSE)
+        glfw.window_hint(GLFW_CONSTANTS.GLFW_DOUBLEBUFFER, GLFW_CONSTANTS.GLFW_TRUE)
 
         # Create the window
         self.window = glfw.create_window(WIDTH, HEIGHT, TITLE, None, None)
         glfw.make_context_current(self.window)
+        GL_STATE.invalidate()
+        glfw.swap_interval(SWAP_INTERVAL)
 
     def _set_up_timer(self) -> None:
         """
@@ -66,6 +73,9 @@ class App:
         self._keys = {}
         glfw.set_key_callback(self.window, self._key_callback)
 
+        # Rotation of the mouse movements not applied yet, the next simulation step applies it
+        self._mouse = np.zeros(3, dtype=np.float32)
+
     def _key_callback(self, window, key, scancode, action, mode) -> None:
         """
         Handle key events
@@ -89,9 +99,11 @@ class App:
         """
         Create assets needed by the program
         """
-        self.renderer = GraphicsEngine()
+        self.profiler = Profiler(PROFILING, PROFILER_CAPACITY)
+
+        self.renderer = GraphicsEngine(self.profiler)
 
-        self.scene = Scene()
+        self.scene = Scene(self.renderer.get_bounding_radii())
 
     def run(self) -> None:
         """
@@ -99,27 +111,81 @@ class App:
         """
         running = True
 
+        # Time not simulated yet, in milliseconds, the first frame simulates a step so the scene is ready to draw.
+        # The clock starts with the loop, the time spent creating the assets is not simulated
+        self.previous_time = glfw.get_time()
+        self.accumulator = SIMULATION_STEP
+
         while running:
             if (glfw.window_should_close(self.window)
                     or glfw.get_key(self.window, GLFW_CONSTANTS.GLFW_KEY_ESCAPE) == GLFW_CONSTANTS.GLFW_PRESS):
                 running = False
 
-            self._handle_keys()
-            self._handle_mouse()
+            frame_start = glfw.get_time()
+            self.profiler.begin_frame()
+
+            with self.profiler.scope('poll events'):
+                glfw.poll_events()
+            with self.profiler.scope('handle mouse'):
+                self._handle_mouse()
+
+            with self.profiler.scope('scene update'):
+                self._simulate(frame_start)
 
-            glfw.poll_events()
+            with self.profiler.scope('render'):
+                self.scene.interpolate(self.accumulator / SIMULATION_STEP)
+                self.renderer.render(self.scene)
+            with self.profiler.scope('swap buffers'):
+                glfw.swap_buffers(self.window)
 
-            self.scene.update(self.frame_time / RATE)
-            self.renderer.render(self.scene.player, self.scene.entities, self.scene.lights)
+            self.profiler.end_frame()
 
             # FPS
             self._compute_framerate()
+            self._limit_framerate(frame_start)
+
+    def _simulate(self, frame_start: float) -> None:
+        """
+        Advance the scene by fixed steps until it catches up with the time elapsed,
+        the scene always sees the same step so the simulation does not depend on the frame rate
+        :param frame_start: Time at which the frame started, in seconds
+        """
+        self.accumulator += 1000.0 * (frame_start - self.previous_time)
+        self.previous_time = frame_start
+
+        steps = 0
+        while self.accumulator >= SIMULATION_STEP:
+            if steps == MAX_SIMULATION_STEPS:
+                # Too far behind, the simulation slows down rather than every frame taking longer to catch up
+                self.accumulator %= SIMULATION_STEP
+                break
+
+            # Input moves the player during the step, so the camera is interpolated like everything else
+            self.scene.begin_step()
+            with self.profiler.scope('handle keys'):
+                self._handle_keys()
+                self._apply_mouse()
+            self.scene.update(SIMULATION_STEP / RATE)
+            self.accumulator -= SIMULATION_STEP
+            steps += 1
+
+    @staticmethod
+    def _limit_framerate(frame_start: float) -> None:
+        """
+        Sleep until the frame lasted as long as the frame rate cap asks
+        :param frame_start: Time at which the frame started, in seconds
+        """
+        if FRAME_RATE_CAP <= 0:
+            return None
+
+        remaining = frame_start + 1.0 / FRAME_RATE_CAP - glfw.get_time()
+        if remaining > 0:
+            time.sleep(remaining)
 
     def _handle_keys(self) -> None:
         """
         Take action based on key pressed
         """
-        rate = self.scene.player.velocity * self.frame_time
         dpos = np.zeros(3, dtype=np.float32)
 
         if self._keys.get(GLFW_CONSTANTS.GLFW_KEY_W, False):
@@ -142,14 +208,23 @@ class App:
 
     def _handle_mouse(self) -> None:
         """
-        Orientate the player based on mouse movement
+        Accumulate the mouse movement since the last frame, the player turns during the next simulation step
         """
         x, y = glfw.get_cursor_pos(self.window)
-        deulers = self.scene.player.sensitivity * ((WIDTH / 2) - x) * GLOBAL_Z
-        deulers += self.scene.player.sensitivity * ((HEIGHT / 2) - y) * GLOBAL_Y
-        self.scene.spin_player(deulers)
+        self._mouse += self.scene.player.sensitivity * ((WIDTH / 2) - x) * GLOBAL_Z
+        self._mouse += self.scene.player.sensitivity * ((HEIGHT / 2) - y) * GLOBAL_Y
         glfw.set_cursor_pos(self.window, WIDTH / 2, HEIGHT / 2)
 
+    def _apply_mouse(self) -> None:
+        """
+        Orientate the player based on the accumulated mouse movement, a still mouse leaves the player untouched
+        """
+        if not self._mouse.any():
+            return None
+
+        self.scene.spin_player(self._mouse)
+        self._mouse = np.zeros(3, dtype=np.float32)
+
     def _compute_framerate(self) -> None:
         """
         Calculate the framerate and the frametime, FPS is shown on the window title
@@ -158,11 +233,18 @@ class App:
         delta_time = self.current_time - self.last_time
         if delta_time >= 1.0:
             framerate = max(1.0, int(self.fps / delta_time))
-            glfw.set_window_title(self.window, f'{TITLE} | FPS : {framerate:.0f}')
+            glfw.set_window_title(
+                self.window,
+                f'{TITLE} | FPS : {framerate:.0f} | Drawn : {self.renderer.drawn} | Culled : {self.renderer.culled}'
+            )
             self.last_time = self.current_time
             self.fps = -1
             self.frame_time = 1000.0 / max(1.0, framerate)
         self.fps += 1
 
     def quit(self) -> None:
+        if self.profiler.enabled:
+            print(self.profiler.format_summary())
+            self.profiler.export_chrome_trace(PROFILER_TRACE)
+
         self.renderer.quit()
@@ -0,0 +1,130 @@
+"""
+Render the scene without a window, for machines without a display or a GPU
+
+Run from the repository root: python -m controller.headless_app [--frames 100] [--width 800] [--height 600]
+                              [--output frames] [--profile trace.json]
+Set PYOPENGL_PLATFORM to 'egl' or 'osmesa' to pick the backend, HEADLESS_BACKEND is used otherwise.
+"""
+from controller.headless_context import HeadlessContext
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from OpenGL.GL import *
+from PIL import Image
+
+from settings import *
+from view.framebuffer import Framebuffer
+from view.graphics_engine import GraphicsEngine
+from model.profiler import Profiler
+from model.scene import Scene
+
+
+class HeadlessApp:
+    """
+    Controller class rendering into a framebuffer object instead of a window
+    """
+    __slots__ = ('context', 'framebuffer', 'renderer', 'scene', 'profiler', 'frame_times')
+
+    def __init__(self, width: int = WIDTH, height: int = HEIGHT, profiling: bool = PROFILING):
+        """
+        Create the context, the framebuffer and the assets
+        :param width: Width of the images rendered
+        :param height: Height of the images rendered
+        :param profiling: Time the phases of every frame
+        """
+        self.context = HeadlessContext(width, height)
+
+        self.framebuffer = Framebuffer(width, height)
+        self.framebuffer.use()
+
+        self.profiler = Profiler(profiling, PROFILER_CAPACITY)
+
+        self.renderer = GraphicsEngine(self.profiler, width / height)
+
+        # Captured frames must not depend on how fast the driver compiles
+        self.renderer.wait_for_shaders()
+
+        self.scene = Scene(self.renderer.get_bounding_radii())
+
+        # Duration of each frame rendered, in seconds
+        self.frame_times: list[float] = []
+
+    def run(self, frames: int, dt: float = 1.0, capture: bool = False) -> list[np.ndarray]:
+        """
+        Update and render the scene for a number of frames, and returns the images rendered if captured
+        :param frames: Number of frames
+        :param dt: Delta time given to the scene every frame
+        :param capture: Read back every frame as a height x width x 4 array, reading is not part of the frame time
+        """
+        images = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            self.profiler.begin_frame()
+
+            with self.profiler.scope('scene update'):
+                self.scene.begin_step()
+                self.scene.update(dt)
+            with self.profiler.scope('render'):
+                self.renderer.render(self.scene)
+
+            # Without a swap nothing waits on the GPU, the frame is only done once every command is
+            with self.profiler.scope('finish'):
+                glFinish()
+
+            self.profiler.end_frame()
+            self.frame_times.append(time.perf_counter() - start)
+
+            if capture:
+                images.append(self.framebuffer.read_pixels())
+
+        return images
+
+    def quit(self) -> None:
+        """
+        Free the assets and destroy the context
+        """
+        self.renderer.quit()
+        self.framebuffer.destroy()
+        self.context.destroy()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5, help="Frames rendered before measuring")
+    parser.add_argument('--width', type=int, default=WIDTH)
+    parser.add_argument('--height', type=int, default=HEIGHT)
+    parser.add_argument('--output', default=None, help="Directory where the frames are saved as PNG files")
+    parser.add_argument('--profile', default=None, help="Profile the frames and write a Chrome trace to this file")
+    args = parser.parse_args()
+
+    app = HeadlessApp(args.width, args.height, profiling=args.profile is not None)
+    print(f"{glGetString(GL_RENDERER).decode()}, OpenGL {glGetString(GL_VERSION).decode()}")
+
+    app.run(args.warmup)
+    app.frame_times.clear()
+    app.profiler.reset()
+    images = app.run(args.frames, capture=args.output is not None)
+
+    frame_times = 1000.0 * np.array(app.frame_times)
+    print(f"{args.frames} frames: mean {frame_times.mean():.2f} ms, median {np.median(frame_times):.2f} ms, "
+          f"max {frame_times.max():.2f} ms, {1000.0 / frame_times.mean():.1f} FPS")
+
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok=True)
+        for i, image in enumerate(images):
+            Image.fromarray(image).save(os.path.join(args.output, f'frame_{i:04d}.png'))
+
+    if args.profile is not None:
+        print(app.profiler.format_summary())
+        app.profiler.export_chrome_trace(args.profile)
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
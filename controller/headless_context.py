@@ -0,0 +1,120 @@
+import ctypes
+import os
+
+from settings import HEADLESS_BACKEND
+
+# PyOpenGL picks its platform when it is first imported, so this module must be imported before anything using OpenGL
+os.environ.setdefault('PYOPENGL_PLATFORM', HEADLESS_BACKEND)
+if os.environ['PYOPENGL_PLATFORM'] == 'egl':
+    # Mesa renders without any display server on the surfaceless platform
+    os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+
+import numpy as np
+
+from OpenGL.GL import *
+
+from model.gl_state import GL_STATE
+
+
+class HeadlessContext:
+    """
+    OpenGL 3.3 core context created without a window, through EGL or OSMesa.
+    It has no default framebuffer, drawing goes to a framebuffer object.
+    """
+    __slots__ = ('backend', 'display', 'context', 'buffer')
+
+    def __init__(self, width: int, height: int):
+        """
+        Create the context and make it current
+        :param width: Width of the images rendered
+        :param height: Height of the images rendered
+        """
+        self.backend = os.environ['PYOPENGL_PLATFORM']
+        self.display = None
+        self.buffer = None
+
+        match self.backend:
+            case 'egl':
+                self.context = self._create_egl_context()
+            case 'osmesa':
+                self.context = self._create_osmesa_context(width, height)
+            case _:
+                raise RuntimeError(f"No headless context for the PyOpenGL platform '{self.backend}', "
+                                   f"set PYOPENGL_PLATFORM to 'egl' or 'osmesa'")
+
+        # Nothing cached about a previous context holds for this one
+        GL_STATE.invalidate()
+
+    def _create_egl_context(self):
+        """
+        Returns a current EGL context without any surface
+        """
+        from OpenGL import EGL
+
+        self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        if not EGL.eglInitialize(self.display, None, None):
+            raise RuntimeError("Could not initialize EGL")
+
+        config = EGL.EGLConfig()
+        config_count = EGL.EGLint()
+        # Surfaceless displays have no window config, the context never gets a surface anyway
+        config_attributes = (EGL.EGLint * 5)(
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_NONE
+        )
+        EGL.eglChooseConfig(self.display, config_attributes, ctypes.pointer(config), 1, ctypes.pointer(config_count))
+        if config_count.value == 0:
+            raise RuntimeError("No EGL config supports desktop OpenGL")
+
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        context_attributes = (EGL.EGLint * 7)(
+            EGL.EGL_CONTEXT_MAJOR_VERSION, 3,
+            EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+            EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+            EGL.EGL_NONE
+        )
+        context = EGL.eglCreateContext(self.display, config, EGL.EGL_NO_CONTEXT, context_attributes)
+        if context == EGL.EGL_NO_CONTEXT:
+            raise RuntimeError("Could not create an OpenGL 3.3 core context with EGL")
+
+        EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context)
+        return context
+
+    def _create_osmesa_context(self, width: int, height: int):
+        """
+        Returns a current OSMesa context, it needs a buffer to be made current even if nothing is drawn in it
+        :param width: Width of the buffer
+        :param height: Height of the buffer
+        """
+        from OpenGL import osmesa
+
+        attributes = (ctypes.c_int * 11)(
+            osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA,
+            osmesa.OSMESA_DEPTH_BITS, 24,
+            osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+            osmesa.OSMESA_CONTEXT_MAJOR_VERSION, 3,
+            osmesa.OSMESA_CONTEXT_MINOR_VERSION, 3,
+            0
+        )
+        context = osmesa.OSMesaCreateContextAttribs(attributes, None)
+        if not context:
+            raise RuntimeError("Could not create an OpenGL 3.3 core context with OSMesa")
+
+        self.buffer = np.zeros((height, width, 4), dtype=np.uint8)
+        osmesa.OSMesaMakeCurrent(context, self.buffer, GL_UNSIGNED_BYTE, width, height)
+        return context
+
+    def destroy(self) -> None:
+        """
+        Destroy the context
+        """
+        match self.backend:
+            case 'egl':
+                from OpenGL import EGL
+                EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+                EGL.eglDestroyContext(self.display, self.context)
+                EGL.eglTerminate(self.display)
+            case 'osmesa':
+                from OpenGL import osmesa
+                osmesa.OSMesaDestroyContext(self.context)
@@ -2,29 +2,40 @@ import pyrr
 import numpy as np
 
 from model.entity import Entity
+from model.transform_store import TransformStore
+from settings import GPU_BILLBOARDS
 
 
 class BillBoard(Entity):
     """
     BillBoard entity, is always face to the camere
     """
-    __slots__ = ('position', 'eulers')
+    __slots__ = ()
 
-    def __init__(self, position):
+    def __init__(self, position: list | tuple | np.ndarray, store: TransformStore = None):
         """
         Initialize the billboard
         :param position: Position of the billboard in world space / scene
+        :param store: Transform store holding the billboard data
         """
-        super().__init__(position, eulers=[0, 0, 0])
+        super().__init__(position, eulers=[0, 0, 0], store=store)
 
     def update(self, dt: float, camera_pos: np.ndarray) -> None:
         """
         Update the orientation of the billboard
         :param dt: Delta time
         :param camera_pos: Position of the camera in the world space / scene
-        :return:
         """
+        # The vertex shader already faces the quad to the camera
+        if GPU_BILLBOARDS:
+            return None
+
         direction_from_camera = self.position - camera_pos
-        self.eulers[2] = np.degrees(np.arctan2(-direction_from_camera[1], direction_from_camera[0]))
+        eulers = self.eulers.copy()
+        eulers[2] = np.degrees(np.arctan2(-direction_from_camera[1], direction_from_camera[0]))
         dist = pyrr.vector.length(direction_from_camera)
-        self.eulers[1] = np.degrees(np.arctan2(direction_from_camera[2], dist))
+        eulers[1] = np.degrees(np.arctan2(direction_from_camera[2], dist))
+
+        # Only written when the camera moved around the billboard, so its model transform stays cached otherwise
+        if not np.array_equal(eulers, self.eulers):
+            self.eulers = eulers
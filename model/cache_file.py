@@ -0,0 +1,83 @@
+import hashlib
+import os
+import struct
+import zlib
+
+
+class CacheFormat:
+    """
+    Layout of the files of an on disk cache: a header made of a magic, a format version, the fields of the cache
+    and the crc32 of the data, padded to the offset of the data that follows it.
+    Files are written under a temporary name then renamed, so a crash never leaves a partial cache file.
+    """
+    __slots__ = ('magic', 'version', 'header', 'data_offset')
+
+    # Size of the content hashes stored in the headers
+    HASH_SIZE: int = 32
+
+    # Size of the magic and of the version, the fields of the cache start there
+    FIELDS_OFFSET: int = 12
+
+    def __init__(self, magic: bytes, version: int, fields: str, data_offset: int = 0):
+        """
+        Initialize the format
+        :param magic: Eight bytes starting every file
+        :param version: Version of the layout, files of other versions are rejected
+        :param fields: struct format of the fields between the version and the crc32, little endian
+        :param data_offset: Offset of the data, at least the size of the header
+        """
+        self.magic = magic
+        self.version = version
+        self.header = struct.Struct(f'<8sI{fields}I')
+        self.data_offset = max(data_offset, self.header.size)
+
+    @classmethod
+    def hash(cls):
+        """
+        Returns a new hash object for the content hashes stored in the headers
+        """
+        return hashlib.blake2b(digest_size=cls.HASH_SIZE)
+
+    def unpack(self, buffer) -> tuple:
+        """
+        Returns the fields and the crc32 of a header, raises ValueError when the file has another format
+        and struct.error when it is shorter than a header
+        :param buffer: Content of the file
+        """
+        magic, version, *fields = self.header.unpack_from(buffer)
+        if magic != self.magic or version != self.version:
+            raise ValueError("Unknown cache format")
+        return tuple(fields)
+
+    def check(self, buffer, crc: int) -> None:
+        """
+        Raise ValueError when the data following the header does not match its crc32
+        :param buffer: Content of the file
+        :param crc: crc32 read from the header
+        """
+        if zlib.crc32(memoryview(buffer)[self.data_offset:]) != crc:
+            raise ValueError("Corrupt cache file")
+
+    def write(self, path: str, fields: tuple, *blobs) -> None:
+        """
+        Write a file holding the header then the data, failures only mean the cache is missed next time
+        :param path: Path to the file, its directory is created when needed
+        :param fields: Fields of the cache, without the magic, the version and the crc32
+        :param blobs: Buffers written one after the other as the data
+        """
+        crc = 0
+        for blob in blobs:
+            crc = zlib.crc32(blob, crc)
+        header = self.header.pack(self.magic, self.version, *fields, crc)
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temporary, 'wb') as f:
+                f.write(header.ljust(self.data_offset, b'\0'))
+                for blob in blobs:
+                    f.write(blob)
+            os.replace(temporary, path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
@@ -0,0 +1,98 @@
+import numpy as np
+
+
+class ClusterGrid:
+    """
+    Split of the view frustum in clusters, uniform on screen and exponential in depth so clusters stay roughly cubic.
+    Lights are binned in the clusters their sphere of influence overlaps, all at once with NumPy.
+    """
+    __slots__ = ('size', 'near', 'far', 'projection')
+
+    def __init__(self, size: tuple[int, int, int], near: float, far: float, projection: np.ndarray):
+        """
+        Initialize the grid
+        :param size: Number of clusters along the screen width, the screen height and the depth
+        :param near: Distance of the near plane
+        :param far: Distance of the far plane
+        :param projection: Perspective projection matrix
+        """
+        self.size = size
+        self.near = near
+        self.far = far
+        self.projection = projection
+
+    def depth_parameters(self) -> tuple[float, float]:
+        """
+        Returns the scale and bias giving the depth slice of a view distance d as log(d) * scale + bias
+        """
+        scale = self.size[2] / np.log(self.far / self.near)
+        return float(scale), float(-np.log(self.near) * scale)
+
+    def assign(self, positions: np.ndarray, radii: np.ndarray, view: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (offset, count) range of every cluster and the light indices the ranges point into.
+        Each light is given every cluster of the screen tiles and depth slices covering the box around its sphere.
+        :param positions: N x 3 world positions of the lights
+        :param radii: Influence radius of each light
+        :param view: View transform
+        """
+        grid_x, grid_y, grid_z = self.size
+        cluster_count = grid_x * grid_y * grid_z
+
+        # View space, the camera looks toward -z
+        centers = positions @ view[:3, :3] + view[3, :3]
+        distances = -centers[:, 2]
+
+        near = np.maximum(distances - radii, self.near)
+        far = np.minimum(distances + radii, self.far)
+        visible = near <= far
+
+        # x / d over the box is extreme at its corners, so both ends of the depth range bound it on screen
+        tiles = []
+        for axis, size in ((0, grid_x), (1, grid_y)):
+            low = centers[:, axis] - radii
+            high = centers[:, axis] + radii
+            scale = self.projection[axis, axis]
+            low = scale * np.minimum(low / near, low / far)
+            high = scale * np.maximum(high / near, high / far)
+            visible &= (high >= -1.0) & (low <= 1.0)
+            tiles.append((self._tile(low, size), self._tile(high, size)))
+
+        scale, bias = self.depth_parameters()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slices = (self._slice(near, scale, bias), self._slice(far, scale, bias))
+
+        lights = np.flatnonzero(visible)
+        starts = np.stack([tiles[0][0], tiles[1][0], slices[0]], axis=1)[lights]
+        sizes = np.stack([tiles[0][1], tiles[1][1], slices[1]], axis=1)[lights] - starts + 1
+        counts = sizes.prod(axis=1)
+
+        # One (cluster, light) pair for every cluster of every light box
+        owners = np.repeat(np.arange(len(lights)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        x = local % sizes[owners, 0]
+        local //= sizes[owners, 0]
+        y = local % sizes[owners, 1]
+        z = local // sizes[owners, 1]
+        clusters = ((z + starts[owners, 2]) * grid_y + y + starts[owners, 1]) * grid_x + x + starts[owners, 0]
+
+        order = np.argsort(clusters, kind='stable')
+        cluster_lights = lights[owners[order]].astype(np.uint32)
+
+        cluster_sizes = np.bincount(clusters, minlength=cluster_count)
+        ranges = np.stack((np.cumsum(cluster_sizes) - cluster_sizes, cluster_sizes), axis=1).astype(np.uint32)
+
+        return ranges, cluster_lights
+
+    @staticmethod
+    def _tile(ndc: np.ndarray, size: int) -> np.ndarray:
+        """
+        Returns the screen tile of normalized device coordinates, clamped to the grid
+        """
+        return np.clip(np.floor((ndc + 1.0) * 0.5 * size), 0, size - 1).astype(np.int64)
+
+    def _slice(self, distances: np.ndarray, scale: float, bias: float) -> np.ndarray:
+        """
+        Returns the depth slice of view distances, clamped to the grid
+        """
+        return np.clip(np.floor(np.log(distances) * scale + bias), 0, self.size[2] - 1).astype(np.int64)
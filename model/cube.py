@@ -1,21 +1,26 @@
 import numpy as np
 
 from model.entity import Entity
+from model.transform_store import TransformStore
 
 
 class Cube(Entity):
     """
     Basic cube with position and rotation
     """
-    __slots__ = ('position', 'eulers')
+    __slots__ = ()
 
-    def __init__(self, position: list | tuple | np.ndarray, eulers: list | tuple | np.ndarray):
+    def __init__(self,
+                 position: list | tuple | np.ndarray,
+                 eulers: list | tuple | np.ndarray,
+                 store: TransformStore = None):
         """
         Initialize the cube
         :param position: Position of the cube in world space / scene
         :param eulers: Orientation of the cube in world space / scene
+        :param store: Transform store holding the cube data
         """
-        super().__init__(position, eulers)
+        super().__init__(position, eulers, store)
 
     def update(self, dt: float, camera_pos: np.ndarray = None) -> None:
         """
@@ -23,6 +28,8 @@ class Cube(Entity):
         :param dt: Delta time
         :param camera_pos: Position of the camera in world space / scene
         """
-        self.eulers[2] += 0.25 * dt
-        if self.eulers[2] > 360:
-            self.eulers[2] -= 360
+        eulers = self.eulers.copy()
+        eulers[2] += 0.25 * dt
+        if eulers[2] > 360:
+            eulers[2] -= 360
+        self.eulers = eulers
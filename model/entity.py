@@ -1,21 +1,54 @@
-import pyrr
 import numpy as np
 
+from model.transform_store import TransformStore
+
 
 class Entity:
     """
-    Basic object with a position and a rotation
+    Basic object with a position and a rotation, stored as a row of a transform store
     """
-    __slots__ = ('position', 'eulers')
+    __slots__ = ('store', 'index')
 
-    def __init__(self, position: tuple | list | np.ndarray, eulers: tuple | list | np.ndarray):
+    def __init__(self,
+                 position: tuple | list | np.ndarray,
+                 eulers: tuple | list | np.ndarray,
+                 store: TransformStore = None):
         """
         Initialize the entity
         :param position: Position of the entity in the world space / scene
         :param eulers: Orientation of the entity in the world space / scene
+        :param store: Transform store holding the entity data, a private one is created if not given
+        """
+        self.store = store if store is not None else TransformStore(capacity=1)
+        self.index = self.store.allocate(self, position, eulers)
+
+    @property
+    def position(self) -> np.ndarray:
+        """
+        Returns a read only view on the position of the entity, assign the property to move the entity
         """
-        self.position = np.array(position, dtype=np.float32)
-        self.eulers = np.array(eulers, dtype=np.float32)
+        position = self.store.positions[self.index]
+        position.flags.writeable = False
+        return position
+
+    @position.setter
+    def position(self, value: tuple | list | np.ndarray) -> None:
+        self.store.mark_dirty(self.index)
+        self.store.positions[self.index] = value
+
+    @property
+    def eulers(self) -> np.ndarray:
+        """
+        Returns a read only view on the orientation of the entity, assign the property to rotate the entity
+        """
+        eulers = self.store.eulers[self.index]
+        eulers.flags.writeable = False
+        return eulers
+
+    @eulers.setter
+    def eulers(self, value: tuple | list | np.ndarray) -> None:
+        self.store.mark_dirty(self.index)
+        self.store.eulers[self.index] = value
 
     def update(self, dt: float, camera_pos: np.ndarray) -> None:
         """
@@ -27,32 +60,12 @@ class Entity:
 
     def get_model_transform(self) -> np.ndarray:
         """
-        Returns the entity transformation matrix
-        """
-        model_transform = pyrr.matrix44.create_identity(dtype=np.float32)
-
-        model_transform = pyrr.matrix44.multiply(
-            m1=model_transform,
-            m2=pyrr.matrix44.create_from_y_rotation(
-                theta=np.deg2rad(self.eulers[1]),
-                dtype=np.float32
-            )
-        )
-
-        model_transform = pyrr.matrix44.multiply(
-            m1=model_transform,
-            m2=pyrr.matrix44.create_from_z_rotation(
-                theta=np.deg2rad(self.eulers[2]),
-                dtype=np.float32
-            )
-        )
-
-        model_transform = pyrr.matrix44.multiply(
-            m1=model_transform,
-            m2=pyrr.matrix44.create_from_translation(
-                vec=self.position,
-                dtype=np.float32
-            )
-        )
-
-        return model_transform
+        Returns the entity transformation matrix, as cached by the last update of its store
+        """
+        return self.store.models[self.index]
+
+    def destroy(self) -> None:
+        """
+        Free the row of the entity in its store
+        """
+        self.store.release(self.index)
@@ -0,0 +1,37 @@
+import numpy as np
+
+
+class Frustum:
+    """
+    The six planes of a view frustum, used to cull bounding spheres before anything is drawn
+    """
+    __slots__ = ('planes',)
+
+    def __init__(self, view_projection: np.ndarray):
+        """
+        Extract the planes of the frustum, their normals point inside
+        :param view_projection: View transform times projection transform, in the row vector convention of pyrr
+        """
+        m = np.asarray(view_projection, dtype=np.float64)
+
+        # left, right, bottom, top, near, far
+        planes = np.stack((
+            m[:, 3] + m[:, 0],
+            m[:, 3] - m[:, 0],
+            m[:, 3] + m[:, 1],
+            m[:, 3] - m[:, 1],
+            m[:, 3] + m[:, 2],
+            m[:, 3] - m[:, 2],
+        ))
+        planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+        self.planes = planes.astype(np.float32)
+
+    def intersects_spheres(self, centers: np.ndarray, radii: np.ndarray | float) -> np.ndarray:
+        """
+        Returns a mask of the spheres at least partly inside the frustum
+        :param centers: N x 3 centers in world space
+        :param radii: Radius of each sphere, or one radius for all of them
+        """
+        distances = centers @ self.planes[:, :3].T + self.planes[:, 3]
+        return np.all(distances >= -np.reshape(radii, (-1, 1)), axis=1)
+
@@ -0,0 +1,107 @@
+import ctypes
+
+from OpenGL import platform
+from OpenGL.GL import *
+from OpenGL.error import GLError, NullFunctionError
+
+from settings import GL_DEBUG
+
+
+# Return type and argument types of the functions called on every frame, pointers are passed as addresses
+SIGNATURES: dict[str, tuple] = {
+    'glUseProgram': (None, GLuint),
+    'glActiveTexture': (None, GLenum),
+    'glBindTexture': (None, GLenum, GLuint),
+    'glBindVertexArray': (None, GLuint),
+    'glBindBuffer': (None, GLenum, GLuint),
+    'glEnable': (None, GLenum),
+    'glDisable': (None, GLenum),
+    'glUniform1i': (None, GLint, GLint),
+    'glUniform1f': (None, GLint, GLfloat),
+    'glUniform2fv': (None, GLint, GLsizei, ctypes.c_void_p),
+    'glUniform3fv': (None, GLint, GLsizei, ctypes.c_void_p),
+    'glUniform3iv': (None, GLint, GLsizei, ctypes.c_void_p),
+    'glUniformMatrix4fv': (None, GLint, GLsizei, GLboolean, ctypes.c_void_p),
+    'glEnableVertexAttribArray': (None, GLuint),
+    'glDisableVertexAttribArray': (None, GLuint),
+    'glVertexAttribPointer': (None, GLuint, GLint, GLenum, GLboolean, GLsizei, ctypes.c_void_p),
+    'glDrawElements': (None, GLenum, GLsizei, GLenum, ctypes.c_void_p),
+    'glDrawElementsInstanced': (None, GLenum, GLsizei, GLenum, ctypes.c_void_p, GLsizei),
+    'glGetError': (GLenum,),
+}
+
+
+class GLCalls:
+    """
+    OpenGL functions of the per frame paths, called through the driver entry points without PyOpenGL's wrappers.
+    PyOpenGL checks for errors, converts the arguments and looks up the type of arrays on every call,
+    these functions take ints and floats as is and arrays as the address of their data, which is never copied.
+    Errors are only checked when GL_DEBUG is set, after every call.
+    The entry points are resolved on the first call, there must be a current context by then.
+    """
+    __slots__ = tuple(SIGNATURES)
+
+    def __getattr__(self, name: str):
+        """
+        Resolve every function when one of them is first called, attributes are then found without this method
+        :param name: Name of the function
+        """
+        if name not in SIGNATURES:
+            raise AttributeError(name)
+
+        self.load()
+        return object.__getattribute__(self, name)
+
+    def load(self) -> None:
+        """
+        Resolve the entry point of every function, needs a current OpenGL context
+        """
+        get_error = None
+        for name, (result_type, *argument_types) in SIGNATURES.items():
+            function = self._resolve(name, result_type, argument_types)
+            if GL_DEBUG and name != 'glGetError':
+                get_error = get_error or self._resolve('glGetError', GLenum, [])
+                function = self._checked(name, function, get_error)
+            setattr(self, name, function)
+
+    @staticmethod
+    def _resolve(name: str, result_type, argument_types: list):
+        """
+        Returns a ctypes function calling the entry point of an OpenGL function
+        :param name: Name of the function
+        :param result_type: ctypes type of the result, None for void
+        :param argument_types: ctypes type of each argument
+        """
+        # Functions exported by the library are found directly, later ones through the platform loader
+        library = platform.PLATFORM.GL
+        if hasattr(library, name):
+            address = ctypes.cast(getattr(library, name), ctypes.c_void_p).value
+        else:
+            address = platform.PLATFORM.getExtensionProcedure(name.encode())
+        if not address:
+            raise NullFunctionError(f"Unable to resolve {name}")
+
+        function_type = platform.PLATFORM.functionTypeFor(library)
+        return function_type(result_type, *argument_types)(address)
+
+    @staticmethod
+    def _checked(name: str, function, get_error):
+        """
+        Returns a function calling another one and raising a GLError when it sets an error
+        :param name: Name of the function, reported in the error
+        :param function: Function to call
+        :param get_error: glGetError function
+        """
+        def call(*arguments):
+            result = function(*arguments)
+            error = get_error()
+            if error != GL_NO_ERROR:
+                raise GLError(err=error, result=result, cArguments=arguments, baseOperation=call)
+            return result
+
+        call.__name__ = name
+        return call
+
+
+# OpenGL functions of the per frame paths, there is a single context per process
+GL_CALLS = GLCalls()
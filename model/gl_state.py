@@ -0,0 +1,174 @@
+from OpenGL.GL import *
+
+from model.gl_calls import GL_CALLS
+
+
+class GLState:
+    """
+    Cache of the bindings and capabilities of the current OpenGL context, a change to the value already set
+    is dropped before reaching the driver.
+    Code changing this state without going through the cache must call invalidate afterwards,
+    and objects must be forgotten when deleted since the driver may hand their name out again.
+    """
+    __slots__ = ('program', 'unit', 'textures', 'vertex_array', 'buffers', 'capabilities', 'issued', 'elided')
+
+    def __init__(self):
+        """
+        Initialize the cache, nothing is known about the context yet
+        """
+        # Number of state changes sent to the driver and dropped since the counts were reset
+        self.issued = 0
+        self.elided = 0
+
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        Forget every cached value, the next change of each one is sent to the driver
+        """
+        self.program = None
+        self.unit = None
+        self.vertex_array = None
+
+        # Texture bound to each (unit, target), buffer bound to each target, and state of each capability
+        self.textures: dict[tuple[int, int], int] = {}
+        self.buffers: dict[int, int] = {}
+        self.capabilities: dict[int, bool] = {}
+
+    def reset_counts(self) -> tuple[int, int]:
+        """
+        Returns the number of state changes issued and elided since the last reset, and reset them
+        """
+        counts = self.issued, self.elided
+        self.issued = self.elided = 0
+        return counts
+
+    def use_program(self, program: int) -> None:
+        """
+        Use a shader program
+        :param program: Program to use
+        """
+        if program == self.program:
+            self.elided += 1
+            return None
+
+        GL_CALLS.glUseProgram(program)
+        self.program = program
+        self.issued += 1
+
+    def active_texture(self, unit: int) -> None:
+        """
+        Make a texture unit active
+        :param unit: Index of the unit, from 0
+        """
+        if unit == self.unit:
+            self.elided += 1
+            return None
+
+        GL_CALLS.glActiveTexture(GL_TEXTURE0 + unit)
+        self.unit = unit
+        self.issued += 1
+
+    def bind_texture(self, unit: int, target: int, texture: int, select: bool = False) -> None:
+        """
+        Bind a texture to a unit, the active unit only changes when the binding does
+        :param unit: Index of the unit, from 0
+        :param target: Texture target, such as GL_TEXTURE_2D
+        :param texture: Texture to bind
+        :param select: Leave the unit active even if the texture was already bound, for calls editing the texture
+        """
+        if select:
+            self.active_texture(unit)
+
+        if self.textures.get((unit, target)) == texture:
+            self.elided += 1
+            return None
+
+        self.active_texture(unit)
+        GL_CALLS.glBindTexture(target, texture)
+        self.textures[(unit, target)] = texture
+        self.issued += 1
+
+    def bind_vertex_array(self, vertex_array: int) -> None:
+        """
+        Bind a vertex array object
+        :param vertex_array: Vertex array to bind
+        """
+        if vertex_array == self.vertex_array:
+            self.elided += 1
+            return None
+
+        GL_CALLS.glBindVertexArray(vertex_array)
+        self.vertex_array = vertex_array
+        self.issued += 1
+
+        # The element buffer binding is part of the vertex array
+        self.buffers.pop(GL_ELEMENT_ARRAY_BUFFER, None)
+
+    def bind_buffer(self, target: int, buffer: int) -> None:
+        """
+        Bind a buffer to a target, element buffers are bound to the current vertex array
+        :param target: Buffer target, such as GL_ARRAY_BUFFER
+        :param buffer: Buffer to bind
+        """
+        if self.buffers.get(target) == buffer:
+            self.elided += 1
+            return None
+
+        GL_CALLS.glBindBuffer(target, buffer)
+        self.buffers[target] = buffer
+        self.issued += 1
+
+    def set_capability(self, capability: int, enabled: bool) -> None:
+        """
+        Enable or disable a capability
+        :param capability: Capability, such as GL_BLEND or GL_DEPTH_TEST
+        :param enabled: Whether the capability is enabled
+        """
+        if self.capabilities.get(capability) == enabled:
+            self.elided += 1
+            return None
+
+        if enabled:
+            GL_CALLS.glEnable(capability)
+        else:
+            GL_CALLS.glDisable(capability)
+        self.capabilities[capability] = enabled
+        self.issued += 1
+
+    def forget_program(self, program: int) -> None:
+        """
+        Forget a program about to be deleted
+        :param program: Deleted program
+        """
+        if program == self.program:
+            self.program = None
+
+    def forget_texture(self, texture: int) -> None:
+        """
+        Forget a texture about to be deleted, the driver unbinds it from every unit
+        :param texture: Deleted texture
+        """
+        for binding in [binding for binding, bound in self.textures.items() if bound == texture]:
+            del self.textures[binding]
+
+    def forget_vertex_array(self, vertex_array: int) -> None:
+        """
+        Forget a vertex array about to be deleted
+        :param vertex_array: Deleted vertex array
+        """
+        if vertex_array == self.vertex_array:
+            self.vertex_array = None
+            self.buffers.pop(GL_ELEMENT_ARRAY_BUFFER, None)
+
+    def forget_buffer(self, buffer: int) -> None:
+        """
+        Forget a buffer about to be deleted, the driver unbinds it from every target
+        :param buffer: Deleted buffer
+        """
+        for target in [target for target, bound in self.buffers.items() if bound == buffer]:
+            del self.buffers[target]
+
+
+# State of the OpenGL context, there is a single context per process
+GL_STATE = GLState()
@@ -0,0 +1,74 @@
+import numpy as np
+
+from OpenGL.GL import *
+
+from model.gl_state import GL_STATE
+from model.light_store import LightStore
+
+
+class LightBuffer:
+    """
+    Uniform buffer holding every point light, laid out as the std140 LightBlock of the shaders
+    so all the lights are uploaded with a single call
+    """
+    __slots__ = ('ubo', 'capacity', 'data', 'count', 'lights', 'uploaded')
+
+    # std140 layout of a PointLight: vec3 position, float strength, vec3 color, padded to 32 bytes
+    LIGHT_DTYPE = np.dtype([
+        ('position', np.float32, 3),
+        ('strength', np.float32),
+        ('color', np.float32, 3),
+        ('padding', np.float32),
+    ])
+
+    # The light count is an int padded to 16 bytes, the array starts right after
+    HEADER_SIZE: int = 16
+
+    def __init__(self, capacity: int, binding: int):
+        """
+        Initialize the buffer
+        :param capacity: Maximum number of lights, must match the size of the array in the shaders
+        :param binding: Uniform buffer binding point the block is read from
+        """
+        self.capacity = capacity
+
+        # Raw bytes of the whole block, with typed views on the count and on the lights
+        self.data = np.zeros(self.HEADER_SIZE + capacity * self.LIGHT_DTYPE.itemsize, dtype=np.uint8)
+        self.count = self.data[:4].view(np.int32)
+        self.lights = self.data[self.HEADER_SIZE:].view(self.LIGHT_DTYPE)
+
+        # Copy of the bytes last sent, unchanged lights are not sent again
+        self.uploaded = None
+
+        self.ubo = glGenBuffers(1)
+        GL_STATE.bind_buffer(GL_UNIFORM_BUFFER, self.ubo)
+        glBufferData(GL_UNIFORM_BUFFER, self.data.nbytes, self.data, GL_DYNAMIC_DRAW)
+        glBindBufferBase(GL_UNIFORM_BUFFER, binding, self.ubo)
+
+    def update(self, store: LightStore) -> None:
+        """
+        Pack the lights of a store and upload them, lights past the capacity are ignored
+        :param store: Light store holding the light data
+        """
+        count = min(store.count, self.capacity)
+        lights = self.lights[:count]
+        lights['position'] = store.positions[:count]
+        lights['strength'] = store.strengths[:count]
+        lights['color'] = store.colors[:count]
+        self.count[0] = count
+
+        # Only the used part of the block is sent, the shaders never read past the count
+        size = self.HEADER_SIZE + count * self.LIGHT_DTYPE.itemsize
+        if self.uploaded is not None and np.array_equal(self.uploaded, self.data[:size]):
+            return None
+        self.uploaded = self.data[:size].copy()
+
+        GL_STATE.bind_buffer(GL_UNIFORM_BUFFER, self.ubo)
+        glBufferSubData(GL_UNIFORM_BUFFER, 0, size, self.data)
+
+    def destroy(self) -> None:
+        """
+        Free the buffer
+        """
+        GL_STATE.forget_buffer(self.ubo)
+        glDeleteBuffers(1, (self.ubo,))
@@ -0,0 +1,100 @@
+import numpy as np
+
+from OpenGL.GL import *
+
+from model.cluster_grid import ClusterGrid
+from model.gl_state import GL_STATE
+from model.light_store import LightStore
+
+
+class LightClusters:
+    """
+    Clustered forward lighting, every frame the lights are binned in the clusters of the view frustum
+    and the cluster lists are uploaded in buffer textures, so fragments only shade the lights of their cluster
+    """
+    __slots__ = ('grid', 'buffers', 'textures', 'pair_count')
+
+    # Texture unit of each buffer texture, unit 0 is used by the images
+    TEXTURE_UNITS: dict[str, int] = {
+        'lightData': 1,
+        'clusterRanges': 2,
+        'clusterLights': 3,
+    }
+
+    FORMATS: dict[str, int] = {
+        'lightData': GL_RGBA32F,
+        'clusterRanges': GL_RG32UI,
+        'clusterLights': GL_R32UI,
+    }
+
+    def __init__(self, grid: ClusterGrid):
+        """
+        Initialize the clusters
+        :param grid: Cluster grid the lights are binned in
+        """
+        self.grid = grid
+
+        # Number of (cluster, light) pairs of the last update
+        self.pair_count = 0
+
+        self.buffers: dict[str, int] = {}
+        self.textures: dict[str, int] = {}
+        for name, internal_format in self.FORMATS.items():
+            self.buffers[name] = glGenBuffers(1)
+            GL_STATE.bind_buffer(GL_TEXTURE_BUFFER, self.buffers[name])
+            glBufferData(GL_TEXTURE_BUFFER, 16, None, GL_STREAM_DRAW)
+
+            self.textures[name] = glGenTextures(1)
+            GL_STATE.bind_texture(self.TEXTURE_UNITS[name], GL_TEXTURE_BUFFER, self.textures[name], select=True)
+            glTexBuffer(GL_TEXTURE_BUFFER, internal_format, self.buffers[name])
+
+    def update(self, store: LightStore, view: np.ndarray) -> None:
+        """
+        Bin the lights of a store in the clusters and upload the light data and the cluster lists
+        :param store: Light store holding the light data
+        :param view: View transform
+        """
+        count = store.count
+        ranges, cluster_lights = self.grid.assign(store.positions[:count], store.radii[:count], view)
+        self.pair_count = len(cluster_lights)
+
+        # Two texels per light: position and strength, then color and radius
+        light_data = np.empty((count, 8), dtype=np.float32)
+        light_data[:, 0:3] = store.positions[:count]
+        light_data[:, 3] = store.strengths[:count]
+        light_data[:, 4:7] = store.colors[:count]
+        light_data[:, 7] = store.radii[:count]
+
+        self._upload('lightData', light_data)
+        self._upload('clusterRanges', ranges)
+        self._upload('clusterLights', cluster_lights)
+
+    def _upload(self, name: str, data: np.ndarray) -> None:
+        """
+        Replace the content of a buffer, the old storage is orphaned so the upload never waits on the GPU
+        :param name: Name of the buffer texture
+        :param data: New content
+        """
+        GL_STATE.bind_buffer(GL_TEXTURE_BUFFER, self.buffers[name])
+        if data.nbytes:
+            glBufferData(GL_TEXTURE_BUFFER, data.nbytes, data, GL_STREAM_DRAW)
+        else:
+            glBufferData(GL_TEXTURE_BUFFER, 16, None, GL_STREAM_DRAW)
+
+    def use(self) -> None:
+        """
+        Bind the buffer textures for drawing
+        """
+        for name, unit in self.TEXTURE_UNITS.items():
+            GL_STATE.bind_texture(unit, GL_TEXTURE_BUFFER, self.textures[name])
+
+    def destroy(self) -> None:
+        """
+        Free the buffers and the textures
+        """
+        for texture in self.textures.values():
+            GL_STATE.forget_texture(texture)
+        for buffer in self.buffers.values():
+            GL_STATE.forget_buffer(buffer)
+        glDeleteTextures(len(self.textures), list(self.textures.values()))
+        glDeleteBuffers(len(self.buffers), list(self.buffers.values()))
@@ -0,0 +1,51 @@
+import numpy as np
+
+from model.transform_store import TransformStore
+
+
+class LightStore(TransformStore):
+    """
+    Transform store that also keeps the color, strength and influence radius of every light in contiguous arrays
+    """
+    __slots__ = ('colors', 'strengths', 'radii')
+
+    def __init__(self, capacity: int = 16):
+        """
+        Initialize the store
+        :param capacity: Number of rows allocated up front
+        """
+        super().__init__(capacity)
+        self.colors = np.zeros((len(self.positions), 3), dtype=np.float32)
+        self.strengths = np.zeros(len(self.positions), dtype=np.float32)
+        self.radii = np.zeros(len(self.positions), dtype=np.float32)
+
+    def _move(self, source: int, target: int) -> None:
+        """
+        Copy the data of a row to another row
+        :param source: Index of the row to copy
+        :param target: Index of the row overwritten
+        """
+        super()._move(source, target)
+        self.colors[target] = self.colors[source]
+        self.strengths[target] = self.strengths[source]
+        self.radii[target] = self.radii[source]
+
+    def _grow(self, capacity: int) -> None:
+        """
+        Reallocate the arrays with a bigger capacity
+        :param capacity: New number of rows
+        """
+        count = self.count
+        super()._grow(capacity)
+
+        colors = np.zeros((capacity, 3), dtype=np.float32)
+        colors[:count] = self.colors[:count]
+        self.colors = colors
+
+        strengths = np.zeros(capacity, dtype=np.float32)
+        strengths[:count] = self.strengths[:count]
+        self.strengths = strengths
+
+        radii = np.zeros(capacity, dtype=np.float32)
+        radii[:count] = self.radii[:count]
+        self.radii = radii
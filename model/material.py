@@ -1,45 +1,43 @@
-from OpenGL.GL import *
-from PIL import Image
+from model.texture_array import TextureArray
+from model.texture_manager import TextureManager
+from settings import TEXTURE_BUDGET
 
 
 class Material:
     """
     Basic texture for objects
     """
-    __slots__ = ('texture',)
+    __slots__ = ('textures', 'texture', 'array', 'layer')
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, textures: TextureManager = None, array: TextureArray = None):
         """
         Initialize and load the texture from a file
         :param filepath: Path to the file
+        :param textures: Texture manager sharing the texture with other materials, a private one is created if not given
+        :param array: Texture array holding the image as one of its layers instead of a texture of its own
         """
-        # Initialize OpenGL texture
-        self.texture = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, self.texture)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST_MIPMAP_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        self.textures = textures if textures is not None else TextureManager(TEXTURE_BUDGET)
+        self.array = array
 
-        # Load texture from file
-        with Image.open(filepath, mode='r') as image:
-            image_width, image_height = image.size
-            image = image.convert('RGBA')
-            image_data = bytes(image.tobytes())
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA,
-                         image_width, image_height, 0,
-                         GL_RGBA, GL_UNSIGNED_BYTE, image_data)
-        glGenerateMipmap(GL_TEXTURE_2D)
+        if array is not None:
+            self.texture = None
+            self.layer = array.add(filepath)
+        else:
+            self.texture = self.textures.acquire(filepath)
+            self.layer = 0
 
     def use(self) -> None:
         """
         Use the texture for drawing
         """
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.texture)
+        if self.array is not None:
+            self.array.use()
+        else:
+            self.textures.use(self.texture)
 
     def destroy(self) -> None:
         """
-        Free the texture when not needed
+        Free the texture when not needed, layers are freed with their texture array
         """
-        glDeleteTextures(1, (self.texture,))
+        if self.array is None:
+            self.textures.release(self.texture)
@@ -1,11 +1,15 @@
+import numpy as np
 from OpenGL.GL import *
 
+from model.gl_calls import GL_CALLS
+from model.gl_state import GL_STATE
+
 
 class Mesh:
     """
-    Basic mesh
+    Basic indexed mesh
     """
-    __slots__ = ('vao', 'vbo', 'vertex_count')
+    __slots__ = ('vao', 'vbo', 'ebo', 'vertex_count', 'index_count', 'index_type', 'center', 'radius')
 
     def __init__(self):
         """
@@ -13,11 +17,22 @@ class Mesh:
         """
         # Vertex Array Object
         self.vao = glGenVertexArrays(1)
-        glBindVertexArray(self.vao)
+        GL_STATE.bind_vertex_array(self.vao)
+
+        # Per instance model transforms, a mat4 takes four attribute locations, colors and texture array layers.
+        # They are read from a stream buffer, the pointers are set when the instances are bound.
+        for i in range(4):
+            glVertexAttribDivisor(3 + i, 1)
+        glVertexAttribDivisor(7, 1)
+        glVertexAttribDivisor(8, 1)
+
+        # Element Buffer Object, its binding is part of the VAO state
+        self.ebo = glGenBuffers(1)
+        GL_STATE.bind_buffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
 
         # Vertex Buffer Object
         self.vbo = glGenBuffers(1)
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        GL_STATE.bind_buffer(GL_ARRAY_BUFFER, self.vbo)
 
         # Position
         glEnableVertexAttribArray(0)
@@ -31,21 +46,93 @@ class Mesh:
         glEnableVertexAttribArray(2)
         glVertexAttribPointer(2, 3, GL_FLOAT, GL_FALSE, 32, ctypes.c_void_p(20))
 
+    def upload(self, vertices: np.ndarray, indices: np.ndarray) -> None:
+        """
+        Upload the vertex and index data
+        :param vertices: Interleaved x, y, z, s, t, nx, ny, nz float32 vertices
+        :param indices: Indices of the vertices of each triangle
+        """
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        self.vertex_count = vertices.size // 8
+        self.center, self.radius = self.bounding_sphere(vertices.reshape(-1, 8)[:, :3])
+
+        indices = self.compact_indices(indices, self.vertex_count)
+        self.index_type = GL_UNSIGNED_SHORT if indices.dtype == np.uint16 else GL_UNSIGNED_INT
+        self.index_count = indices.size
+
+        GL_STATE.bind_vertex_array(self.vao)
+        GL_STATE.bind_buffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+
+    @staticmethod
+    def bounding_sphere(positions: np.ndarray) -> tuple[np.ndarray, float]:
+        """
+        Returns the center and the radius of a sphere holding every vertex, centered on their bounding box
+        :param positions: N x 3 vertex positions
+        """
+        if len(positions) == 0:
+            return np.zeros(3, dtype=np.float32), 0.0
+
+        center = (positions.min(axis=0) + positions.max(axis=0)) / 2
+        radius = float(np.sqrt(np.max(np.sum((positions - center) ** 2, axis=1))))
+        return center.astype(np.float32), radius
+
+    @staticmethod
+    def compact_indices(indices: np.ndarray, vertex_count: int) -> np.ndarray:
+        """
+        Returns the indices as contiguous uint16 when every vertex can be addressed with them, uint32 otherwise
+        :param indices: Indices of the vertices of each triangle
+        :param vertex_count: Number of vertices
+        """
+        dtype = np.uint16 if vertex_count <= 0xFFFF else np.uint32
+        return np.ascontiguousarray(indices, dtype=dtype)
+
     def arm_for_drawing(self) -> None:
         """
         Arm the triangle for drawing
         """
-        glBindVertexArray(self.vao)
+        GL_STATE.bind_vertex_array(self.vao)
 
     def draw(self) -> None:
         """
         Draw the triangle
         """
-        glDrawArrays(GL_TRIANGLES, 0, self.vertex_count)
+        GL_CALLS.glDrawElements(GL_TRIANGLES, self.index_count, self.index_type, None)
+
+    def bind_instances(self, buffer: int, models: int, colors: int = None, layers: int = None) -> None:
+        """
+        Read the per instance data from a buffer, the mesh must be armed for drawing
+        :param buffer: Buffer holding the instance data
+        :param models: Offset of the N x 4 x 4 float32 model transforms
+        :param colors: Offset of the N x 3 float32 colors, only needed by pipelines reading them
+        :param layers: Offset of the N float32 texture array layers, only needed with texture arrays
+        """
+        GL_STATE.bind_buffer(GL_ARRAY_BUFFER, buffer)
+        for i in range(4):
+            GL_CALLS.glEnableVertexAttribArray(3 + i)
+            GL_CALLS.glVertexAttribPointer(3 + i, 4, GL_FLOAT, GL_FALSE, 64, models + 16 * i)
+
+        for location, offset, size in ((7, colors, 3), (8, layers, 1)):
+            if offset is None:
+                GL_CALLS.glDisableVertexAttribArray(location)
+                continue
+            GL_CALLS.glEnableVertexAttribArray(location)
+            GL_CALLS.glVertexAttribPointer(location, size, GL_FLOAT, GL_FALSE, 4 * size, offset)
+
+    def draw_instanced(self, instance_count: int) -> None:
+        """
+        Draw the triangle once per uploaded instance in a single draw call
+        :param instance_count: Number of instances to draw
+        """
+        GL_CALLS.glDrawElementsInstanced(GL_TRIANGLES, self.index_count, self.index_type, None, instance_count)
 
     def destroy(self) -> None:
         """
         Free the memory
         """
+        GL_STATE.forget_vertex_array(self.vao)
+        GL_STATE.forget_buffer(self.vbo)
+        GL_STATE.forget_buffer(self.ebo)
         glDeleteVertexArrays(1, (self.vao,))
-        glDeleteBuffers(1, (self.vbo,))
+        glDeleteBuffers(2, (self.vbo, self.ebo))
@@ -0,0 +1,167 @@
+import hashlib
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from model.cache_file import CacheFormat
+
+
+class CachedMesh:
+    """
+    Vertex and index data of a compiled mesh, viewed directly from the memory mapped cache file
+    """
+    __slots__ = ('_file', '_map', 'vertices', 'indices')
+
+    def __init__(self, file, mapping: mmap.mmap, vertices: np.ndarray, indices: np.ndarray):
+        """
+        Initialize the cached mesh
+        :param file: Opened cache file
+        :param mapping: Memory map of the whole file
+        :param vertices: N x 8 float32 view on the vertex blob
+        :param indices: View on the index blob
+        """
+        self._file = file
+        self._map = mapping
+        self.vertices = vertices
+        self.indices = indices
+
+    def __enter__(self) -> 'CachedMesh':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Drop the views and unmap the file
+        """
+        self.vertices = None
+        self.indices = None
+        self._map.close()
+        self._file.close()
+
+
+class MeshCache:
+    """
+    On disk cache of parsed meshes, one file per source holding a header followed by raw float32 vertices
+    and raw indices. A file is valid only if the content hash of its source still matches.
+    """
+    __slots__ = ('directory',)
+
+    # source size, source mtime, source hash, vertex count, index count, index size.
+    # The version is bumped when the loader parses files differently, cache files of older versions are parsed again
+    FORMAT = CacheFormat(b'MESHBIN\0', 2, f'QQ{CacheFormat.HASH_SIZE}sQQI', data_offset=128)
+    # Size and modification time of the source, the first fields of the header, rewritten in place
+    SOURCE_STAT = struct.Struct('<QQ')
+
+    def __init__(self, directory: str):
+        """
+        Initialize the cache
+        :param directory: Directory holding the cache files, created when needed
+        """
+        self.directory = directory
+
+    def path(self, filepath: str) -> str:
+        """
+        Returns the path of the cache file of a source file
+        :param filepath: Path to the source file
+        """
+        name = hashlib.blake2b(os.path.abspath(filepath).encode(), digest_size=8).hexdigest()
+        return os.path.join(self.directory, f"{os.path.basename(filepath)}.{name}.mesh")
+
+    @staticmethod
+    def hash_file(filepath: str) -> bytes:
+        """
+        Returns the content hash of a file
+        :param filepath: Path to the file
+        """
+        digest = CacheFormat.hash()
+        with open(filepath, 'rb') as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+        return digest.digest()
+
+    def open(self, filepath: str) -> CachedMesh | None:
+        """
+        Returns the cached mesh of a source file, or None when there is no valid cache file
+        :param filepath: Path to the source file
+        """
+        try:
+            return self._open(filepath)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def _open(self, filepath: str) -> CachedMesh | None:
+        """
+        Map the cache file and check it against its source, raises ValueError on corrupt files
+        :param filepath: Path to the source file
+        """
+        stat = os.stat(filepath)
+        file = open(self.path(filepath), 'rb')
+        try:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            file.close()
+            raise
+
+        try:
+            (source_size, source_mtime, source_hash,
+             vertex_count, index_count, index_size, crc) = self.FORMAT.unpack(mapping)
+            if index_size not in (2, 4):
+                raise ValueError("Unknown mesh cache format")
+
+            data_offset = self.FORMAT.data_offset
+            vertex_bytes = 32 * vertex_count
+            if len(mapping) != data_offset + vertex_bytes + index_size * index_count:
+                raise ValueError("Truncated mesh cache")
+
+            # Hashing the source is only needed when it was touched since the cache was written
+            if (source_size, source_mtime) != (stat.st_size, stat.st_mtime_ns):
+                if source_hash != self.hash_file(filepath):
+                    mapping.close()
+                    file.close()
+                    return None
+                self._refresh_source_stat(filepath, stat)
+
+            self.FORMAT.check(mapping, crc)
+        except (ValueError, struct.error):
+            mapping.close()
+            file.close()
+            raise
+
+        vertices = np.frombuffer(mapping, dtype=np.float32, count=8 * vertex_count, offset=data_offset)
+        indices = np.frombuffer(mapping, dtype=np.uint16 if index_size == 2 else np.uint32,
+                                count=index_count, offset=data_offset + vertex_bytes)
+
+        return CachedMesh(file, mapping, vertices.reshape(-1, 8), indices)
+
+    def _refresh_source_stat(self, filepath: str, stat: os.stat_result) -> None:
+        """
+        Store the new size and modification time of a source whose content did not change
+        :param filepath: Path to the source file
+        :param stat: Current stat of the source file
+        """
+        with open(self.path(filepath), 'r+b') as f:
+            f.seek(CacheFormat.FIELDS_OFFSET)
+            f.write(self.SOURCE_STAT.pack(stat.st_size, stat.st_mtime_ns))
+
+    def store(self, filepath: str, vertices: np.ndarray, indices: np.ndarray) -> None:
+        """
+        Write the cache file of a source file, failures only mean the next launch parses the source again
+        :param filepath: Path to the source file
+        :param vertices: N x 8 float32 vertices
+        :param indices: uint16 or uint32 indices
+        """
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        indices = np.ascontiguousarray(indices)
+
+        try:
+            stat = os.stat(filepath)
+            source_hash = self.hash_file(filepath)
+        except OSError:
+            return None
+
+        fields = (stat.st_size, stat.st_mtime_ns, source_hash, len(vertices), indices.size, indices.itemsize)
+        self.FORMAT.write(self.path(filepath), fields, vertices, indices)
@@ -0,0 +1,307 @@
+import numpy as np
+
+
+class ObjLoader:
+    """
+    Bulk OBJ parser, the file is read in large chunks and every record kind is parsed at once with NumPy
+    """
+    __slots__ = ('filepath', 'chunk_size', 'v', 'vt', 'vn', 'corners', 'face_sizes', 'counts')
+
+    def __init__(self, filepath: str, chunk_size: int = 1 << 24):
+        """
+        Initialize the loader
+        :param filepath: Path to the file
+        :param chunk_size: Number of bytes read at once, bounds the memory used by the text
+        """
+        self.filepath = filepath
+        self.chunk_size = chunk_size
+
+        # Parsed data of every chunk, concatenated once the whole file is read
+        self.v: list[np.ndarray] = []
+        self.vt: list[np.ndarray] = []
+        self.vn: list[np.ndarray] = []
+        self.corners: list[np.ndarray] = []
+        self.face_sizes: list[np.ndarray] = []
+
+        # Number of v, vt and vn records read so far, needed to resolve negative indices
+        self.counts = np.zeros(3, dtype=np.int64)
+
+    def load(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the unique interleaved x, y, z, s, t, nx, ny, nz float32 vertices and the uint32 triangle indices
+        """
+        with open(self.filepath, 'rb') as f:
+            remainder = b''
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+
+                # Only complete lines are parsed, the partial last line is kept for the next chunk
+                data = remainder + data
+                cut = data.rfind(b'\n') + 1
+                remainder = data[cut:]
+                if cut:
+                    self.parse_chunk(data[:cut])
+
+            if remainder:
+                self.parse_chunk(remainder + b'\n')
+
+        v = self._concatenate(self.v, (0, 3), np.float32)
+        vt = self._concatenate(self.vt, (0, 2), np.float32)
+        vn = self._concatenate(self.vn, (0, 3), np.float32)
+        corners = self._concatenate(self.corners, (0, 3), np.int32)
+        face_sizes = self._concatenate(self.face_sizes, (0,), np.int64)
+
+        triangles = self.triangulate(face_sizes)
+        corners, vt, vn = self.fill_missing(v, vt, vn, corners, face_sizes)
+
+        return self.deduplicate(v, vt, vn, corners[triangles.reshape(-1)])
+
+    @staticmethod
+    def _concatenate(arrays: list[np.ndarray], empty_shape: tuple[int, ...], dtype: type) -> np.ndarray:
+        """
+        Returns the concatenation of the arrays, or an empty array of the given shape
+        """
+        if not arrays:
+            return np.zeros(empty_shape, dtype=dtype)
+        return np.concatenate(arrays)
+
+    def parse_chunk(self, data: bytes) -> None:
+        """
+        Parse every v, vt, vn and f record of a chunk made of complete lines
+        :param data: Bytes of the chunk, ending with a new line
+        """
+        buffer = np.frombuffer(data, dtype=np.uint8)
+
+        # Line boundaries, every line keeps its trailing new line so no line is empty
+        ends = np.flatnonzero(buffer == ord('\n')) + 1
+        starts = np.concatenate(([0], ends[:-1]))
+        lengths = ends - starts
+
+        # Comments run from a # to the end of the line, they are blanked before counting and parsing the tokens
+        hashes = buffer == ord('#')
+        if hashes.any():
+            last_hash = np.maximum.accumulate(np.where(hashes, np.arange(len(buffer)), -1))
+            comment = (last_hash >= np.repeat(starts, lengths)) & (buffer != ord('\n'))
+            buffer = np.where(comment, np.uint8(ord(' ')), buffer)
+
+        # Number of whitespace separated tokens of each line
+        is_space = buffer <= ord(' ')
+        token_starts = ~is_space
+        token_starts[1:] &= is_space[:-1]
+        tokens = np.add.reduceat(token_starts, starts, dtype=np.int32)
+
+        # Classify records from their first characters
+        padded = np.concatenate((buffer, np.zeros(2, dtype=np.uint8)))
+        first = padded[starts]
+        second = padded[starts + 1]
+        third = padded[starts + 2]
+
+        is_v = (first == ord('v')) & (second <= ord(' '))
+        is_vt = (first == ord('v')) & (second == ord('t')) & (third <= ord(' '))
+        is_vn = (first == ord('v')) & (second == ord('n')) & (third <= ord(' '))
+        is_f = (first == ord('f')) & (second <= ord(' '))
+
+        # Blank the keywords so whole records can be handed to the number parser
+        text = buffer.copy()
+        text[starts] = ord(' ')
+        text[starts[is_vt | is_vn] + 1] = ord(' ')
+
+        # Number of v, vt and vn records defined before each line
+        before = np.stack((np.cumsum(is_v), np.cumsum(is_vt), np.cumsum(is_vn)), axis=1)
+        before -= np.stack((is_v, is_vt, is_vn), axis=1)
+        before += self.counts
+
+        self.v.append(self.read_data(text, lengths, is_v, tokens[is_v] - 1, 3))
+        self.vt.append(self.read_data(text, lengths, is_vt, tokens[is_vt] - 1, 2))
+        self.vn.append(self.read_data(text, lengths, is_vn, tokens[is_vn] - 1, 3))
+        self.counts += (is_v.sum(), is_vt.sum(), is_vn.sum())
+
+        if is_f.any():
+            self.read_face_data(text, lengths, is_f, tokens[is_f] - 1, before[is_f])
+
+    @staticmethod
+    def gather(text: np.ndarray, lengths: np.ndarray, lines: np.ndarray) -> bytes:
+        """
+        Returns the concatenation of the selected lines
+        :param text: Bytes of the chunk
+        :param lengths: Length of each line, new line included
+        :param lines: Mask of the selected lines
+        """
+        return text[np.repeat(lines, lengths)].tobytes()
+
+    def read_data(self,
+                  text: np.ndarray,
+                  lengths: np.ndarray,
+                  lines: np.ndarray,
+                  sizes: np.ndarray,
+                  width: int) -> np.ndarray:
+        """
+        Returns the first components of every selected record as a N x width float32 array
+        :param text: Bytes of the chunk, keywords blanked
+        :param lengths: Length of each line
+        :param lines: Mask of the selected records
+        :param sizes: Number of values of each selected record
+        :param width: Number of values kept, missing ones are set to zero
+        """
+        if len(sizes) == 0:
+            return np.zeros((0, width), dtype=np.float32)
+
+        values = np.fromstring(self.gather(text, lengths, lines), dtype=np.float32, sep=' ')
+
+        if np.all(sizes == width):
+            return values.reshape(-1, width)
+
+        # Records with extra values (vertex colors, w components) or fewer values
+        offsets = np.cumsum(sizes) - sizes
+        columns = np.arange(width)
+        valid = columns[None, :] < sizes[:, None]
+        indices = np.where(valid, offsets[:, None] + columns[None, :], 0)
+        return np.where(valid, values[indices], 0.0).astype(np.float32)
+
+    def read_face_data(self,
+                       text: np.ndarray,
+                       lengths: np.ndarray,
+                       lines: np.ndarray,
+                       sizes: np.ndarray,
+                       before: np.ndarray) -> None:
+        """
+        Store the (v, vt, vn) indices of every face corner, -1 marks a missing index
+        :param text: Bytes of the chunk, keywords blanked
+        :param lengths: Length of each line
+        :param lines: Mask of the face records
+        :param sizes: Number of corners of each face
+        :param before: Number of v, vt and vn records defined before each face
+        """
+        data = np.frombuffer(self.gather(text, lengths, lines), dtype=np.uint8)
+
+        # First byte of every corner, the bytes up to the next one belong to the corner
+        is_space = data <= ord(' ')
+        corner_starts = ~is_space
+        corner_starts[1:] &= is_space[:-1]
+        corner_starts = np.flatnonzero(corner_starts)
+        count = int(sizes.sum())
+
+        # Layout of each corner from its own slashes: v, v/vt, v//vn or v/vt/vn
+        is_slash = data == ord('/')
+        is_double = np.zeros_like(is_slash)
+        is_double[:-1] = is_slash[:-1] & is_slash[1:]
+        slashes = np.add.reduceat(is_slash, corner_starts, dtype=np.int32)
+        doubles = np.add.reduceat(is_double, corner_starts, dtype=np.int32)
+        layouts = np.where(doubles > 0, 2, np.minimum(slashes, 2) + (slashes == 2))
+
+        # Slashes become separators, a double slash is a single one so v//vn has two values
+        text = data.copy()
+        text[is_slash] = ord(' ')
+        values = np.fromstring(text.tobytes(), dtype=np.int32, sep=' ')
+
+        columns = ((0,), (0, 1), (0, 2), (0, 1, 2))
+        widths = np.array([len(c) for c in columns])[layouts]
+        if len(values) != widths.sum():
+            raise ValueError(f"{self.filepath}: malformed face corners")
+
+        corners = np.full((count, 3), -1, dtype=np.int32)
+        present = np.zeros((count, 3), dtype=bool)
+        offsets = np.cumsum(widths) - widths
+        for layout, layout_columns in enumerate(columns):
+            selected = np.flatnonzero(layouts == layout)
+            if len(selected) == 0:
+                continue
+            for i, column in enumerate(layout_columns):
+                corners[selected, column] = values[offsets[selected] + i]
+            present[np.ix_(selected, layout_columns)] = True
+
+        # OBJ indices start at 1, negative ones are relative to the records defined so far
+        relative = present & (corners < 0)
+        corners -= 1
+        corners[relative] += np.repeat(before.astype(np.int32), sizes, axis=0)[relative] + 1
+        corners[~present] = -1
+
+        self.corners.append(corners)
+        self.face_sizes.append(sizes)
+
+    @staticmethod
+    def triangulate(face_sizes: np.ndarray) -> np.ndarray:
+        """
+        Returns the corner indices of a fan triangulation of every face, as a N x 3 array
+        :param face_sizes: Number of corners of each face
+        """
+        face_starts = np.cumsum(face_sizes) - face_sizes
+        triangle_counts = np.maximum(face_sizes - 2, 0)
+
+        faces = np.repeat(np.arange(len(face_sizes)), triangle_counts)
+        first = np.cumsum(triangle_counts) - triangle_counts
+        local = np.arange(triangle_counts.sum()) - np.repeat(first, triangle_counts) + 1
+
+        origin = face_starts[faces]
+        return np.stack((origin, origin + local, origin + local + 1), axis=1)
+
+    @staticmethod
+    def fill_missing(v: np.ndarray,
+                     vt: np.ndarray,
+                     vn: np.ndarray,
+                     corners: np.ndarray,
+                     face_sizes: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the corners, texture coordinates and normals with missing data filled,
+        corners without texture coordinates use (0, 0) and faces without normals get a flat normal
+        :param v: Positions
+        :param vt: Texture coordinates
+        :param vn: Normals
+        :param corners: N x 3 array of (v, vt, vn) indices
+        :param face_sizes: Number of corners of each face
+        """
+        missing = corners[:, 1] < 0
+        if missing.any():
+            corners[missing, 1] = len(vt)
+            vt = np.concatenate((vt, np.zeros((1, 2), dtype=np.float32)))
+
+        missing = corners[:, 2] < 0
+        if missing.any():
+            # Normal of the first triangle of every face
+            face_starts = np.cumsum(face_sizes) - face_sizes
+            last = face_starts + np.maximum(face_sizes, 1) - 1
+            a, b, c = (v[corners[np.minimum(face_starts + i, last), 0]] for i in range(3))
+            normals = np.cross(b - a, c - a)
+            lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+            normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+            faces = np.repeat(np.arange(len(face_sizes)), face_sizes)
+            corners[missing, 2] = len(vn) + faces[missing]
+            vn = np.concatenate((vn, normals.astype(np.float32)))
+
+        return corners, vt, vn
+
+    @staticmethod
+    def deduplicate(v: np.ndarray,
+                    vt: np.ndarray,
+                    vn: np.ndarray,
+                    corners: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns one interleaved vertex per distinct (v, vt, vn) tuple and the index of each corner,
+        vertices keep the order of their first use so the post transform cache still sees neighbours together
+        :param v: Positions
+        :param vt: Texture coordinates
+        :param vn: Normals
+        :param corners: N x 3 array of (v, vt, vn) indices, one row per triangle corner
+        """
+        # Pack each tuple in a single integer when it fits, sorting 1D keys is much faster than rows
+        sizes = np.array((len(v), len(vt), len(vn)), dtype=np.int64) + 1
+        if np.prod(sizes.astype(np.float64)) < 2 ** 62:
+            keys = (corners[:, 0].astype(np.int64) * sizes[1] + corners[:, 1]) * sizes[2] + corners[:, 2]
+            _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        else:
+            _, first, inverse = np.unique(corners, axis=0, return_index=True, return_inverse=True)
+
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+
+        unique_corners = corners[first[order]]
+        vertices = np.empty((len(unique_corners), 8), dtype=np.float32)
+        vertices[:, 0:3] = v[unique_corners[:, 0]]
+        vertices[:, 3:5] = vt[unique_corners[:, 1]]
+        vertices[:, 5:8] = vn[unique_corners[:, 2]]
+
+        return vertices, rank[inverse.reshape(-1)].astype(np.uint32)
@@ -1,14 +1,16 @@
 import numpy as np
-from OpenGL.GL import *
 
 from model.mesh import Mesh
+from model.mesh_cache import MeshCache
+from model.obj_loader import ObjLoader
+from settings import MESH_CACHE_DIR
 
 
 class ObjMesh(Mesh):
     """
     Basic mesh initialized from OBJ file
     """
-    __slots__ = ('vao', 'vbo', 'vertex_count')
+    __slots__ = ()
 
     def __init__(self, filepath: str):
         """
@@ -17,53 +19,25 @@ class ObjMesh(Mesh):
         """
         super().__init__()
 
-        # x, y, z, s, t, nx, ny, nz
-        vertices = self.load_mesh(filepath)
-        self.vertex_count = len(vertices) // 8
-        vertices = np.array(vertices, dtype=np.float32)
-
-        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
-
-    def load_mesh(self, filepath: str) -> list[float]:
-        v = []
-        vt = []
-        vn = []
+        # The memory mapped cache file is handed to the driver without any copy
+        cache = MeshCache(MESH_CACHE_DIR)
+        cached = cache.open(filepath)
+        if cached is not None:
+            with cached:
+                self.upload(cached.vertices, cached.indices)
+            return None
 
-        vertices = []
-        with open(filepath, 'r') as f:
-            line = f.readline()
-            while line:
-                words = line.split(' ')
-                if words[0] == 'v':
-                    v.append(self.read_data(words))
-                if words[0] == 'vt':
-                    vt.append(self.read_data(words))
-                if words[0] == 'vn':
-                    vn.append(self.read_data(words))
-                if words[0] == 'f':
-                    self.read_face_data(words, v, vt, vn, vertices)
-                line = f.readline()
-
-        return vertices
+        # x, y, z, s, t, nx, ny, nz
+        vertices, indices = self.load_mesh(filepath)
+        indices = self.compact_indices(indices, len(vertices))
 
-    @staticmethod
-    def read_data(words: list[str]) -> list[float]:
-        return [float(w) for w in words[1:]]
+        self.upload(vertices, indices)
+        cache.store(filepath, vertices, indices)
 
     @staticmethod
-    def read_face_data(words: list[str],
-                       v: list[list[float]],
-                       vt: list[list[float]],
-                       vn: list[list[float]],
-                       vertices: list[float]) -> None:
-        for w in words[1:]:
-            idx = [int(e) - 1 for e in w.split('/')]
-
-            for element in v[idx[0]]:
-                vertices.append(element)
-
-            for element in vt[idx[1]]:
-                vertices.append(element)
-
-            for element in vn[idx[2]]:
-                vertices.append(element)
+    def load_mesh(filepath: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the unique vertices of the mesh and the indices of each triangle corner
+        :param filepath: Path to the file
+        """
+        return ObjLoader(filepath).load()
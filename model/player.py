@@ -9,7 +9,7 @@ class Player(Entity):
     """
     A player entity
     """
-    __slots__ = ('position', 'eulers', 'forwards', 'right', 'up', 'velocity', 'sensitivity')
+    __slots__ = ('forwards', 'right', 'up', 'velocity', 'sensitivity', 'view')
 
     def __init__(self, position: list | tuple | np.ndarray, velocity: float = 0.005, sensitivity: float = 0.2):
         """
@@ -24,16 +24,34 @@ class Player(Entity):
         self.right = None
         self.up = None
 
+        # View transform, built again only after the player moved or turned
+        self.view = None
+
+        # The camera basis is ready before the player is first moved
+        self.update(0.0)
+
     def update(self, dt: float, camera_pos: np.ndarray = None) -> None:
         """
-        Update the player's camera
+        Update the player's camera, nothing is done when the player did not move or turn since the last update
         :param dt: Delta time
         :param camera_pos: Camera position (unused)
         """
-        theta = self.eulers[2]
-        phi = self.eulers[1]
+        if len(self.store.update()) == 0:
+            return None
+
+        self.view = None
+        self.forwards, self.right, self.up = self.basis(self.eulers)
+
+    @staticmethod
+    def basis(eulers: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the forwards, right and up directions of the camera
+        :param eulers: Orientation of the camera
+        """
+        theta = eulers[2]
+        phi = eulers[1]
 
-        self.forwards = np.array(
+        forwards = np.array(
             [
                 np.cos(np.deg2rad(theta)) * np.cos(np.deg2rad(phi)),
                 np.sin(np.deg2rad(theta)) * np.cos(np.deg2rad(phi)),
@@ -41,33 +59,58 @@ class Player(Entity):
             ],
             dtype=np.float32)
 
-        self.right = np.cross(self.forwards, GLOBAL_Z)
-        self.up = np.cross(self.right, self.forwards)
+        right = np.cross(forwards, GLOBAL_Z)
+        up = np.cross(right, forwards)
+        return forwards, right, up
 
-    def get_view_transform(self) -> np.ndarray:
+    def interpolate(self, alpha: float) -> None:
         """
-        Returns the view transformation matrix
+        Place and orientate the camera between its previous and current states, if it moved during the last update
+        :param alpha: Fraction of the way from the previous to the current state
         """
-        view_transform = pyrr.matrix44.create_look_at(
-            eye=self.position,
-            target=self.position + self.forwards,
-            up=self.up,
+        if len(self.store.interpolate(alpha)) == 0:
+            return None
+
+        # Angles go the short way round, as for the model transforms
+        previous = self.store.previous_eulers[self.index]
+        turns = (self.eulers - previous + 180.0) % 360.0 - 180.0
+        forwards, _, up = self.basis(previous + alpha * turns)
+
+        eye = self.store.models[self.index, 3, :3]
+        self.view = pyrr.matrix44.create_look_at(
+            eye=eye,
+            target=eye + forwards,
+            up=up,
             dtype=np.float32
         )
-        return view_transform
+
+    def get_view_transform(self) -> np.ndarray:
+        """
+        Returns the view transformation matrix
+        """
+        if self.view is None:
+            self.view = pyrr.matrix44.create_look_at(
+                eye=self.position,
+                target=self.position + self.forwards,
+                up=self.up,
+                dtype=np.float32
+            )
+        return self.view
 
     def move(self, dpos: list | tuple | np.ndarray) -> None:
         """
         Move the player by the given amount
         :param dpos: Displacement vector
         """
-        self.position += dpos[0] * self.forwards + dpos[1] * self.right + dpos[2] * self.up
+        position = self.position + dpos[0] * self.forwards + dpos[1] * self.right + dpos[2] * self.up
 
-        self.position[2] = 3
+        position[2] = 3
+        self.position = position
 
     def spin(self, deulers: list | tuple | np.ndarray) -> None:
-        self.eulers += deulers
+        eulers = self.eulers + deulers
 
-        self.eulers[0] %= 360
-        self.eulers[1] = min(89.0, max(-89.0, self.eulers[1]))
-        self.eulers[2] %= 360
+        eulers[0] %= 360
+        eulers[1] = min(89.0, max(-89.0, eulers[1]))
+        eulers[2] %= 360
+        self.eulers = eulers
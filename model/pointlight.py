@@ -1,21 +1,77 @@
 import numpy as np
 
 from model.billboard import BillBoard
+from model.light_store import LightStore
+from settings import LIGHT_CUTOFF
 
 
 class PointLight(BillBoard):
     """
     Simple point light
     """
-    __slots__ = ('position', 'eulers', 'color', 'strength')
+    __slots__ = ()
 
-    def __init__(self, position: list | tuple | np.ndarray, color: list | tuple | np.ndarray, strength: float):
+    def __init__(self,
+                 position: list | tuple | np.ndarray,
+                 color: list | tuple | np.ndarray,
+                 strength: float,
+                 radius: float = None,
+                 store: LightStore = None):
         """
         Initialize the light
         :param position: Position of the light in the scene
         :param color: Color of the light as (r,g,b) tuple
         :param strength: Strength of the light
+        :param radius: Distance past which the light is ignored, derived from the strength if not given
+        :param store: Light store holding the light data, a private one is created if not given
         """
-        super().__init__(position)
-        self.color = np.array(color, dtype=np.float32)
+        super().__init__(position, store if store is not None else LightStore(capacity=1))
+        self.color = color
         self.strength = strength
+        self.radius = radius if radius is not None else self.influence_radius(strength)
+
+    @staticmethod
+    def influence_radius(strength: float) -> float:
+        """
+        Returns the distance at which the light falls under the cutoff
+        :param strength: Strength of the light
+        """
+        return float(np.sqrt(strength / LIGHT_CUTOFF))
+
+    @property
+    def color(self) -> np.ndarray:
+        """
+        Returns a read only view on the color of the light, assign the property to change it
+        """
+        color = self.store.colors[self.index]
+        color.flags.writeable = False
+        return color
+
+    @color.setter
+    def color(self, value: list | tuple | np.ndarray) -> None:
+        self.store.mark_dirty(self.index)
+        self.store.colors[self.index] = value
+
+    @property
+    def strength(self) -> float:
+        """
+        Returns the strength of the light
+        """
+        return float(self.store.strengths[self.index])
+
+    @strength.setter
+    def strength(self, value: float) -> None:
+        self.store.mark_dirty(self.index)
+        self.store.strengths[self.index] = value
+
+    @property
+    def radius(self) -> float:
+        """
+        Returns the influence radius of the light
+        """
+        return float(self.store.radii[self.index])
+
+    @radius.setter
+    def radius(self, value: float) -> None:
+        self.store.mark_dirty(self.index)
+        self.store.radii[self.index] = value
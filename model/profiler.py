@@ -0,0 +1,287 @@
+import json
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+from OpenGL.GL import *
+
+
+class ProfileScope:
+    """
+    Context manager timing one named phase of a frame
+    """
+    __slots__ = ('profiler', 'name', 'gpu', 'start', 'query')
+
+    def __init__(self, profiler: 'Profiler', name: int, gpu: bool):
+        """
+        Initialize the scope
+        :param profiler: Profiler recording the samples
+        :param name: Index of the name of the phase in the profiler
+        :param gpu: Also time the GL commands of the phase on the GPU
+        """
+        self.profiler = profiler
+        self.name = name
+        self.gpu = gpu
+        self.start = 0
+        self.query = None
+
+    def __enter__(self) -> 'ProfileScope':
+        profiler = self.profiler
+        profiler.depth += 1
+
+        # Time elapsed queries can not be nested, only the outermost GPU scope is timed on the GPU
+        if self.gpu and profiler.gpu_available and profiler.gpu_scope is None:
+            profiler.gpu_scope = self
+            self.query = profiler.acquire_query()
+            glBeginQuery(GL_TIME_ELAPSED, self.query)
+
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter_ns()
+        profiler = self.profiler
+        profiler.depth -= 1
+        profiler.record(self.name, profiler.frame, self.start, end - self.start, profiler.depth, False)
+
+        if self.query is not None:
+            glEndQuery(GL_TIME_ELAPSED)
+            profiler.pending.append((self.query, self.name, self.start, profiler.frame, profiler.depth))
+            profiler.gpu_scope = None
+            self.query = None
+
+
+class Profiler:
+    """
+    Time the phases of every frame on the CPU, and on the GPU with time elapsed queries read back without waiting.
+    Samples are kept in fixed size ring buffers, the oldest samples are overwritten.
+    When disabled, scopes are shared no-op context managers.
+    """
+    __slots__ = ('enabled', 'capacity', 'names', 'scopes', 'frame', 'frame_start', 'depth',
+                 'head', 'sample_names', 'sample_frames', 'sample_starts', 'sample_durations',
+                 'sample_depths', 'sample_gpu', 'frame_head', 'frame_starts', 'frame_durations',
+                 'gpu_available', 'gpu_scope', 'queries', 'pending')
+
+    # Shared by every scope of a disabled profiler
+    NULL_SCOPE = nullcontext()
+
+    def __init__(self, enabled: bool = False, capacity: int = 65536, gpu: bool = True):
+        """
+        Initialize the profiler, GPU timing needs a current OpenGL context
+        :param enabled: Record samples, scopes do nothing otherwise
+        :param capacity: Number of samples, and of frames, kept
+        :param gpu: Time the GPU scopes with queries
+        """
+        self.enabled = enabled
+        self.capacity = max(1, capacity)
+
+        # Phase names, samples refer to them by index
+        self.names: list[str] = []
+        self.scopes: dict[tuple[str, bool], ProfileScope] = {}
+
+        self.frame = 0
+        self.frame_start = 0
+        self.depth = 0
+
+        # Ring buffer of the samples, head counts every sample ever recorded
+        self.head = 0
+        self.sample_names = np.zeros(self.capacity, dtype=np.int32)
+        self.sample_frames = np.zeros(self.capacity, dtype=np.int64)
+        self.sample_starts = np.zeros(self.capacity, dtype=np.int64)
+        self.sample_durations = np.zeros(self.capacity, dtype=np.int64)
+        self.sample_depths = np.zeros(self.capacity, dtype=np.int8)
+        self.sample_gpu = np.zeros(self.capacity, dtype=bool)
+
+        # Ring buffer of the whole frames
+        self.frame_head = 0
+        self.frame_starts = np.zeros(self.capacity, dtype=np.int64)
+        self.frame_durations = np.zeros(self.capacity, dtype=np.int64)
+
+        self.gpu_available = gpu and enabled and bool(glGetQueryiv(GL_TIME_ELAPSED, GL_QUERY_COUNTER_BITS))
+        self.gpu_scope = None
+
+        # Unused query objects, and queries whose result was not read yet, oldest first
+        self.queries: list[int] = []
+        self.pending: list[tuple[int, int, int, int, int]] = []
+
+    def scope(self, name: str, gpu: bool = False) -> ProfileScope | nullcontext:
+        """
+        Returns a context manager timing a phase
+        :param name: Name of the phase
+        :param gpu: Also time the GL commands issued in the phase on the GPU
+        """
+        if not self.enabled:
+            return self.NULL_SCOPE
+
+        scope = self.scopes.get((name, gpu))
+        if scope is None:
+            if name not in self.names:
+                self.names.append(name)
+            scope = ProfileScope(self, self.names.index(name), gpu)
+            self.scopes[(name, gpu)] = scope
+        return scope
+
+    def begin_frame(self) -> None:
+        """
+        Start timing a frame
+        """
+        if not self.enabled:
+            return None
+
+        self.frame_start = time.perf_counter_ns()
+
+    def end_frame(self) -> None:
+        """
+        Stop timing a frame, and read the GPU results that are available
+        """
+        if not self.enabled:
+            return None
+
+        index = self.frame_head % self.capacity
+        self.frame_starts[index] = self.frame_start
+        self.frame_durations[index] = time.perf_counter_ns() - self.frame_start
+        self.frame_head += 1
+        self.frame += 1
+
+        self.collect()
+
+    def reset(self) -> None:
+        """
+        Forget the recorded samples and frames, and the results of the pending GPU queries, between two frames
+        """
+        self.head = 0
+        self.frame_head = 0
+
+        # A query can be begun again before its result is read, the result is then discarded
+        self.queries.extend(query for query, *_ in self.pending)
+        self.pending.clear()
+
+    def record(self, name: int, frame: int, start: int, duration: int, depth: int, gpu: bool) -> None:
+        """
+        Add a sample to the ring buffer
+        :param name: Index of the name of the phase
+        :param frame: Frame the phase belongs to
+        :param start: CPU time at which the phase started, in nanoseconds
+        :param duration: Duration of the phase, in nanoseconds
+        :param depth: Number of scopes the phase is nested in
+        :param gpu: Whether the duration was measured on the GPU
+        """
+        index = self.head % self.capacity
+        self.sample_names[index] = name
+        self.sample_frames[index] = frame
+        self.sample_starts[index] = start
+        self.sample_durations[index] = duration
+        self.sample_depths[index] = depth
+        self.sample_gpu[index] = gpu
+        self.head += 1
+
+    def acquire_query(self) -> int:
+        """
+        Returns an unused query object
+        """
+        if not self.queries:
+            self.queries.extend(int(query) for query in glGenQueries(16))
+        return self.queries.pop()
+
+    def collect(self) -> None:
+        """
+        Record the results of the finished GPU queries, without waiting for the others
+        """
+        # Queries finish in order, the first one not available ends the search
+        done = 0
+        result = GLuint64()
+        for query, name, start, frame, depth in self.pending:
+            if not glGetQueryObjectiv(query, GL_QUERY_RESULT_AVAILABLE):
+                break
+            # The elapsed nanoseconds are read in 64 bits, 32 bits only hold 4 seconds.
+            # PyOpenGL has no array type for GLuint64, the result goes through an explicit output
+            glGetQueryObjectui64v(query, GL_QUERY_RESULT, result)
+            self.record(name, frame, start, int(result.value), depth, True)
+            self.queries.append(query)
+            done += 1
+        del self.pending[:done]
+
+    def _samples(self) -> slice:
+        """
+        Returns the slice of the ring buffer holding samples
+        """
+        return slice(0, min(self.head, self.capacity))
+
+    def _frames(self) -> slice:
+        """
+        Returns the slice of the frame ring buffer holding frames
+        """
+        return slice(0, min(self.frame_head, self.capacity))
+
+    def summary(self, percentiles: tuple[float, ...] = (50, 95, 99)) -> dict[str, dict[str, float]]:
+        """
+        Returns percentiles of the frame times and of the duration of every phase, in milliseconds
+        :param percentiles: Percentiles computed
+        """
+        def describe(durations: np.ndarray) -> dict[str, float]:
+            values = np.percentile(durations / 1e6, percentiles) if len(durations) else [0.0] * len(percentiles)
+            stats = {'count': len(durations)}
+            stats.update({f'p{percentile:g}': float(value) for percentile, value in zip(percentiles, values)})
+            return stats
+
+        result = {'frame': describe(self.frame_durations[self._frames()])}
+
+        samples = self._samples()
+        names = self.sample_names[samples]
+        durations = self.sample_durations[samples]
+        gpu = self.sample_gpu[samples]
+        for index, name in enumerate(self.names):
+            selected = names == index
+            if np.any(selected & ~gpu):
+                result[name] = describe(durations[selected & ~gpu])
+            if np.any(selected & gpu):
+                result[f'{name} (GPU)'] = describe(durations[selected & gpu])
+        return result
+
+    def format_summary(self) -> str:
+        """
+        Returns the summary as a text table
+        """
+        lines = [f"{'phase':<32}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<32}{stats['count']:>8}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}")
+        return '\n'.join(lines)
+
+    def export_chrome_trace(self, filepath: str) -> None:
+        """
+        Write the samples in the Chrome trace event format, to be opened in chrome://tracing or Perfetto.
+        GPU samples are drawn on their own track, from the CPU time their commands were issued.
+        :param filepath: Path to the JSON file
+        """
+        events = [
+            {'name': 'process_name', 'ph': 'M', 'pid': 0, 'tid': 0, 'args': {'name': 'OpenGL in Python'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': 0, 'args': {'name': 'CPU'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': 1, 'args': {'name': 'GPU'}},
+        ]
+
+        frames = self._frames()
+        for start, duration in zip(self.frame_starts[frames], self.frame_durations[frames]):
+            events.append({'name': 'frame', 'cat': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0,
+                           'ts': start / 1e3, 'dur': duration / 1e3})
+
+        samples = self._samples()
+        for name, frame, start, duration, gpu in zip(self.sample_names[samples], self.sample_frames[samples],
+                                                     self.sample_starts[samples], self.sample_durations[samples],
+                                                     self.sample_gpu[samples]):
+            events.append({'name': self.names[name], 'cat': 'gpu' if gpu else 'cpu', 'ph': 'X',
+                           'pid': 0, 'tid': int(gpu), 'ts': start / 1e3, 'dur': duration / 1e3,
+                           'args': {'frame': int(frame)}})
+
+        with open(filepath, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+    def destroy(self) -> None:
+        """
+        Free the query objects
+        """
+        queries = self.queries + [query for query, *_ in self.pending]
+        if queries:
+            glDeleteQueries(len(queries), queries)
+        self.queries.clear()
+        self.pending.clear()
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import struct
+
+import numpy as np
+
+from OpenGL.GL import *
+from OpenGL.GL.shaders import ShaderLinkError, ShaderProgram
+from OpenGL.error import GLError
+
+from model.cache_file import CacheFormat
+
+
+class ProgramCache:
+    """
+    On disk cache of linked shader programs, one file per program holding a header followed by the binary
+    returned by the driver. A file is valid only if the hash of the sources and of the driver still matches,
+    so editing a shader or updating the driver compiles the program again.
+    """
+    __slots__ = ('directory', 'driver', 'enabled')
+
+    # key hash, binary format, binary size
+    FORMAT = CacheFormat(b'PROGBIN\0', 1, f'{CacheFormat.HASH_SIZE}sIQ')
+
+    def __init__(self, directory: str):
+        """
+        Initialize the cache, needs a current OpenGL context
+        :param directory: Directory holding the cache files, created when needed
+        """
+        self.directory = directory
+
+        # Binaries only load on the driver that produced them
+        self.driver = b'\0'.join(
+            glGetString(name) or b'' for name in (GL_VENDOR, GL_RENDERER, GL_VERSION, GL_SHADING_LANGUAGE_VERSION)
+        )
+
+        # Drivers may support the extension without any binary format, nothing can be cached then
+        self.enabled = bool(glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS))
+
+    def path(self, name: str) -> str:
+        """
+        Returns the path of the cache file of a program, every variant of a program has its own file
+        :param name: Name of the program, such as its source paths and defines
+        """
+        digest = hashlib.blake2b(name.encode(), digest_size=8).hexdigest()
+        return os.path.join(self.directory, f"{digest}.program")
+
+    def key(self, *sources: str) -> bytes:
+        """
+        Returns the hash of the sources of a program and of the driver
+        :param sources: Source text of every stage, defines included
+        """
+        digest = CacheFormat.hash()
+        digest.update(self.driver)
+        for source in sources:
+            digest.update(b'\0')
+            digest.update(source.encode())
+        return digest.digest()
+
+    def load(self, name: str, key: bytes) -> ShaderProgram | None:
+        """
+        Returns the program stored for a name, or None when there is no valid cache file or the driver rejects it
+        :param name: Name of the program
+        :param key: Hash of the sources and of the driver
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            with open(self.path(name), 'rb') as f:
+                data = f.read()
+            stored_key, binary_format, size, crc = self.FORMAT.unpack(data)
+            binary = data[self.FORMAT.data_offset:]
+            if stored_key != key or len(binary) != size:
+                return None
+            self.FORMAT.check(data, crc)
+        except (OSError, ValueError, struct.error):
+            return None
+
+        # Validation checks the current state, it is skipped as for compiled programs
+        program = ShaderProgram(glCreateProgram())
+        try:
+            return program.load(binary_format, np.frombuffer(binary, dtype=np.uint8), validate=False)
+        except (ShaderLinkError, GLError):
+            glDeleteProgram(program)
+            return None
+
+    def store(self, name: str, key: bytes, program: ShaderProgram) -> None:
+        """
+        Write the binary of a program linked with the retrievable hint, failures only mean the next launch compiles it
+        :param name: Name of the program
+        :param key: Hash of the sources and of the driver
+        :param program: Linked program
+        """
+        if not self.enabled:
+            return None
+
+        binary_format, binary = program.retrieve()
+        binary = np.asarray(binary).tobytes()
+        if not binary:
+            return None
+
+        self.FORMAT.write(self.path(name), (key, binary_format, len(binary)), binary)
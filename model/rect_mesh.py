@@ -1,7 +1,5 @@
 import numpy as np
 
-from OpenGL.GL import *
-
 from model.mesh import Mesh
 
 
@@ -10,7 +8,7 @@ class RectMesh(Mesh):
     A rectangular mesh
     """
 
-    __slots__ = ('vao', 'vbo', 'vertex_count')
+    __slots__ = ()
 
     def __init__(self, w: float, h: float):
         """
@@ -24,12 +22,12 @@ class RectMesh(Mesh):
             0, -w / 2, h / 2, 0, 0, 1, 0, 0,
             0, -w / 2, -h / 2, 0, 1, 1, 0, 0,
             0, w / 2, -h / 2, 1, 1, 1, 0, 0,
-
-            0, -w / 2, h / 2, 0, 0, 1, 0, 0,
-            0, w / 2, -h / 2, 1, 1, 1, 0, 0,
             0, w / 2, h / 2, 1, 0, 1, 0, 0,
         )
 
-        self.vertex_count = 6
-        vertices = np.array(vertices, dtype=np.float32)
-        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
\ No newline at end of file
+        indices = (
+            0, 1, 2,
+            0, 2, 3,
+        )
+
+        self.upload(np.array(vertices, dtype=np.float32), np.array(indices, dtype=np.uint16))
\ No newline at end of file
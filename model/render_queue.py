@@ -0,0 +1,132 @@
+import numpy as np
+
+
+class RenderQueue:
+    """
+    Draw items of a frame, each item is a row of a transform store with a 64 bits sort key.
+    Sorting the keys makes the items sharing a pipeline, a material and a mesh contiguous,
+    so they are drawn with as few state changes as possible.
+    """
+    __slots__ = ('keys', 'types', 'rows', 'count')
+
+    # Bit fields of the sort key, from the most significant bits to the least significant bits
+    PIPELINE_BITS = 4
+    SPRITE_BITS = 1
+    MATERIAL_BITS = 12
+    MESH_BITS = 15
+    DEPTH_BITS = 32
+
+    MESH_SHIFT = DEPTH_BITS
+    MATERIAL_SHIFT = MESH_SHIFT + MESH_BITS
+    SPRITE_SHIFT = MATERIAL_SHIFT + MATERIAL_BITS
+    PIPELINE_SHIFT = SPRITE_SHIFT + SPRITE_BITS
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Initialize the queue
+        :param capacity: Number of items allocated up front
+        """
+        capacity = max(1, capacity)
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.types = np.zeros(capacity, dtype=np.int32)
+        self.rows = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+
+    @classmethod
+    def pack_keys(cls, pipeline: int, sprite: bool, material: int, mesh: int, depths: np.ndarray) -> np.ndarray:
+        """
+        Returns the sort keys of items sharing a pipeline, a material and a mesh.
+        Opaque items are sorted front to back so hidden fragments fail the depth test early,
+        sprites are blended so they are sorted back to front.
+        :param pipeline: Pipeline drawing the items
+        :param sprite: Whether the items are blended camera facing sprites
+        :param material: Identifier of the material
+        :param mesh: Identifier of the mesh
+        :param depths: Depth of each item, from 0 at the near plane to 1 at the far plane
+        """
+        # An identifier past its field would spill in the next field and mix up the order of the draws
+        for field, value, bits in (('pipeline', pipeline, cls.PIPELINE_BITS),
+                                   ('material', material, cls.MATERIAL_BITS),
+                                   ('mesh', mesh, cls.MESH_BITS)):
+            if not 0 <= value < 1 << bits:
+                raise ValueError(f"The {field} identifier {value} does not fit in {bits} bits of the sort key")
+
+        depth_max = (1 << cls.DEPTH_BITS) - 1
+
+        # In single precision the largest depths round up to 2^32 and spill in the mesh bits
+        depths = np.clip(depths.astype(np.float64), 0.0, 1.0)
+        if sprite:
+            depths = 1.0 - depths
+
+        state = ((pipeline << cls.PIPELINE_SHIFT)
+                 | (int(sprite) << cls.SPRITE_SHIFT)
+                 | (material << cls.MATERIAL_SHIFT)
+                 | (mesh << cls.MESH_SHIFT))
+        return np.uint64(state) | (depths * depth_max).astype(np.uint64)
+
+    @classmethod
+    def unpack_state(cls, key: int) -> tuple[int, bool, int, int]:
+        """
+        Returns the pipeline, sprite flag, material and mesh of a sort key
+        :param key: Sort key, or its state without the depth
+        """
+        key = int(key)
+        return (
+            (key >> cls.PIPELINE_SHIFT) & ((1 << cls.PIPELINE_BITS) - 1),
+            bool((key >> cls.SPRITE_SHIFT) & 1),
+            (key >> cls.MATERIAL_SHIFT) & ((1 << cls.MATERIAL_BITS) - 1),
+            (key >> cls.MESH_SHIFT) & ((1 << cls.MESH_BITS) - 1),
+        )
+
+    def clear(self) -> None:
+        """
+        Remove every item
+        """
+        self.count = 0
+
+    def submit(self, keys: np.ndarray, entity_type: int, rows: np.ndarray) -> None:
+        """
+        Add items from the rows of a transform store
+        :param keys: Sort key of each item
+        :param entity_type: Type of the entities, it designates their transform store
+        :param rows: Rows of the entities in their transform store
+        """
+        count = len(rows)
+        if self.count + count > len(self.keys):
+            self._grow(max(2 * len(self.keys), self.count + count))
+
+        items = slice(self.count, self.count + count)
+        self.keys[items] = keys
+        self.types[items] = entity_type
+        self.rows[items] = rows
+        self.count += count
+
+    def _grow(self, capacity: int) -> None:
+        """
+        Reallocate the arrays with a bigger capacity
+        :param capacity: New number of items
+        """
+        count = self.count
+        for name, dtype in (('keys', np.uint64), ('types', np.int32), ('rows', np.int64)):
+            array = np.zeros(capacity, dtype=dtype)
+            array[:count] = getattr(self, name)[:count]
+            setattr(self, name, array)
+
+    def sort(self) -> None:
+        """
+        Sort the items by key, items with equal keys keep their submission order
+        """
+        order = np.argsort(self.keys[:self.count], kind='stable')
+        self.keys[:self.count] = self.keys[order]
+        self.types[:self.count] = self.types[order]
+        self.rows[:self.count] = self.rows[order]
+
+    def runs(self) -> list[tuple[int, int, int]]:
+        """
+        Returns the runs of sorted items sharing a state, as (state, start, end), the state is the key without the depth
+        """
+        states = self.keys[:self.count] >> np.uint64(self.DEPTH_BITS)
+        starts = np.flatnonzero(np.diff(states)) + 1
+        starts = np.concatenate(([0], starts)) if self.count else starts
+        ends = np.append(starts[1:], self.count)
+        return [(int(states[start]) << self.DEPTH_BITS, int(start), int(end)) for start, end in zip(starts, ends)]
@@ -1,65 +1,249 @@
-from settings import ENTITY_TYPE
+import numpy as np
+
+from settings import ENTITY_TYPE, BILLBOARD_TYPES, GPU_BILLBOARDS, SPATIAL_INDEX_MARGIN
 
 from model.entity import Entity
 from model.pointlight import PointLight
 from model.player import Player
 from model.cube import Cube
 from model.billboard import BillBoard
+from model.transform_store import TransformStore
+from model.light_store import LightStore
+from model.frustum import Frustum
+from model.spatial_index import SpatialIndex
 
 
 class Scene:
     """
     Handle objects and their interactions in the world space
     """
-    __slots__ = ('entities', 'player', 'lights')
+    __slots__ = ('entities', 'player', 'lights', 'transforms', 'changed', 'index', 'bounding_radii')
+
+    def __init__(self, bounding_radii: dict[int, float]):
+        """
+        Initialize the scene
+        :param bounding_radii: Radius of a sphere around the origin holding an entity of each type, in any orientation
+        """
+        # One transform store per entity type, so each type's model transforms are contiguous
+        self.transforms: dict[int, TransformStore] = {
+            entity_type: TransformStore() for entity_type in ENTITY_TYPE.values()
+        }
+        self.transforms[ENTITY_TYPE['POINTLIGHT']] = LightStore()
+
+        # Rows of each transform store written during the last update
+        self.changed: dict[int, np.ndarray] = {}
 
-    def __init__(self):
         self.entities: dict[int, list[Entity]] = {
             ENTITY_TYPE['CUBE']: [
                 Cube(position=[0, 0, 1],
-                     eulers=[0, 0, 0])
+                     eulers=[0, 0, 0],
+                     store=self.transforms[ENTITY_TYPE['CUBE']])
             ],
 
             ENTITY_TYPE['MEDKIT']: [
-                BillBoard(position=[0, 0, 2.5])
+                BillBoard(position=[0, 0, 2.5],
+                          store=self.transforms[ENTITY_TYPE['MEDKIT']])
             ]
         }
 
         self.lights: list[PointLight] = [
             PointLight(position=[0, 0, 4],
                        color=[1.0, 0.0, 0.0],
-                       strength=3.0),
+                       strength=3.0,
+                       store=self.transforms[ENTITY_TYPE['POINTLIGHT']]),
 
             PointLight(position=[0.5, 0, 4],
                        color=[0.0, 1.0, 0.0],
-                       strength=3.0),
+                       strength=3.0,
+                       store=self.transforms[ENTITY_TYPE['POINTLIGHT']]),
 
             PointLight(position=[-0.5, 0, 4],
                        color=[0.0, 0.0, 1.0],
-                       strength=3.0)
+                       strength=3.0,
+                       store=self.transforms[ENTITY_TYPE['POINTLIGHT']])
         ]
 
         self.player = Player(
             position=[-2, 0, 3]
         )
 
+        # Bounds of every entity and light, kept in sync with the transform stores by update
+        self.bounding_radii = bounding_radii
+        self.index = SpatialIndex(SPATIAL_INDEX_MARGIN)
+
     def update(self, dt: float) -> None:
         """
         Update all objects of the scene
         :param dt: Delta time
         """
+        # Billboards oriented on the GPU have nothing to update
+        skipped_types = BILLBOARD_TYPES if GPU_BILLBOARDS else ()
+
         # Update entities
-        for entities in self.entities.values():
+        for entity_type, entities in self.entities.items():
+            if entity_type in skipped_types:
+                continue
             for entity in entities:
                 entity.update(dt, self.player.position)
 
         # Update lights
-        for light in self.lights:
-            light.update(dt, self.player.position)
+        if ENTITY_TYPE['POINTLIGHT'] not in skipped_types:
+            for light in self.lights:
+                light.update(dt, self.player.position)
 
         # Update player position
         self.player.update(dt)
 
+        # Compute the model transforms that changed in one pass per entity type
+        for entity_type, store in self.transforms.items():
+            self.changed[entity_type] = store.update()
+
+        self._update_index()
+
+    def begin_step(self) -> None:
+        """
+        Save the state of the entities, the lights and the camera at the start of a simulation step,
+        before the input of the step and the update move them
+        """
+        for store in self.transforms.values():
+            store.begin_step()
+        self.player.store.begin_step()
+
+    def interpolate(self, alpha: float) -> None:
+        """
+        Place the entities, the lights and the camera between their states before and after the last update,
+        so rendering between two updates shows smooth motion
+        :param alpha: Fraction of the way from the previous to the current states
+        """
+        for store in self.transforms.values():
+            store.interpolate(alpha)
+        self.player.interpolate(alpha)
+
+    def _update_index(self) -> None:
+        """
+        Bring the spatial index in line with the transform stores,
+        the index is built at once when empty, afterwards only the entities that changed are looked at
+        and only those that moved enough are moved in it
+        """
+        for store in self.transforms.values():
+            for proxy in store.released:
+                self.index.remove(proxy)
+            store.released.clear()
+
+        if self.index.count == 0:
+            entity_types = list(self.transforms)
+            counts = [self.transforms[entity_type].count for entity_type in entity_types]
+            if sum(counts) == 0:
+                return None
+
+            lowers, uppers = zip(*(self._bounds(entity_type) for entity_type in entity_types))
+            keys = np.concatenate([self._keys(entity_type, count) for entity_type, count in zip(entity_types, counts)])
+            proxies = self.index.build(np.concatenate(lowers), np.concatenate(uppers), keys)
+
+            offsets = np.cumsum(counts) - counts
+            for entity_type, offset, count in zip(entity_types, offsets, counts):
+                self.transforms[entity_type].proxies[:count] = proxies[offset:offset + count]
+            return None
+
+        for entity_type, store in self.transforms.items():
+            rows = self.changed.get(entity_type)
+            if rows is None or len(rows) == 0:
+                continue
+
+            lowers, uppers = self._bounds(entity_type, rows)
+            proxies = store.proxies[rows]
+
+            indexed = proxies >= 0
+            self.index.update(proxies[indexed], lowers[indexed], uppers[indexed])
+            for i in np.flatnonzero(~indexed):
+                proxies[i] = self.index.insert(lowers[i], uppers[i], 0)
+            store.proxies[rows] = proxies
+
+            # Rows moved in place of destroyed entities are flagged too, so their data is written again here
+            self.index.data[proxies] = (np.int64(entity_type) << 32) | rows
+
+    def _bounds(self, entity_type: int, rows: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the minimum and maximum corners of the boxes around the entities of a type
+        :param entity_type: Type of the entities
+        :param rows: Rows of the transform store, every used row if not given
+        """
+        store = self.transforms[entity_type]
+        positions = store.positions[:store.count] if rows is None else store.positions[rows]
+        radius = self.bounding_radii.get(entity_type, 0.0)
+        return positions - radius, positions + radius
+
+    @staticmethod
+    def _keys(entity_type: int, count: int) -> np.ndarray:
+        """
+        Returns the data stored in the spatial index for the rows of a transform store, the type in the high bits
+        :param entity_type: Type of the entities
+        :param count: Number of rows
+        """
+        return (np.int64(entity_type) << 32) | np.arange(count, dtype=np.int64)
+
+    def _resolve(self, keys: np.ndarray) -> dict[int, np.ndarray]:
+        """
+        Returns the sorted rows of each entity type designated by spatial index data
+        :param keys: Data returned by the spatial index
+        """
+        entity_types = keys >> 32
+        rows = keys & 0xFFFFFFFF
+        return {
+            entity_type: np.sort(rows[entity_types == entity_type])
+            for entity_type in self.transforms
+        }
+
+    def query_frustum(self, frustum: Frustum) -> dict[int, np.ndarray]:
+        """
+        Returns the rows of the transform store of each entity type whose bounds may be inside a frustum
+        :param frustum: View frustum
+        """
+        return self._resolve(self.index.query_frustum(frustum.planes))
+
+    def query_radius(self, position: np.ndarray, radius: float) -> list[Entity]:
+        """
+        Returns the entities and lights whose bounding sphere overlaps a sphere
+        :param position: Center of the sphere
+        :param radius: Radius of the sphere
+        """
+        found = []
+        for entity_type, rows in self._resolve(self.index.query_sphere(position, radius)).items():
+            store = self.transforms[entity_type]
+            distances = np.linalg.norm(store.positions[rows] - position, axis=1)
+            reach = radius + self.bounding_radii.get(entity_type, 0.0)
+            found.extend(store.owners[row] for row in rows[distances <= reach])
+        return found
+
+    def pick(self, max_distance: float) -> Entity | None:
+        """
+        Returns the nearest entity or light whose bounding sphere is hit by the view direction of the player
+        :param max_distance: Distance past which nothing is picked
+        """
+        origin = self.player.position
+        direction = self.player.forwards
+        keys, _ = self.index.ray_cast(origin, direction, max_distance)
+
+        nearest, nearest_distance = None, max_distance
+        for entity_type, rows in self._resolve(keys).items():
+            store = self.transforms[entity_type]
+            radius = self.bounding_radii.get(entity_type, 0.0)
+
+            # Ray against sphere, the ray enters the sphere half a chord before the point nearest to its center
+            offsets = store.positions[rows] - origin
+            along = offsets @ direction
+            squared = np.sum(offsets * offsets, axis=1) - along * along
+            half_chord = np.sqrt(np.maximum(radius * radius - squared, 0.0))
+            hit = (squared <= radius * radius) & (along + half_chord >= 0.0)
+            distances = np.maximum(along[hit] - half_chord[hit], 0.0)
+            hit_rows = rows[hit]
+
+            if len(distances) and distances.min() < nearest_distance:
+                nearest_distance = float(distances.min())
+                nearest = store.owners[hit_rows[np.argmin(distances)]]
+
+        return nearest
+
     def move_player(self, dpos: list[float]) -> None:
         """
         Move the player by the given amount
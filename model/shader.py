@@ -1,30 +1,60 @@
+import numpy as np
+
 from OpenGL.GL import *
-from OpenGL.GL.shaders import compileShader, compileProgram, ShaderProgram
+from OpenGL.GL.KHR.parallel_shader_compile import (
+    GL_COMPLETION_STATUS_KHR, glInitParallelShaderCompileKHR, glMaxShaderCompilerThreadsKHR
+)
+from OpenGL.GL.shaders import ShaderCompilationError, ShaderLinkError, ShaderProgram
+
+from model.gl_calls import GL_CALLS
+from model.gl_state import GL_STATE
+from model.program_cache import ProgramCache
+from settings import PROGRAM_CACHE_DIR
 
 
 class Shader:
     """
-    A shader
+    A shader, its active uniforms are reflected once linked and set through typed setters
+    that skip the upload when the value did not change since the last one
     """
-    __slots__ = ('program', 'single_uniforms', 'multi_uniforms')
+    __slots__ = ('program', 'uniforms', 'blocks', 'values', 'issued', 'skipped')
 
-    def __init__(self, vertex_filepath: str, fragment_filepath: str):
+    def __init__(self, vertex_filepath: str, fragment_filepath: str, defines: tuple[str, ...] = (),
+                 compiler: 'ShaderCompiler' = None):
         """
-        Initialize the shader
+        Initialize the shader, it is compiled right away unless a compiler is given,
+        the program is then linked with the other programs of the compiler and only usable once it is ready
         :param vertex_filepath: Path to the vertex file
         :param fragment_filepath: Path to the fragment file
+        :param defines: Preprocessor symbols defined in both stages, used to select shader variants
+        :param compiler: Compiler batching the compilation of several shaders
         """
-        self.program = self.create_shader(vertex_filepath, fragment_filepath)
+        self.program: ShaderProgram | None = None
+
+        # Location, type and array size of every active uniform, and index of every uniform block
+        self.uniforms: dict[str, tuple[int, int, int]] = {}
+        self.blocks: dict[str, int] = {}
+
+        # Bytes last uploaded at each location, and number of uploads issued and skipped since the counts were reset
+        self.values: dict[int, bytes] = {}
+        self.issued = 0
+        self.skipped = 0
+
+        if compiler is not None:
+            compiler.submit(self, vertex_filepath, fragment_filepath, defines)
+            return None
 
-        self.single_uniforms: dict[int, int] = {}
-        self.multi_uniforms: dict[int, list[int]] = {}
+        compiler = ShaderCompiler()
+        compiler.submit(self, vertex_filepath, fragment_filepath, defines)
+        compiler.finish_all()
 
     @staticmethod
-    def create_shader(vertex_filepath: str, fragment_filepath: str) -> ShaderProgram:
+    def read_sources(vertex_filepath: str, fragment_filepath: str, defines: tuple[str, ...] = ()) -> tuple[str, str]:
         """
-        Returns the shader program for the given vertex and fragment filepath
+        Returns the source of the vertex and fragment stages with the defines inserted
         :param vertex_filepath: Path to the vertex file
         :param fragment_filepath: Path to the fragment file
+        :param defines: Preprocessor symbols defined in both stages
         """
         with open(vertex_filepath, "r") as f:
             vertex_src = f.readlines()
@@ -32,58 +62,323 @@ class Shader:
         with open(fragment_filepath, "r") as f:
             fragment_src = f.readlines()
 
-        shader = compileProgram(
-            compileShader(vertex_src, GL_VERTEX_SHADER),
-            compileShader(fragment_src, GL_FRAGMENT_SHADER)
-        )
+        # Defines must come right after the #version directive
+        define_lines = [f"#define {define}\n" for define in defines]
+        vertex_src = vertex_src[:1] + define_lines + vertex_src[1:]
+        fragment_src = fragment_src[:1] + define_lines + fragment_src[1:]
 
-        return shader
+        return ''.join(vertex_src), ''.join(fragment_src)
 
-    def cache_single_location(self, uniform_type: int, uniform_name: str) -> None:
+    def reflect(self) -> None:
         """
-        Store location of a uniform location, for uniforms with one location per variable
-        :param uniform_type: Type of uniform
-        :param uniform_name: Name of the uniform
+        Read the active uniforms and uniform blocks of the linked program
         """
-        self.single_uniforms[uniform_type] = glGetUniformLocation(self.program, uniform_name)
+        self.uniforms.clear()
+        self.blocks.clear()
+        self.values.clear()
 
-    def cache_multi_location(self, uniform_type: int, uniform_name: str) -> None:
+        for index in range(glGetProgramiv(self.program, GL_ACTIVE_UNIFORMS)):
+            name, size, uniform_type = glGetActiveUniform(self.program, index)
+            name = name.decode()
+
+            # Uniforms of blocks have no location, they are read from their buffer
+            location = glGetUniformLocation(self.program, name)
+            if location < 0:
+                continue
+            self.uniforms[name.removesuffix('[0]')] = (int(location), int(uniform_type), int(size))
+
+        length = GLsizei()
+        name = (GLchar * 256)()
+        for index in range(glGetProgramiv(self.program, GL_ACTIVE_UNIFORM_BLOCKS)):
+            glGetActiveUniformBlockName(self.program, index, len(name), length, name)
+            self.blocks[name.value.decode()] = index
+
+    def _changed(self, name: str, value: np.ndarray) -> tuple[int, bytes] | None:
         """
-        Search location of a uniform location, for uniforms with multiple locations per variable
-        :param uniform_type: Type of uniform
-        :param uniform_name: Name of the uniform
+        Returns the location and the bytes of a uniform if its value differs from the last upload, None otherwise
+        or when the program has no such active uniform. The bytes are kept, their address can be uploaded as is
+        :param name: Name of the uniform
+        :param value: New value, in the type of the uniform
         """
-        # Create the list if uniform not in dict yet
-        if uniform_type not in self.multi_uniforms:
-            self.multi_uniforms[uniform_type] = []
+        uniform = self.uniforms.get(name)
+        if uniform is None:
+            return None
+
+        location = uniform[0]
+        data = value.tobytes()
+        if self.values.get(location) == data:
+            self.skipped += 1
+            return None
+
+        self.values[location] = data
+        self.issued += 1
+        return location, data
 
-        self.multi_uniforms[uniform_type].append(
-            glGetUniformLocation(self.program, uniform_name)
-        )
+    def _uploaded(self, name: str) -> int | None:
+        """
+        Returns the location of a uniform uploaded without comparing its value, which is forgotten,
+        None when the program has no such active uniform
+        :param name: Name of the uniform
+        """
+        uniform = self.uniforms.get(name)
+        if uniform is None:
+            return None
+
+        location = uniform[0]
+        self.values.pop(location, None)
+        self.issued += 1
+        return location
+
+    def set_int(self, name: str, value: int) -> None:
+        """
+        Set an int, bool or sampler uniform, the shader must be in use
+        :param name: Name of the uniform
+        :param value: New value
+        """
+        changed = self._changed(name, np.int32(value))
+        if changed is not None:
+            GL_CALLS.glUniform1i(changed[0], int(value))
+
+    def set_float(self, name: str, value: float) -> None:
+        """
+        Set a float uniform, the shader must be in use
+        :param name: Name of the uniform
+        :param value: New value
+        """
+        changed = self._changed(name, np.float32(value))
+        if changed is not None:
+            GL_CALLS.glUniform1f(changed[0], float(value))
+
+    def set_vec2(self, name: str, value: np.ndarray) -> None:
+        """
+        Set a vec2 uniform, the shader must be in use
+        :param name: Name of the uniform
+        :param value: New value
+        """
+        value = np.ascontiguousarray(value, dtype=np.float32)
+        changed = self._changed(name, value)
+        if changed is not None:
+            GL_CALLS.glUniform2fv(changed[0], 1, changed[1])
+
+    def set_vec3(self, name: str, value: np.ndarray) -> None:
+        """
+        Set a vec3 uniform, the shader must be in use
+        :param name: Name of the uniform
+        :param value: New value
+        """
+        value = np.ascontiguousarray(value, dtype=np.float32)
+        changed = self._changed(name, value)
+        if changed is not None:
+            GL_CALLS.glUniform3fv(changed[0], 1, changed[1])
+
+    def set_ivec3(self, name: str, value: tuple[int, int, int]) -> None:
+        """
+        Set an ivec3 uniform, the shader must be in use
+        :param name: Name of the uniform
+        :param value: New value
+        """
+        value = np.ascontiguousarray(value, dtype=np.int32)
+        changed = self._changed(name, value)
+        if changed is not None:
+            GL_CALLS.glUniform3iv(changed[0], 1, changed[1])
+
+    def set_mat4(self, name: str, value: np.ndarray) -> None:
+        """
+        Set a mat4 uniform, the shader must be in use
+        :param name: Name of the uniform
+        :param value: New value, in the row vector convention of pyrr
+        """
+        value = np.ascontiguousarray(value, dtype=np.float32)
+        changed = self._changed(name, value)
+        if changed is not None:
+            GL_CALLS.glUniformMatrix4fv(changed[0], 1, GL_FALSE, changed[1])
+
+    def upload_vec3(self, name: str, address: int) -> None:
+        """
+        Set a vec3 uniform from the address of 3 contiguous float32 without comparing it with the last upload,
+        for values changing on every call. The shader must be in use
+        :param name: Name of the uniform
+        :param address: Address of the new value, such as the data of a row of an array
+        """
+        location = self._uploaded(name)
+        if location is not None:
+            GL_CALLS.glUniform3fv(location, 1, address)
+
+    def upload_mat4(self, name: str, address: int) -> None:
+        """
+        Set a mat4 uniform from the address of 16 contiguous float32 without comparing it with the last upload,
+        for values changing on every call. The shader must be in use
+        :param name: Name of the uniform
+        :param address: Address of the new value, in the row vector convention of pyrr
+        """
+        location = self._uploaded(name)
+        if location is not None:
+            GL_CALLS.glUniformMatrix4fv(location, 1, GL_FALSE, address)
 
-    def fetch_single_location(self, uniform_type: int) -> int:
+    def reset_counts(self) -> tuple[int, int]:
         """
-        Returns the location of the uniform location, for uniforms with one location per variable
-        :param uniform_type: Type of uniform to retrieve
+        Returns the number of uploads issued and skipped since the last reset, and reset them
         """
-        return self.single_uniforms[uniform_type]
+        counts = self.issued, self.skipped
+        self.issued = self.skipped = 0
+        return counts
 
-    def fetch_multi_location(self, uniform_type: int, index: int) -> int:
+    def bind_uniform_block(self, block_name: str, binding: int) -> None:
         """
-        Returns the location of the uniform location, for uniforms with multiple locations per variable
-        :param uniform_type: Type of uniform to retrieve
-        :param index: Index of the uniform
+        Make a uniform block read its data from the buffer bound at a binding point
+        :param block_name: Name of the uniform block
+        :param binding: Uniform buffer binding point
         """
-        return self.multi_uniforms[uniform_type][index]
+        index = self.blocks.get(block_name)
+        if index is not None:
+            glUniformBlockBinding(self.program, index, binding)
 
     def use(self) -> None:
         """
         Use the shader program
         """
-        glUseProgram(self.program)
+        GL_STATE.use_program(self.program)
 
     def destroy(self) -> None:
         """
         Free the memory
         """
-        glDeleteProgram(self.program)
+        if self.program is not None:
+            GL_STATE.forget_program(self.program)
+            glDeleteProgram(self.program)
+            self.program = None
+
+
+class ShaderCompiler:
+    """
+    Compile shader programs in batches: every stage of every program is submitted first, then every program
+    is linked, and the compile and link statuses are only read once a program is needed, so the driver never
+    has to finish one program before starting the next.
+    With KHR_parallel_shader_compile the driver compiles on its own threads and the completion of each program
+    is polled without blocking, so the programs that are ready can be used while the others finish.
+    Programs found in the program cache skip the compilation.
+    """
+    __slots__ = ('cache', 'parallel', 'submitted', 'linking')
+
+    def __init__(self):
+        """
+        Initialize the compiler, needs a current OpenGL context
+        """
+        self.cache = ProgramCache(PROGRAM_CACHE_DIR)
+
+        # Let the driver pick the number of compiler threads
+        self.parallel = bool(glInitParallelShaderCompileKHR())
+        if self.parallel:
+            glMaxShaderCompilerThreadsKHR(0xFFFFFFFF)
+
+        # Cache name, cache key and stages of the shaders compiling, then of the shaders linking
+        self.submitted: dict[Shader, tuple[str, bytes, list[int]]] = {}
+        self.linking: dict[Shader, tuple[str, bytes, list[int]]] = {}
+
+    def submit(self, shader: Shader, vertex_filepath: str, fragment_filepath: str,
+               defines: tuple[str, ...] = ()) -> None:
+        """
+        Start compiling the stages of a shader, or load its program from the cache
+        :param shader: Shader receiving the program
+        :param vertex_filepath: Path to the vertex file
+        :param fragment_filepath: Path to the fragment file
+        :param defines: Preprocessor symbols defined in both stages
+        """
+        vertex_src, fragment_src = Shader.read_sources(vertex_filepath, fragment_filepath, defines)
+        name = ' | '.join((vertex_filepath, fragment_filepath) + tuple(defines))
+        key = self.cache.key(vertex_src, fragment_src)
+
+        shader.program = self.cache.load(name, key)
+        if shader.program is not None:
+            shader.reflect()
+            return None
+
+        stages = []
+        for source, stage_type in ((vertex_src, GL_VERTEX_SHADER), (fragment_src, GL_FRAGMENT_SHADER)):
+            stage = glCreateShader(stage_type)
+            glShaderSource(stage, source)
+            glCompileShader(stage)
+            stages.append(stage)
+        self.submitted[shader] = (name, key, stages)
+
+    def link(self) -> None:
+        """
+        Start linking the programs of every submitted shader
+        """
+        for shader, (name, key, stages) in self.submitted.items():
+            program = ShaderProgram(glCreateProgram())
+            if self.cache.enabled:
+                glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+            for stage in stages:
+                glAttachShader(program, stage)
+            glLinkProgram(program)
+
+            shader.program = program
+            self.linking[shader] = (name, key, stages)
+        self.submitted.clear()
+
+    def is_ready(self, shader: Shader) -> bool:
+        """
+        Returns whether the program of a shader can be used without waiting for the driver,
+        its statuses are checked when it becomes ready
+        :param shader: Shader to check
+        """
+        if shader in self.submitted:
+            return False
+        if shader not in self.linking:
+            return shader.program is not None
+
+        if self.parallel:
+            # PyOpenGL does not know the size of this query, the output is given explicitly
+            completed = GLint()
+            glGetProgramiv(shader.program, GL_COMPLETION_STATUS_KHR, completed)
+            if not completed.value:
+                return False
+
+        self.finish(shader)
+        return True
+
+    def finish(self, shader: Shader) -> None:
+        """
+        Wait for the program of a linking shader, check it and store it in the cache
+        raises ShaderCompilationError or ShaderLinkError when the sources are invalid
+        :param shader: Shader to finish
+        """
+        name, key, stages = self.linking.pop(shader)
+        try:
+            try:
+                for stage in stages:
+                    if not glGetShaderiv(stage, GL_COMPILE_STATUS):
+                        raise ShaderCompilationError(
+                            f"Shader compile failure ({name}): {glGetShaderInfoLog(stage)}"
+                        )
+                shader.program.check_linked()
+            finally:
+                for stage in stages:
+                    glDetachShader(shader.program, stage)
+                    glDeleteShader(stage)
+        except (ShaderCompilationError, ShaderLinkError):
+            # The program can not be used, it is freed and the shader is left without one
+            shader.destroy()
+            raise
+
+        self.cache.store(name, key, shader.program)
+        shader.reflect()
+
+    def finish_all(self) -> None:
+        """
+        Link the submitted shaders and wait for every program
+        """
+        self.link()
+        for shader in list(self.linking):
+            self.finish(shader)
+
+    def destroy(self) -> None:
+        """
+        Free the stages of the shaders not finished
+        """
+        for jobs in (self.submitted, self.linking):
+            for _, _, stages in jobs.values():
+                for stage in stages:
+                    glDeleteShader(stage)
+            jobs.clear()
@@ -0,0 +1,464 @@
+import numpy as np
+
+
+class SpatialIndex:
+    """
+    Dynamic bounding volume hierarchy over axis aligned boxes. Leaves hold boxes fattened by a margin so small moves
+    do not touch the tree, insertion follows the surface area heuristic and AVL rotations keep the tree balanced.
+    Queries walk the tree one level at a time, testing every node of a level at once with NumPy.
+    """
+    __slots__ = ('margin', 'bounds', 'left', 'right', 'parent', 'height', 'data', 'root', 'free', 'count')
+
+    def __init__(self, margin: float = 0.1, capacity: int = 16):
+        """
+        Initialize the index
+        :param margin: Distance the boxes of the leaves are fattened by
+        :param capacity: Number of nodes allocated up front
+        """
+        self.margin = margin
+
+        # Nodes, a leaf has no left child and holds the user data of its box
+        capacity = max(1, capacity)
+        self.bounds = np.zeros((capacity, 6), dtype=np.float32)
+        self.left = np.full(capacity, -1, dtype=np.int32)
+        self.right = np.full(capacity, -1, dtype=np.int32)
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.height = np.zeros(capacity, dtype=np.int32)
+        self.data = np.zeros(capacity, dtype=np.int64)
+
+        self.root = -1
+        self.free: list[int] = list(range(capacity - 1, -1, -1))
+
+        # Number of leaves
+        self.count = 0
+
+    def insert(self, lower: np.ndarray, upper: np.ndarray, data: int) -> int:
+        """
+        Add a box and returns its proxy, the proxy stays valid until the box is removed
+        :param lower: Minimum corner
+        :param upper: Maximum corner
+        :param data: User data returned by the queries
+        """
+        leaf = self._allocate()
+        self.bounds[leaf, :3] = np.asarray(lower) - self.margin
+        self.bounds[leaf, 3:] = np.asarray(upper) + self.margin
+        self.data[leaf] = data
+        self.height[leaf] = 0
+        self._insert_leaf(leaf)
+        self.count += 1
+        return leaf
+
+    def remove(self, proxy: int) -> None:
+        """
+        Remove a box
+        :param proxy: Proxy returned when the box was inserted
+        """
+        self._remove_leaf(proxy)
+        self._release(proxy)
+        self.count -= 1
+
+    def move(self, proxy: int, lower: np.ndarray, upper: np.ndarray) -> bool:
+        """
+        Update a box, the tree only changes when the box leaves its fattened box. Returns whether it changed.
+        :param proxy: Proxy returned when the box was inserted
+        :param lower: New minimum corner
+        :param upper: New maximum corner
+        """
+        bounds = self.bounds[proxy]
+        if np.all(bounds[:3] <= lower) and np.all(upper <= bounds[3:]):
+            return False
+
+        self._remove_leaf(proxy)
+        bounds[:3] = np.asarray(lower) - self.margin
+        bounds[3:] = np.asarray(upper) + self.margin
+        self._insert_leaf(proxy)
+        return True
+
+    def update(self, proxies: np.ndarray, lowers: np.ndarray, uppers: np.ndarray) -> int:
+        """
+        Update many boxes at once, only the boxes that left their fattened box are moved in the tree.
+        Returns the number of moved boxes.
+        :param proxies: Proxies of the boxes
+        :param lowers: N x 3 new minimum corners
+        :param uppers: N x 3 new maximum corners
+        """
+        bounds = self.bounds[proxies]
+        escaped = np.flatnonzero(np.any(lowers < bounds[:, :3], axis=1) | np.any(uppers > bounds[:, 3:], axis=1))
+
+        for i in escaped:
+            proxy = int(proxies[i])
+            self._remove_leaf(proxy)
+            self.bounds[proxy, :3] = lowers[i] - self.margin
+            self.bounds[proxy, 3:] = uppers[i] + self.margin
+            self._insert_leaf(proxy)
+
+        return len(escaped)
+
+    def build(self, lowers: np.ndarray, uppers: np.ndarray, data: np.ndarray) -> np.ndarray:
+        """
+        Replace the content of the index with many boxes and returns their proxies. The boxes are sorted
+        along a Morton curve then split in halves, which gives a balanced tree without inserting them one by one.
+        :param lowers: N x 3 minimum corners
+        :param uppers: N x 3 maximum corners
+        :param data: User data of each box
+        """
+        count = len(lowers)
+        capacity = max(1, 2 * count - 1)
+        self.__init__(self.margin, capacity)
+        if count == 0:
+            return np.zeros(0, dtype=np.int32)
+
+        # Leaves take the first nodes in Morton order, internal nodes follow
+        order = np.argsort(self.morton_codes((lowers + uppers) / 2), kind='stable')
+        self.bounds[:count, :3] = lowers[order] - self.margin
+        self.bounds[:count, 3:] = uppers[order] + self.margin
+        self.data[:count] = data[order]
+
+        # Split the sorted range of every node of a level at once, from the root down
+        levels = []
+        nodes = np.array([count if count > 1 else 0])
+        starts, ends = np.array([0]), np.array([count])
+        next_node = count + 1
+        while len(nodes):
+            internal = ends - starts > 1
+            nodes, starts, ends = nodes[internal], starts[internal], ends[internal]
+            if len(nodes) == 0:
+                break
+            levels.append(nodes)
+
+            middles = (starts + ends) // 2
+            children = []
+            for child_starts, child_ends in ((starts, middles), (middles, ends)):
+                is_leaf = child_ends - child_starts == 1
+                ids = child_starts.copy()
+                ids[~is_leaf] = next_node + np.arange(np.count_nonzero(~is_leaf))
+                next_node += np.count_nonzero(~is_leaf)
+                children.append(ids)
+
+            self.left[nodes], self.right[nodes] = children
+            self.parent[children[0]] = nodes
+            self.parent[children[1]] = nodes
+            nodes = np.concatenate(children)
+            starts = np.concatenate((starts, middles))
+            ends = np.concatenate((middles, ends))
+
+        # Fit the boxes from the leaves up
+        for nodes in reversed(levels):
+            left, right = self.left[nodes], self.right[nodes]
+            self.bounds[nodes, :3] = np.minimum(self.bounds[left, :3], self.bounds[right, :3])
+            self.bounds[nodes, 3:] = np.maximum(self.bounds[left, 3:], self.bounds[right, 3:])
+            self.height[nodes] = 1 + np.maximum(self.height[left], self.height[right])
+
+        self.root = count if count > 1 else 0
+        self.free = []
+        self.count = count
+
+        proxies = np.empty(count, dtype=np.int32)
+        proxies[order] = np.arange(count, dtype=np.int32)
+        return proxies
+
+    @staticmethod
+    def morton_codes(points: np.ndarray) -> np.ndarray:
+        """
+        Returns the 30 bit Morton code of each point, quantized over the box holding all of them
+        :param points: N x 3 points
+        """
+        lower = points.min(axis=0)
+        extent = np.maximum(points.max(axis=0) - lower, 1e-9)
+        cells = np.clip(((points - lower) / extent * 1023).astype(np.int64), 0, 1023)
+
+        # Spread the 10 bits of each coordinate two bits apart
+        cells = (cells | (cells << 16)) & 0x030000FF
+        cells = (cells | (cells << 8)) & 0x0300F00F
+        cells = (cells | (cells << 4)) & 0x030C30C3
+        cells = (cells | (cells << 2)) & 0x09249249
+        return (cells[:, 0] << 2) | (cells[:, 1] << 1) | cells[:, 2]
+
+    def query_frustum(self, planes: np.ndarray) -> np.ndarray:
+        """
+        Returns the data of every box at least partly inside a frustum
+        :param planes: 6 x 4 frustum planes, normals pointing inside
+        """
+        normals, offsets = planes[:, :3], planes[:, 3]
+
+        def test(bounds: np.ndarray) -> np.ndarray:
+            # The corner furthest along each normal decides whether the box is outside
+            corners = np.where(normals > 0, bounds[:, None, 3:], bounds[:, None, :3])
+            return np.all(np.einsum('npi,pi->np', corners, normals) + offsets >= 0, axis=1)
+
+        return self.data[self._query(test)]
+
+    def query_sphere(self, center: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Returns the data of every box at least partly inside a sphere
+        :param center: Center of the sphere
+        :param radius: Radius of the sphere
+        """
+        center = np.asarray(center, dtype=np.float32)
+
+        def test(bounds: np.ndarray) -> np.ndarray:
+            gaps = np.maximum(np.maximum(bounds[:, :3] - center, center - bounds[:, 3:]), 0)
+            return np.sum(gaps * gaps, axis=1) <= radius * radius
+
+        return self.data[self._query(test)]
+
+    def ray_cast(self,
+                 origin: np.ndarray,
+                 direction: np.ndarray,
+                 max_distance: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the data of every box hit by a ray and the distance at which the ray enters them, nearest first
+        :param origin: Origin of the ray
+        :param direction: Unit direction of the ray
+        :param max_distance: Length of the ray
+        """
+        origin = np.asarray(origin, dtype=np.float32)
+        with np.errstate(divide='ignore'):
+            inverse = 1.0 / np.asarray(direction, dtype=np.float32)
+
+        def slabs(bounds: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+            with np.errstate(invalid='ignore'):
+                near = (bounds[:, :3] - origin) * inverse
+                far = (bounds[:, 3:] - origin) * inverse
+            # fmin and fmax skip the NaN of a ray lying exactly on a slab
+            enter = np.fmax(np.nanmax(np.fmin(near, far), axis=1, initial=-np.inf), 0.0)
+            leave = np.nanmin(np.fmax(near, far), axis=1, initial=np.inf)
+            return enter, leave
+
+        def test(bounds: np.ndarray) -> np.ndarray:
+            enter, leave = slabs(bounds)
+            return (enter <= leave) & (enter <= max_distance)
+
+        leaves = self._query(test)
+        distances = slabs(self.bounds[leaves])[0]
+        order = np.argsort(distances, kind='stable')
+        return self.data[leaves[order]], distances[order]
+
+    def _query(self, test) -> np.ndarray:
+        """
+        Returns the leaves whose every ancestor passes a test, the nodes of each level are tested at once
+        :param test: Function returning a mask of the boxes passing the test, from a N x 6 array of boxes
+        """
+        if self.root == -1:
+            return np.zeros(0, dtype=np.int32)
+
+        found = []
+        nodes = np.array([self.root], dtype=np.int32)
+        while len(nodes):
+            nodes = nodes[test(self.bounds[nodes])]
+            is_leaf = self.left[nodes] == -1
+            found.append(nodes[is_leaf])
+            nodes = nodes[~is_leaf]
+            nodes = np.concatenate((self.left[nodes], self.right[nodes]))
+
+        return np.concatenate(found)
+
+    def _allocate(self) -> int:
+        """
+        Returns a free node, the arrays grow when none is left
+        """
+        if not self.free:
+            self._grow(2 * len(self.bounds))
+
+        node = self.free.pop()
+        self.left[node] = -1
+        self.right[node] = -1
+        self.parent[node] = -1
+        return node
+
+    def _release(self, node: int) -> None:
+        """
+        Give a node back to the free list
+        :param node: Node to free
+        """
+        self.free.append(node)
+
+    def _grow(self, capacity: int) -> None:
+        """
+        Reallocate the node arrays with a bigger capacity
+        :param capacity: New number of nodes
+        """
+        size = len(self.bounds)
+        self.bounds = np.concatenate((self.bounds, np.zeros((capacity - size, 6), dtype=np.float32)))
+        for name in ('left', 'right', 'parent'):
+            setattr(self, name, np.concatenate((getattr(self, name), np.full(capacity - size, -1, dtype=np.int32))))
+        self.height = np.concatenate((self.height, np.zeros(capacity - size, dtype=np.int32)))
+        self.data = np.concatenate((self.data, np.zeros(capacity - size, dtype=np.int64)))
+        self.free.extend(range(capacity - 1, size - 1, -1))
+
+    @staticmethod
+    def _union(a: list[float], b: list[float]) -> list[float]:
+        """
+        Returns the box holding two boxes
+        """
+        return [min(a[0], b[0]), min(a[1], b[1]), min(a[2], b[2]),
+                max(a[3], b[3]), max(a[4], b[4]), max(a[5], b[5])]
+
+    @staticmethod
+    def _area(box: list[float]) -> float:
+        """
+        Returns the surface area of a box, the cost of a node in the surface area heuristic
+        """
+        dx, dy, dz = box[3] - box[0], box[4] - box[1], box[5] - box[2]
+        return 2.0 * (dx * dy + dy * dz + dz * dx)
+
+    @staticmethod
+    def _union_area(a: list[float], b: list[float]) -> float:
+        """
+        Returns the surface area of the box holding two boxes, without building that box
+        """
+        dx = (a[3] if a[3] > b[3] else b[3]) - (a[0] if a[0] < b[0] else b[0])
+        dy = (a[4] if a[4] > b[4] else b[4]) - (a[1] if a[1] < b[1] else b[1])
+        dz = (a[5] if a[5] > b[5] else b[5]) - (a[2] if a[2] < b[2] else b[2])
+        return 2.0 * (dx * dy + dy * dz + dz * dx)
+
+    def _insert_leaf(self, leaf: int) -> None:
+        """
+        Link a leaf in the tree next to the sibling that increases the surface area the least
+        :param leaf: Leaf node to link
+        """
+        if self.root == -1:
+            self.root = leaf
+            self.parent[leaf] = -1
+            return None
+
+        box = self.bounds[leaf].tolist()
+        left, right, bounds = self.left, self.right, self.bounds
+        area, union_area = self._area, self._union_area
+
+        # Descend while splitting a child is cheaper than making the leaf a sibling of the current node
+        node = self.root
+        node_box = bounds[node].tolist()
+        while left[node] != -1:
+            combined_area = union_area(node_box, box)
+            cost = 2.0 * combined_area
+            inheritance = 2.0 * (combined_area - area(node_box))
+
+            first, second = int(left[node]), int(right[node])
+            first_box, second_box = bounds[first].tolist(), bounds[second].tolist()
+            first_cost = union_area(first_box, box) + inheritance
+            if left[first] != -1:
+                first_cost -= area(first_box)
+            second_cost = union_area(second_box, box) + inheritance
+            if left[second] != -1:
+                second_cost -= area(second_box)
+
+            if cost < first_cost and cost < second_cost:
+                break
+            node, node_box = (first, first_box) if first_cost < second_cost else (second, second_box)
+
+        # A new parent takes the place of the sibling
+        sibling = node
+        old_parent = int(self.parent[sibling])
+        new_parent = self._allocate()
+        self.parent[new_parent] = old_parent
+        self.bounds[new_parent] = self._union(box, self.bounds[sibling].tolist())
+        self.height[new_parent] = self.height[sibling] + 1
+        self.left[new_parent] = sibling
+        self.right[new_parent] = leaf
+        self.parent[sibling] = new_parent
+        self.parent[leaf] = new_parent
+
+        if old_parent == -1:
+            self.root = new_parent
+        elif self.left[old_parent] == sibling:
+            self.left[old_parent] = new_parent
+        else:
+            self.right[old_parent] = new_parent
+
+        self._refit(int(self.parent[leaf]))
+
+    def _remove_leaf(self, leaf: int) -> None:
+        """
+        Unlink a leaf from the tree, its sibling takes the place of their parent
+        :param leaf: Leaf node to unlink
+        """
+        if leaf == self.root:
+            self.root = -1
+            return None
+
+        parent = int(self.parent[leaf])
+        grand_parent = int(self.parent[parent])
+        sibling = int(self.right[parent]) if self.left[parent] == leaf else int(self.left[parent])
+
+        self.parent[sibling] = grand_parent
+        self._release(parent)
+        if grand_parent == -1:
+            self.root = sibling
+            return None
+
+        if self.left[grand_parent] == parent:
+            self.left[grand_parent] = sibling
+        else:
+            self.right[grand_parent] = sibling
+        self._refit(grand_parent)
+
+    def _refit(self, node: int) -> None:
+        """
+        Balance and fit the boxes of a node and of its ancestors, up to the first ancestor left unchanged
+        :param node: First node to fit, its children changed
+        """
+        first = node
+        while node != -1:
+            balanced = self._balance(node)
+            left, right = int(self.left[balanced]), int(self.right[balanced])
+            height = 1 + max(int(self.height[left]), int(self.height[right]))
+            box = self._union(self.bounds[left].tolist(), self.bounds[right].tolist())
+
+            # Ancestors only depend on the height and the box of their children
+            if (node != first and balanced == node
+                    and height == self.height[node] and box == self.bounds[node].tolist()):
+                return None
+
+            self.height[balanced] = height
+            self.bounds[balanced] = box
+            node = int(self.parent[balanced])
+
+    def _balance(self, a: int) -> int:
+        """
+        Rotate the taller child of a node up until the heights of the children of every node it moves differ
+        by at most one, returns the node now at its place
+        :param a: Node to balance
+        """
+        if self.left[a] == -1:
+            return a
+
+        b, c = int(self.left[a]), int(self.right[a])
+        balance = self.height[c] - self.height[b]
+        if -1 <= balance <= 1:
+            return a
+
+        # The taller child goes up, the node takes its shorter grandchild
+        if balance > 1:
+            up, kept, a_side = c, b, self.right
+        else:
+            up, kept, a_side = b, c, self.left
+
+        f, g = int(self.left[up]), int(self.right[up])
+        taller, shorter = (f, g) if self.height[f] > self.height[g] else (g, f)
+
+        self.parent[up] = self.parent[a]
+        self.parent[a] = up
+        parent = int(self.parent[up])
+        if parent == -1:
+            self.root = up
+        elif self.left[parent] == a:
+            self.left[parent] = up
+        else:
+            self.right[parent] = up
+
+        # The node keeps its shorter child on the same side and takes the shorter grandchild on the other one
+        self.left[up], self.right[up] = (a, taller) if balance > 1 else (taller, a)
+        a_side[a] = shorter
+        self.parent[shorter] = a
+        self.parent[taller] = up
+
+        self.bounds[a] = self._union(self.bounds[kept].tolist(), self.bounds[shorter].tolist())
+        self.height[a] = 1 + max(self.height[kept], self.height[shorter])
+
+        # A leaf linked next to a tall sibling makes children differ by more than two, the node then still leans
+        # after one rotation and is balanced in turn, and so is the node that went up
+        a = self._balance(a)
+        self.bounds[up] = self._union(self.bounds[a].tolist(), self.bounds[taller].tolist())
+        self.height[up] = 1 + max(self.height[a], self.height[taller])
+        return self._balance(up)
@@ -0,0 +1,186 @@
+import ctypes
+
+import numpy as np
+
+from OpenGL.GL import *
+
+from model.gl_state import GL_STATE
+
+
+class StreamBuffer:
+    """
+    Ring buffer for data rewritten every frame, such as instance transforms.
+    The buffer is split in one region per frame in flight, a frame writes in its own region through unsynchronized
+    mappings and a fence guards the region until the GPU is done with it.
+    When the GPU is still using a region, or a frame does not fit in its region, the storage is orphaned instead
+    of waiting: the driver hands out new storage while the pending commands keep reading the old one.
+    Data drawn again in later frames must be declared with use, so its region stays fenced until those frames are done.
+    """
+    __slots__ = ('buffer', 'target', 'size', 'frames', 'epoch', 'head', 'fences', 'reads', 'orphans')
+
+    # Writes are mapped without synchronization, the fences make sure the GPU no longer reads the range
+    MAP_FLAGS: int = GL_MAP_WRITE_BIT | GL_MAP_UNSYNCHRONIZED_BIT | GL_MAP_INVALIDATE_RANGE_BIT
+
+    def __init__(self, size: int, frames: int = 3, target: int = GL_ARRAY_BUFFER):
+        """
+        Initialize the buffer
+        :param size: Size of the buffer in bytes, it is shared by the frames in flight and grows when a frame overflows
+        :param frames: Number of frames the GPU may lag behind before the buffer is orphaned
+        :param target: Binding target the buffer is written through
+        """
+        self.target = target
+        self.frames = max(1, frames)
+        self.size = max(self.frames * 256, size)
+
+        # Number of frames begun, the offset of the next write, and the fence of the last use of each region
+        self.epoch = 0
+        self.head = 0
+        self.fences: list = [None] * self.frames
+
+        # Regions of earlier frames read by the frame, they are fenced again at its end
+        self.reads: set[int] = set()
+
+        # Number of times the storage was orphaned, it stays at 0 when the GPU keeps up and the buffer is big enough
+        self.orphans = 0
+
+        self.buffer = glGenBuffers(1)
+        GL_STATE.bind_buffer(self.target, self.buffer)
+        glBufferData(self.target, self.size, None, GL_STREAM_DRAW)
+
+    @property
+    def region_size(self) -> int:
+        """
+        Returns the size of the region of each frame in bytes, regions start on 256 bytes boundaries
+        """
+        return self.size // self.frames // 256 * 256
+
+    @property
+    def region(self) -> int:
+        """
+        Returns the index of the region of the frame being written
+        """
+        return self.epoch % self.frames
+
+    def stamp(self) -> tuple[int, int]:
+        """
+        Returns a stamp of the writes of the frame, to check later whether they can still be drawn
+        """
+        return self.epoch, self.orphans
+
+    def is_live(self, stamp: tuple[int, int]) -> bool:
+        """
+        Returns whether data written with a stamp is still in the buffer, until its region is reused or orphaned
+        :param stamp: Stamp of the frame the data was written in
+        """
+        epoch, orphans = stamp
+        return orphans == self.orphans and self.epoch - epoch < self.frames
+
+    def use(self, stamp: tuple[int, int]) -> None:
+        """
+        Declare that the frame draws data written in an earlier frame, its region is not rewritten
+        before the GPU is done with this frame
+        :param stamp: Stamp of the frame the data was written in, the data must still be live
+        """
+        self.reads.add(stamp[0] % self.frames)
+
+    def begin_frame(self) -> None:
+        """
+        Move to the region of the next frame, the storage is orphaned if the GPU still reads it
+        """
+        self.epoch += 1
+        self.head = self.region * self.region_size
+
+        fence = self.fences[self.region]
+        if fence is None:
+            return None
+
+        # A zero timeout only polls the fence, waiting here would stall the CPU on the GPU
+        status = glClientWaitSync(fence, 0, 0)
+        glDeleteSync(fence)
+        self.fences[self.region] = None
+        if status not in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED):
+            self._orphan(self.size)
+
+    def end_frame(self) -> None:
+        """
+        Fence the region of the frame and the regions it read, after every command reading them.
+        The fence of a region read again replaces its older fence, which signals first
+        """
+        self.reads.add(self.region)
+        for region in self.reads:
+            if self.fences[region] is not None:
+                glDeleteSync(self.fences[region])
+            self.fences[region] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self.reads.clear()
+
+    def write(self, *arrays: np.ndarray | None, alignment: int = 16) -> list[int | None]:
+        """
+        Copy arrays in the region of the frame and returns the offset of each one in the buffer, None for missing arrays.
+        The arrays are allocated together, so a write growing the buffer never loses the others,
+        but growing orphans the earlier writes of the frame: draw what a write holds before the next write.
+        :param arrays: Contiguous arrays to copy, None entries are skipped
+        :param alignment: Alignment in bytes of every array in the buffer
+        """
+        sizes = [0 if array is None else -(-array.nbytes // alignment) * alignment for array in arrays]
+        total = sum(sizes)
+
+        start = -(-self.head // alignment) * alignment
+        if start + total > (self.region + 1) * self.region_size:
+            self._orphan(max(2 * self.size, 2 * self.frames * total))
+            start = self.head
+
+        offsets = []
+        offset = start
+        for array, size in zip(arrays, sizes):
+            offsets.append(None if array is None else offset)
+            offset += size
+        self.head = offset
+
+        if total == 0:
+            return offsets
+
+        GL_STATE.bind_buffer(self.target, self.buffer)
+        pointer = glMapBufferRange(self.target, start, total, self.MAP_FLAGS)
+        for array, array_offset in zip(arrays, offsets):
+            if array is not None:
+                array = np.ascontiguousarray(array)
+                ctypes.memmove(pointer + array_offset - start, array.ctypes.data, array.nbytes)
+
+        # The content of the mapping is lost when unmapping fails, it is sent again without the mapping
+        if not glUnmapBuffer(self.target):
+            for array, array_offset in zip(arrays, offsets):
+                if array is not None:
+                    glBufferSubData(self.target, array_offset, array.nbytes, np.ascontiguousarray(array))
+
+        return offsets
+
+    def _orphan(self, size: int) -> None:
+        """
+        Replace the storage with new storage, commands already issued keep the old one
+        :param size: Size of the new storage in bytes
+        """
+        self.size = size
+        self.head = self.region * self.region_size
+        self.orphans += 1
+
+        GL_STATE.bind_buffer(self.target, self.buffer)
+        glBufferData(self.target, self.size, None, GL_STREAM_DRAW)
+
+        # No command uses the new storage yet, and the data of earlier frames is gone with the old one
+        for i, fence in enumerate(self.fences):
+            if fence is not None:
+                glDeleteSync(fence)
+                self.fences[i] = None
+        self.reads.clear()
+
+    def destroy(self) -> None:
+        """
+        Free the buffer and the fences
+        """
+        for fence in self.fences:
+            if fence is not None:
+                glDeleteSync(fence)
+        self.fences = [None] * self.frames
+        self.reads.clear()
+        GL_STATE.forget_buffer(self.buffer)
+        glDeleteBuffers(1, (self.buffer,))
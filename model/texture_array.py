@@ -0,0 +1,166 @@
+from OpenGL.GL import *
+from PIL import Image
+
+from model.gl_state import GL_STATE
+from model.texture_manager import DecodedImage, TextureManager
+
+
+class TextureArray:
+    """
+    Images packed as the layers of a single 2D array texture, so entities using different images
+    can be drawn without binding another texture.
+    Layers take the size of the largest image added, smaller images are resized, and the memory of the array
+    is counted against the budget of the texture manager.
+    """
+    __slots__ = ('texture', 'textures', 'width', 'height', 'max_size', 'capacity', 'nbytes', 'layers', 'dirty')
+
+    def __init__(self, textures: TextureManager, max_size: int, capacity: int = 4):
+        """
+        Initialize the texture array, it is allocated when the first image is added
+        :param textures: Texture manager providing the decoded pixels and the memory budget
+        :param max_size: Largest width and height of the layers, bigger images are scaled down
+        :param capacity: Number of layers allocated up front
+        """
+        self.textures = textures
+        self.max_size = max_size
+        self.capacity = max(1, capacity)
+
+        self.texture = None
+        self.width = 0
+        self.height = 0
+
+        # Bytes reserved in the budget of the texture manager, mip levels included
+        self.nbytes = 0
+
+        # Layer of each image file
+        self.layers: dict[str, int] = {}
+
+        # Mip levels must be generated again after a layer changes
+        self.dirty = False
+
+    def _allocate(self, capacity: int, width: int, height: int) -> int:
+        """
+        Returns a new array texture with the given number and size of layers
+        :param capacity: Number of layers
+        :param width: Width of every layer
+        :param height: Height of every layer
+        """
+        texture = glGenTextures(1)
+        GL_STATE.bind_texture(0, GL_TEXTURE_2D_ARRAY, texture, select=True)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_S, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_T, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_NEAREST_MIPMAP_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage3D(GL_TEXTURE_2D_ARRAY, 0, GL_RGBA8,
+                     width, height, capacity, 0,
+                     GL_RGBA, GL_UNSIGNED_BYTE, None)
+        return texture
+
+    def add(self, filepath: str) -> int:
+        """
+        Returns the layer of an image file, the image is decoded and uploaded in a new layer if needed
+        :param filepath: Path to the image file
+        """
+        layer = self.layers.get(filepath)
+        if layer is not None:
+            return layer
+
+        layer = len(self.layers)
+        image = self.textures.load_image(filepath)
+
+        # The layers grow to the largest image, and their number doubles when they are all used
+        width = min(max(self.width, image.width), self.max_size)
+        height = min(max(self.height, image.height), self.max_size)
+        capacity = 2 * self.capacity if layer == self.capacity else self.capacity
+        if self.texture is None or (width, height, capacity) != (self.width, self.height, self.capacity):
+            self._reallocate(capacity, width, height)
+
+        pixels = image.pixels
+        if (image.width, image.height) != (self.width, self.height):
+            pixels = self.resize(image, self.width, self.height)
+
+        GL_STATE.bind_texture(0, GL_TEXTURE_2D_ARRAY, self.texture, select=True)
+        glTexSubImage3D(GL_TEXTURE_2D_ARRAY, 0,
+                        0, 0, layer,
+                        self.width, self.height, 1,
+                        GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+
+        self.layers[filepath] = layer
+        self.dirty = True
+        return layer
+
+    @staticmethod
+    def resize(image: DecodedImage, width: int, height: int) -> bytes:
+        """
+        Returns the pixels of an image resized to the size of the layers, texture coordinates still cover the whole image
+        :param image: Decoded image
+        :param width: Width of the layers
+        :param height: Height of the layers
+        """
+        resized = Image.frombuffer('RGBA', (image.width, image.height), image.pixels, 'raw', 'RGBA', 0, 1)
+        return resized.resize((width, height), Image.BILINEAR).tobytes()
+
+    def _reallocate(self, capacity: int, width: int, height: int) -> None:
+        """
+        Replace the array with one of another number or size of layers, the existing layers are copied on the GPU
+        and scaled when their size changes
+        :param capacity: New number of layers
+        :param width: New width of the layers
+        :param height: New height of the layers
+        """
+        # Room is made before allocating, the old array is given back once freed
+        nbytes = TextureManager.mip_chain_bytes(width, height) * capacity
+        self.textures.reserve(nbytes)
+        texture = self._allocate(capacity, width, height)
+
+        if self.texture is not None:
+            # Copy the base level of every layer between two framebuffers
+            previous = glGetIntegerv(GL_READ_FRAMEBUFFER_BINDING), glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
+            framebuffers = glGenFramebuffers(2)
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, framebuffers[0])
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, framebuffers[1])
+            scaled = (width, height) != (self.width, self.height)
+            for layer in range(len(self.layers)):
+                glFramebufferTextureLayer(GL_READ_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, self.texture, 0, layer)
+                glFramebufferTextureLayer(GL_DRAW_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, texture, 0, layer)
+                glBlitFramebuffer(0, 0, self.width, self.height, 0, 0, width, height,
+                                  GL_COLOR_BUFFER_BIT, GL_LINEAR if scaled else GL_NEAREST)
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, previous[0])
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, previous[1])
+            glDeleteFramebuffers(2, framebuffers)
+
+            self._free()
+
+        self.texture = texture
+        self.nbytes = nbytes
+        self.capacity = capacity
+        self.width = width
+        self.height = height
+        self.dirty = True
+
+    def use(self) -> None:
+        """
+        Use the texture array for drawing
+        """
+        GL_STATE.bind_texture(0, GL_TEXTURE_2D_ARRAY, self.texture, select=self.dirty)
+
+        if self.dirty:
+            glGenerateMipmap(GL_TEXTURE_2D_ARRAY)
+            self.dirty = False
+
+    def _free(self) -> None:
+        """
+        Delete the array texture and give its memory back to the budget
+        """
+        GL_STATE.forget_texture(self.texture)
+        glDeleteTextures(1, (self.texture,))
+        self.textures.unreserve(self.nbytes)
+        self.texture = None
+        self.nbytes = 0
+
+    def destroy(self) -> None:
+        """
+        Free the texture array
+        """
+        if self.texture is not None:
+            self._free()
@@ -0,0 +1,241 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from OpenGL.GL import *
+from PIL import Image
+
+from model.gl_state import GL_STATE
+
+
+class Texture:
+    """
+    A texture shared by every material using the same image file
+    """
+    __slots__ = ('filepath', 'texture', 'refs', 'nbytes')
+
+    def __init__(self, filepath: str):
+        """
+        Initialize the texture, the manager uploads it
+        :param filepath: Path to the image file
+        """
+        self.filepath = filepath
+        self.texture = None
+        self.refs = 0
+        self.nbytes = 0
+
+
+class DecodedImage:
+    """
+    RGBA pixels of an image file, ready to be uploaded
+    """
+    __slots__ = ('width', 'height', 'pixels')
+
+    def __init__(self, width: int, height: int, pixels: bytes):
+        """
+        Initialize the decoded image
+        :param width: Width of the image
+        :param height: Height of the image
+        :param pixels: Tightly packed RGBA rows, handed to the driver as is
+        """
+        self.width = width
+        self.height = height
+        self.pixels = pixels
+
+
+class TextureManager:
+    """
+    Share textures between materials, count their users and keep the memory they use under a budget.
+    Textures are evicted in least recently used order and uploaded again when used.
+    """
+    __slots__ = ('budget', 'textures', 'resident', 'resident_bytes', 'reserved_bytes', 'uploads', 'evictions',
+                 'pending')
+
+    def __init__(self, budget: int):
+        """
+        Initialize the manager
+        :param budget: Maximum number of bytes of texture memory, mip levels included
+        """
+        self.budget = budget
+
+        # Every texture with at least one user, by file path
+        self.textures: dict[str, Texture] = {}
+
+        # Uploaded textures, from least to most recently used
+        self.resident: OrderedDict[str, Texture] = OrderedDict()
+        self.resident_bytes = 0
+
+        # Memory allocated outside the manager and counted against the budget, such as texture arrays
+        self.reserved_bytes = 0
+
+        self.uploads = 0
+        self.evictions = 0
+
+        # Images being decoded in the background, by file path
+        self.pending: dict[str, Future] = {}
+
+    def preload(self, filepaths: list[str], workers: int) -> None:
+        """
+        Start decoding image files on a thread pool, acquire then only waits for the decoded pixels
+        :param filepaths: Paths to the image files
+        :param workers: Number of decoding threads
+        """
+        filepaths = [filepath for filepath in dict.fromkeys(filepaths)
+                     if filepath not in self.pending and filepath not in self.textures]
+        if not filepaths:
+            return None
+
+        # Pillow releases the GIL while decoding and converting, so threads decode in parallel
+        executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(filepaths))))
+        for filepath in filepaths:
+            self.pending[filepath] = executor.submit(self.decode, filepath)
+        executor.shutdown(wait=False)
+
+    @staticmethod
+    def decode(filepath: str) -> DecodedImage:
+        """
+        Returns the RGBA pixels of an image file, safe to call from any thread
+        :param filepath: Path to the image file
+        """
+        with Image.open(filepath, mode='r') as image:
+            if image.mode != 'RGBA':
+                image = image.convert('RGBA')
+            return DecodedImage(image.width, image.height, image.tobytes())
+
+    def load_image(self, filepath: str) -> DecodedImage:
+        """
+        Returns the decoded pixels of an image file, waiting for the background decoding if it was preloaded
+        :param filepath: Path to the image file
+        """
+        future = self.pending.pop(filepath, None)
+        return future.result() if future is not None else self.decode(filepath)
+
+    def acquire(self, filepath: str) -> Texture:
+        """
+        Returns the texture of an image file and registers one more user
+        :param filepath: Path to the image file
+        """
+        texture = self.textures.get(filepath)
+        if texture is None:
+            texture = Texture(filepath)
+            self.textures[filepath] = texture
+            self._upload(texture)
+
+        texture.refs += 1
+        return texture
+
+    def release(self, texture: Texture) -> None:
+        """
+        Unregister a user of a texture, the texture is freed when it has no user left
+        :param texture: Texture returned by acquire
+        """
+        texture.refs -= 1
+        if texture.refs > 0:
+            return None
+
+        self._evict(texture)
+        del self.textures[texture.filepath]
+
+    def use(self, texture: Texture) -> None:
+        """
+        Bind a texture for drawing, it is uploaded again if it was evicted
+        :param texture: Texture returned by acquire
+        """
+        if texture.texture is None:
+            self._upload(texture)
+        else:
+            self.resident.move_to_end(texture.filepath)
+
+        GL_STATE.bind_texture(0, GL_TEXTURE_2D, texture.texture)
+
+    def reserve(self, nbytes: int) -> None:
+        """
+        Count memory allocated outside the manager against the budget, textures are evicted to make room.
+        Reserved memory is never evicted, it is given back with unreserve
+        :param nbytes: Number of bytes about to be allocated
+        """
+        self._make_room(nbytes)
+        self.reserved_bytes += nbytes
+
+    def unreserve(self, nbytes: int) -> None:
+        """
+        Give back memory counted by reserve once it is freed
+        :param nbytes: Number of bytes freed
+        """
+        self.reserved_bytes -= nbytes
+
+    @staticmethod
+    def mip_chain_bytes(width: int, height: int, texel_bytes: int = 4) -> int:
+        """
+        Returns the size of a texture and all its mip levels
+        :param width: Width of the base level
+        :param height: Height of the base level
+        :param texel_bytes: Size of a texel
+        """
+        nbytes = 0
+        while True:
+            nbytes += width * height * texel_bytes
+            if width == 1 and height == 1:
+                return nbytes
+            width = max(1, width // 2)
+            height = max(1, height // 2)
+
+    def _upload(self, texture: Texture) -> None:
+        """
+        Upload an image file, evicting other textures to stay under the budget
+        :param texture: Texture to upload
+        """
+        image = self.load_image(texture.filepath)
+
+        nbytes = self.mip_chain_bytes(image.width, image.height)
+        self._make_room(nbytes)
+
+        texture.texture = glGenTextures(1)
+        GL_STATE.bind_texture(0, GL_TEXTURE_2D, texture.texture, select=True)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST_MIPMAP_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA,
+                     image.width, image.height, 0,
+                     GL_RGBA, GL_UNSIGNED_BYTE, image.pixels)
+        glGenerateMipmap(GL_TEXTURE_2D)
+
+        texture.nbytes = nbytes
+        self.resident[texture.filepath] = texture
+        self.resident_bytes += nbytes
+        self.uploads += 1
+
+    def _make_room(self, nbytes: int) -> None:
+        """
+        Evict least recently used textures until nbytes more fit in the budget, or nothing is left to evict
+        :param nbytes: Number of bytes about to be uploaded
+        """
+        while self.resident and self.resident_bytes + self.reserved_bytes + nbytes > self.budget:
+            self._evict(next(iter(self.resident.values())))
+            self.evictions += 1
+
+    def _evict(self, texture: Texture) -> None:
+        """
+        Free the memory of a texture, it stays known to the manager
+        :param texture: Texture to free
+        """
+        if texture.texture is None:
+            return None
+
+        GL_STATE.forget_texture(texture.texture)
+        glDeleteTextures(1, (texture.texture,))
+        texture.texture = None
+        del self.resident[texture.filepath]
+        self.resident_bytes -= texture.nbytes
+
+    def destroy(self) -> None:
+        """
+        Free every texture
+        """
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+        for texture in list(self.resident.values()):
+            self._evict(texture)
+        self.textures.clear()
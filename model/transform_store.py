@@ -0,0 +1,250 @@
+import numpy as np
+
+
+class TransformStore:
+    """
+    Structure of arrays holding the position and orientation of many entities,
+    the model transforms of the rows written since the last update are computed at once in a single vectorized pass.
+    The state of the rows at the start of the last simulation step is kept, so the model transforms can be
+    interpolated between updates.
+    """
+    __slots__ = ('positions', 'eulers', 'models', 'owners', 'count', 'proxies', 'released', 'dirty', 'dirty_rows',
+                 'previous_positions', 'previous_eulers', 'updated', 'interpolated', 'versions')
+
+    def __init__(self, capacity: int = 16):
+        """
+        Initialize the store
+        :param capacity: Number of rows allocated up front
+        """
+        capacity = max(1, capacity)
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.eulers = np.zeros((capacity, 3), dtype=np.float32)
+        self.models = np.zeros((capacity, 4, 4), dtype=np.float32)
+        self.models[:] = np.eye(4, dtype=np.float32)
+        self.owners: list = []
+        self.count = 0
+
+        # Proxy of each row in a spatial index, -1 until the row is indexed,
+        # the proxies of freed rows are kept until the index removes them
+        self.proxies = np.full(capacity, -1, dtype=np.int32)
+        self.released: list[int] = []
+
+        # Rows whose model transform is out of date
+        self.dirty = np.zeros(capacity, dtype=bool)
+        self.dirty_rows: list[int] = []
+
+        # State of every row at the start of the simulation step, saved by begin_step, it only differs from
+        # the current state for the rows written during the step, which the update lists in updated
+        self.previous_positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.previous_eulers = np.zeros((capacity, 3), dtype=np.float32)
+        self.updated = np.zeros(0, dtype=np.int64)
+
+        # Whether the model transforms of the updated rows hold interpolated states
+        self.interpolated = False
+
+        # Incremented every time the model transform of a row is written, so its users can tell it changed
+        self.versions = np.zeros(capacity, dtype=np.uint32)
+
+    def allocate(self, owner, position: tuple | list | np.ndarray, eulers: tuple | list | np.ndarray) -> int:
+        """
+        Reserve a row for an entity and returns its index
+        :param owner: Object viewing the row, its index is updated if the row moves
+        :param position: Initial position
+        :param eulers: Initial orientation
+        """
+        if self.count == len(self.positions):
+            self._grow(2 * self.count)
+
+        index = self.count
+        self.positions[index] = position
+        self.eulers[index] = eulers
+        self.previous_positions[index] = position
+        self.previous_eulers[index] = eulers
+        self.proxies[index] = -1
+        self.owners.append(owner)
+        self.count += 1
+        self.mark_dirty(index)
+
+        return index
+
+    def release(self, index: int) -> None:
+        """
+        Free a row, the last row is moved in its place so the used rows stay contiguous
+        :param index: Index of the row to free
+        """
+        if self.proxies[index] >= 0:
+            self.released.append(int(self.proxies[index]))
+
+        last = self.count - 1
+        if index != last:
+            self._move(last, index)
+            self.owners[index] = self.owners[last]
+            self.owners[index].index = index
+
+        self.owners.pop()
+        self.dirty[last] = False
+        self.count -= 1
+
+    def begin_step(self) -> None:
+        """
+        Save the state of every row as its previous state, at the start of a simulation step before anything
+        is written, so the rows written during the step are interpolated from where the step started
+        """
+        self.previous_positions[:self.count] = self.positions[:self.count]
+        self.previous_eulers[:self.count] = self.eulers[:self.count]
+
+    def mark_dirty(self, index: int) -> None:
+        """
+        Flag a row whose position or orientation is about to be written, its model transform is computed
+        by the next update
+        :param index: Index of the row
+        """
+        if not self.dirty[index]:
+            self.dirty[index] = True
+            self.dirty_rows.append(index)
+
+    def _move(self, source: int, target: int) -> None:
+        """
+        Copy the data of a row to another row
+        :param source: Index of the row to copy
+        :param target: Index of the row overwritten
+        """
+        self.positions[target] = self.positions[source]
+        self.eulers[target] = self.eulers[source]
+        self.models[target] = self.models[source]
+        self.proxies[target] = self.proxies[source]
+        self.previous_positions[target] = self.previous_positions[source]
+        self.previous_eulers[target] = self.previous_eulers[source]
+
+        # The moved row needs its index data written again, flagging it is how its users learn about it
+        self.mark_dirty(target)
+
+    def _grow(self, capacity: int) -> None:
+        """
+        Reallocate the arrays with a bigger capacity
+        :param capacity: New number of rows
+        """
+        count = self.count
+
+        positions = np.zeros((capacity, 3), dtype=np.float32)
+        positions[:count] = self.positions[:count]
+        self.positions = positions
+
+        eulers = np.zeros((capacity, 3), dtype=np.float32)
+        eulers[:count] = self.eulers[:count]
+        self.eulers = eulers
+
+        models = np.zeros((capacity, 4, 4), dtype=np.float32)
+        models[:] = np.eye(4, dtype=np.float32)
+        models[:count] = self.models[:count]
+        self.models = models
+
+        proxies = np.full(capacity, -1, dtype=np.int32)
+        proxies[:count] = self.proxies[:count]
+        self.proxies = proxies
+
+        dirty = np.zeros(capacity, dtype=bool)
+        dirty[:count] = self.dirty[:count]
+        self.dirty = dirty
+
+        previous_positions = np.zeros((capacity, 3), dtype=np.float32)
+        previous_positions[:count] = self.previous_positions[:count]
+        self.previous_positions = previous_positions
+
+        previous_eulers = np.zeros((capacity, 3), dtype=np.float32)
+        previous_eulers[:count] = self.previous_eulers[:count]
+        self.previous_eulers = previous_eulers
+
+        versions = np.zeros(capacity, dtype=np.uint32)
+        versions[:count] = self.versions[:count]
+        self.versions = versions
+
+    def update(self) -> np.ndarray:
+        """
+        Compute the model transform of the dirty rows, equivalent to Ry * Rz * T for each entity,
+        and returns the sorted indices of the rows whose model transform was written
+        """
+        rows = np.unique(np.array(self.dirty_rows, dtype=np.int64))
+        rows = rows[rows < self.count]
+        self.dirty[rows] = False
+        self.dirty_rows.clear()
+
+        # The rows updated last time and not written since did not move during this update
+        still = np.setdiff1d(self.updated[self.updated < self.count], rows, assume_unique=True)
+        self.updated = rows
+
+        # Interpolated model transforms of those rows are replaced by the exact ones
+        if self.interpolated:
+            rows = np.union1d(rows, still)
+            self.interpolated = False
+
+        # Contiguous slices are much faster than gathers when everything moved
+        if len(rows) == self.count:
+            self._compute_models(slice(0, self.count))
+        elif len(rows):
+            self._compute_models(rows)
+        return rows
+
+    def interpolate(self, alpha: float) -> np.ndarray:
+        """
+        Compute the model transforms of the rows moved by the last update at a point between their previous
+        and current states, and returns the indices of those rows. The next update makes them exact again.
+        :param alpha: Fraction of the way from the previous to the current state, 1 is the current state
+        """
+        rows = self.updated[self.updated < self.count]
+        if len(rows) == 0:
+            return rows
+
+        previous = self.previous_positions[rows]
+        positions = previous + alpha * (self.positions[rows] - previous)
+
+        # Angles go the short way round, the orientations wrap at 360 degrees
+        previous = self.previous_eulers[rows]
+        turns = (self.eulers[rows] - previous + 180.0) % 360.0 - 180.0
+        eulers = previous + alpha * turns
+
+        self._compute_models(rows, positions, eulers)
+        self.interpolated = True
+        return rows
+
+    def _compute_models(self, rows: slice | np.ndarray,
+                        positions: np.ndarray = None, eulers: np.ndarray = None) -> None:
+        """
+        Compute the model transform of some rows
+        :param rows: Slice or indices of the rows
+        :param positions: Positions of the rows, the stored ones if not given
+        :param eulers: Orientations of the rows, the stored ones if not given
+        """
+        positions = self.positions[rows] if positions is None else positions
+        eulers = self.eulers[rows] if eulers is None else eulers
+
+        angles = np.deg2rad(eulers[:, 1:])
+        cos = np.cos(angles)
+        sin = np.sin(angles)
+        cy, cz = cos[:, 0], cos[:, 1]
+        sy, sz = sin[:, 0], sin[:, 1]
+
+        # A slice is written in place, a gather needs a temporary array
+        in_place = isinstance(rows, slice)
+        models = self.models[rows] if in_place else np.empty((len(angles), 4, 4), dtype=np.float32)
+        models[:, 0, 0] = cy * cz
+        models[:, 0, 1] = -cy * sz
+        models[:, 0, 2] = sy
+        models[:, 1, 0] = sz
+        models[:, 1, 1] = cz
+        models[:, 1, 2] = 0.0
+        models[:, 2, 0] = -sy * cz
+        models[:, 2, 1] = sy * sz
+        models[:, 2, 2] = cy
+        models[:, :3, 3] = 0.0
+        models[:, 3, :3] = positions
+        models[:, 3, 3] = 1.0
+        if not in_place:
+            self.models[rows] = models
+        self.versions[rows] += 1
+
+    def get_model_transforms(self) -> np.ndarray:
+        """
+        Returns the model transforms of every used row, as a N x 4 x 4 array
+        """
+        return self.models[:self.count]
@@ -13,6 +13,86 @@ RETURN_ACTION_END: int = 1
 
 RATE: float = 1000.0 / 144.0
 
+# Duration of a simulation step in milliseconds, the scene advances by this step whatever the frame rate
+SIMULATION_STEP: float = 1000.0 / 144.0
+
+# Steps simulated at most in a frame, time past that is dropped so a slow frame can not snowball
+MAX_SIMULATION_STEPS: int = 8
+
+# Screen refreshes between buffer swaps, 0 swaps as soon as a frame is drawn
+SWAP_INTERVAL: int = 1
+
+# Frame rate the main loop sleeps down to, 0 for no limit
+FRAME_RATE_CAP: float = 0.0
+
+# PyOpenGL platform of the headless renderer, 'egl' (surfaceless) or 'osmesa'
+HEADLESS_BACKEND: str = 'egl'
+
+# Time the phases of every frame, the summary and a Chrome trace are written when the app quits
+PROFILING: bool = False
+PROFILER_CAPACITY: int = 65536
+PROFILER_TRACE: str = 'trace.json'
+
+# Check for OpenGL errors after every call of the per frame paths, they go unchecked otherwise
+GL_DEBUG: bool = False
+
+# Perspective projection
+FOVY: float = 45.0
+NEAR: float = 0.1
+FAR: float = 10.0
+
+# Compiled meshes are stored here so OBJ files are only parsed once
+MESH_CACHE_DIR: str = '.cache/meshes'
+
+# Linked shader programs are stored here so every variant is only compiled once per driver
+PROGRAM_CACHE_DIR: str = '.cache/programs'
+
+# Texture memory allowed before least recently used textures are evicted, in bytes
+TEXTURE_BUDGET: int = 256 * 2 ** 20
+
+# Threads decoding image files while the other assets are created
+TEXTURE_DECODE_WORKERS: int = 4
+
+# Skip the entities whose bounding sphere is outside the view frustum
+FRUSTUM_CULLING: bool = True
+
+# Distance the boxes of the spatial index are fattened by, entities moving less than that are not moved in the index
+SPATIAL_INDEX_MARGIN: float = 0.1
+
+# Draw every entity of a type with a single instanced draw call
+INSTANCED_RENDERING: bool = True
+
+# Ring buffer the instance data is streamed through, in bytes, and frames the GPU may lag behind before it is orphaned
+STREAM_BUFFER_SIZE: int = 4 * 2 ** 20
+FRAMES_IN_FLIGHT: int = 3
+
+# Pack every image in the layers of one array texture so entity types sharing a mesh share a draw call,
+# needs instanced rendering. Layers take the size of the largest image up to TEXTURE_ARRAY_SIZE,
+# the array is counted against TEXTURE_BUDGET
+TEXTURE_ARRAY: bool = INSTANCED_RENDERING
+TEXTURE_ARRAY_SIZE: int = 1024
+
+# Size of the light array of the shaders without clustered lighting, lights past it are ignored
+MAX_LIGHTS: int = 8
+
+# Split the view frustum in clusters and only shade the lights reaching each cluster,
+# there is then no limit on the number of lights
+CLUSTERED_LIGHTING: bool = True
+
+# Number of clusters along the screen width, the screen height and the depth
+CLUSTER_GRID: tuple[int, int, int] = (16, 9, 24)
+
+# Lights are ignored where their strength divided by the squared distance falls under this value
+LIGHT_CUTOFF: float = 1.0 / 256.0
+
+# Uniform buffer binding points
+UNIFORM_BLOCK_BINDING: dict[str, int] = {
+    "LIGHTS": 0,
+}
+
+# Orient billboards toward the camera in the vertex shader, needs instanced rendering
+GPU_BILLBOARDS: bool = INSTANCED_RENDERING
+
 GLOBAL_X: np.ndarray = np.array([1, 0, 0], dtype=np.float32)
 GLOBAL_Y: np.ndarray = np.array([0, 1, 0], dtype=np.float32)
 GLOBAL_Z: np.ndarray = np.array([0, 0, 1], dtype=np.float32)
@@ -23,18 +103,17 @@ ENTITY_TYPE: dict[str, int] = {
     "MEDKIT": 2,
 }
 
-UNIFORM_TYPE: dict[str, int] = {
-    "MODEL": 0,
-    "VIEW": 1,
-    "PROJECTION": 2,
-    "CAMERA_POS": 3,
-    "LIGHT_COLOR": 4,
-    "LIGHT_POS": 5,
-    "LIGHT_STRENGTH": 6,
-    "TINT": 7,
-}
+BILLBOARD_TYPES: tuple[int, ...] = (
+    ENTITY_TYPE['POINTLIGHT'],
+    ENTITY_TYPE['MEDKIT'],
+)
 
 PIPELINE_TYPE: dict[str, int] = {
     "STANDARD": 0,
     "EMISSIVE": 1,
 }
+
+# Profiler scope of the pass drawing each pipeline
+PIPELINE_PASS: dict[int, str] = {
+    pipeline: f'{name.lower()} pass' for name, pipeline in PIPELINE_TYPE.items()
+}
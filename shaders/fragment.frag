@@ -3,39 +3,83 @@
 struct PointLight
 {
     vec3 position;
-    vec3 color;
     float strength;
+    vec3 color;
 };
 
 in vec2 fragmentTexCoord;
 in vec3 fragmentPosition;
 in vec3 fragmentNormal;
 
+#ifdef TEXTURE_ARRAY
+flat in float fragmentLayer;
+uniform sampler2DArray imageTexture;
+#define sampleImage(texCoord) texture(imageTexture, vec3(texCoord, fragmentLayer))
+#else
 uniform sampler2D imageTexture;
-uniform PointLight Lights[8];
+#define sampleImage(texCoord) texture(imageTexture, texCoord)
+#endif
+#ifdef CLUSTERED_LIGHTING
+// Two texels per light: position and strength, then color and radius
+uniform samplerBuffer lightData;
+// Offset and count of the lights of each cluster in clusterLights
+uniform usamplerBuffer clusterRanges;
+uniform usamplerBuffer clusterLights;
+uniform ivec3 clusterGrid;
+// Depth slice of a view distance d is log(d) * clusterDepth.x + clusterDepth.y
+uniform vec2 clusterDepth;
+uniform mat4 view;
+uniform mat4 projection;
+#else
+layout(std140) uniform LightBlock
+{
+    int lightCount;
+    PointLight lights[MAX_LIGHTS];
+};
+#endif
 uniform vec3 cameraPosition;
 uniform vec3 tint;
 
 out vec4 color;
 
-vec3 computePointLight(PointLight light, vec3 fragmentPosition, vec3 fragmentNormal);
+vec3 computePointLight(PointLight light, vec3 fragmentPosition, vec3 fragmentNormal, vec3 baseTexture);
 
 void main()
 {
     // Ambient lighting
-    vec4 baseTexture = texture(imageTexture, fragmentTexCoord);
+    vec4 baseTexture = sampleImage(fragmentTexCoord);
     vec3 temp = 0.2 * baseTexture.rgb;
 
-    for (int i = 0; i < 8; ++i){
-        temp += computePointLight(Lights[i], fragmentPosition, fragmentNormal);
+#ifdef CLUSTERED_LIGHTING
+    // Cluster of the fragment, found the same way the lights were binned
+    vec3 viewPosition = (view * vec4(fragmentPosition, 1.0)).xyz;
+    float distance = -viewPosition.z;
+    vec2 ndc = vec2(projection[0][0], projection[1][1]) * viewPosition.xy / distance;
+    ivec3 cell = ivec3(vec3((ndc + 1.0) * 0.5, log(distance) * clusterDepth.x + clusterDepth.y)
+                       * vec3(clusterGrid.xy, 1.0));
+    cell = clamp(cell, ivec3(0), clusterGrid - 1);
+    uvec2 range = texelFetch(clusterRanges, (cell.z * clusterGrid.y + cell.y) * clusterGrid.x + cell.x).xy;
+
+    for (uint i = 0u; i < range.y; ++i){
+        int index = 2 * int(texelFetch(clusterLights, int(range.x + i)).r);
+        vec4 positionStrength = texelFetch(lightData, index);
+        vec4 colorRadius = texelFetch(lightData, index + 1);
+        if (length(positionStrength.xyz - fragmentPosition) < colorRadius.w){
+            PointLight light = PointLight(positionStrength.xyz, positionStrength.w, colorRadius.rgb);
+            temp += computePointLight(light, fragmentPosition, fragmentNormal, baseTexture.rgb);
+        }
+    }
+#else
+    for (int i = 0; i < lightCount; ++i){
+        temp += computePointLight(lights[i], fragmentPosition, fragmentNormal, baseTexture.rgb);
     }
+#endif
     color = vec4(temp, baseTexture.a);
 }
 
-vec3 computePointLight(PointLight light, vec3 fragmentPosition, vec3 fragmentNormal)
+vec3 computePointLight(PointLight light, vec3 fragmentPosition, vec3 fragmentNormal, vec3 baseTexture)
 {
     vec3 result = vec3(0.0);
-    vec3 baseTexture = texture(imageTexture, fragmentTexCoord).rgb;
 
     // Geometric data
     vec3 fragLight = light.position - fragmentPosition;
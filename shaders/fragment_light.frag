@@ -1,13 +1,20 @@
 #version 330 core
 
 in vec2 fragmentTexCoord;
+in vec3 fragmentTint;
 
+#ifdef TEXTURE_ARRAY
+flat in float fragmentLayer;
+uniform sampler2DArray imageTexture;
+#define sampleImage(texCoord) texture(imageTexture, vec3(texCoord, fragmentLayer))
+#else
 uniform sampler2D imageTexture;
-uniform vec3 tint;
+#define sampleImage(texCoord) texture(imageTexture, texCoord)
+#endif
 
 out vec4 color;
 
 void main()
 {
-    color = vec4(tint, 1.0) * texture(imageTexture, fragmentTexCoord);
+    color = vec4(fragmentTint, 1.0) * sampleImage(fragmentTexCoord);
 }
\ No newline at end of file
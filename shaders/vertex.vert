@@ -4,7 +4,19 @@ layout (location=0) in vec3 vertexPos;
 layout (location=1) in vec2 vertexTexCoord;
 layout (location=2) in vec3 vertexNormal;
 
+#ifdef INSTANCED
+layout (location=3) in mat4 model;
+uniform bool billboard;
+uniform vec3 cameraPosition;
+#else
 uniform mat4 model;
+#endif
+
+#ifdef TEXTURE_ARRAY
+layout (location=8) in float layer;
+flat out float fragmentLayer;
+#endif
+
 uniform mat4 view;
 uniform mat4 projection;
 
@@ -14,8 +26,27 @@ out vec3 fragmentNormal;
 
 void main()
 {
-    gl_Position = projection * view * model * vec4(vertexPos, 1.0);
+    vec4 position = model * vec4(vertexPos, 1.0);
+    vec3 normal = mat3(model) * vertexNormal;
+
+#ifdef INSTANCED
+    if (billboard) {
+        // Build the camera facing quad around the instance center
+        vec3 center = model[3].xyz;
+        vec3 forwards = normalize(center - cameraPosition);
+        vec3 right = cross(vec3(0.0, 0.0, 1.0), forwards);
+        right = length(right) < 0.0001 ? vec3(0.0, 1.0, 0.0) : normalize(right);
+        vec3 up = cross(forwards, right);
+        position = vec4(center + vertexPos.y * right + vertexPos.z * up, 1.0);
+        normal = forwards;
+    }
+#endif
+
+    gl_Position = projection * view * position;
     fragmentTexCoord = vertexTexCoord;
-    fragmentPosition = (model * vec4(vertexPos, 1.0)).xyz;
-    fragmentNormal = mat3(model) * vertexNormal;
+#ifdef TEXTURE_ARRAY
+    fragmentLayer = layer;
+#endif
+    fragmentPosition = position.xyz;
+    fragmentNormal = normal;
 }
\ No newline at end of file
@@ -3,14 +3,47 @@
 layout (location=0) in vec3 vertexPos;
 layout (location=1) in vec2 vertexTexCoord;
 
+#ifdef INSTANCED
+layout (location=3) in mat4 model;
+layout (location=7) in vec3 tint;
+uniform bool billboard;
+uniform vec3 cameraPosition;
+#else
 uniform mat4 model;
+uniform vec3 tint;
+#endif
+
+#ifdef TEXTURE_ARRAY
+layout (location=8) in float layer;
+flat out float fragmentLayer;
+#endif
+
 uniform mat4 view;
 uniform mat4 projection;
 
 out vec2 fragmentTexCoord;
+out vec3 fragmentTint;
 
 void main()
 {
-    gl_Position = projection * view * model * vec4(vertexPos, 1.0);
+    vec4 position = model * vec4(vertexPos, 1.0);
+
+#ifdef INSTANCED
+    if (billboard) {
+        // Build the camera facing quad around the instance center
+        vec3 center = model[3].xyz;
+        vec3 forwards = normalize(center - cameraPosition);
+        vec3 right = cross(vec3(0.0, 0.0, 1.0), forwards);
+        right = length(right) < 0.0001 ? vec3(0.0, 1.0, 0.0) : normalize(right);
+        vec3 up = cross(forwards, right);
+        position = vec4(center + vertexPos.y * right + vertexPos.z * up, 1.0);
+    }
+#endif
+
+    gl_Position = projection * view * position;
     fragmentTexCoord = vertexTexCoord;
+#ifdef TEXTURE_ARRAY
+    fragmentLayer = layer;
+#endif
+    fragmentTint = tint;
 }
\ No newline at end of file
@@ -0,0 +1,59 @@
+import numpy as np
+
+from OpenGL.GL import *
+
+
+class Framebuffer:
+    """
+    Framebuffer object with a color and a depth attachment, drawn into when there is no window
+    """
+    __slots__ = ('framebuffer', 'renderbuffers', 'width', 'height')
+
+    def __init__(self, width: int, height: int):
+        """
+        Create the framebuffer and its attachments
+        :param width: Width of the attachments
+        :param height: Height of the attachments
+        """
+        self.width = width
+        self.height = height
+
+        self.framebuffer = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+
+        self.renderbuffers = glGenRenderbuffers(2)
+        attachments = ((GL_RGBA8, GL_COLOR_ATTACHMENT0), (GL_DEPTH24_STENCIL8, GL_DEPTH_STENCIL_ATTACHMENT))
+        for renderbuffer, (internal_format, attachment) in zip(self.renderbuffers, attachments):
+            glBindRenderbuffer(GL_RENDERBUFFER, renderbuffer)
+            glRenderbufferStorage(GL_RENDERBUFFER, internal_format, width, height)
+            glFramebufferRenderbuffer(GL_FRAMEBUFFER, attachment, GL_RENDERBUFFER, renderbuffer)
+
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Framebuffer is incomplete, status {status:#x}")
+
+    def use(self) -> None:
+        """
+        Draw into the framebuffer, the viewport covers it entirely
+        """
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        glViewport(0, 0, self.width, self.height)
+
+    def read_pixels(self) -> np.ndarray:
+        """
+        Returns the color attachment as a height x width x 4 array of bytes, top row first
+        """
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.framebuffer)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        pixels = glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE)
+        image = np.frombuffer(pixels, dtype=np.uint8).reshape(self.height, self.width, 4)
+
+        # OpenGL rows start at the bottom
+        return image[::-1].copy()
+
+    def destroy(self) -> None:
+        """
+        Free the framebuffer and its attachments
+        """
+        glDeleteFramebuffers(1, (self.framebuffer,))
+        glDeleteRenderbuffers(2, self.renderbuffers)
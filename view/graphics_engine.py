@@ -1,31 +1,75 @@
+from itertools import groupby
+
 import pyrr
 
 from OpenGL.GL import *
 
 from model.rect_mesh import RectMesh
 from settings import *
+from model.light_buffer import LightBuffer
+from model.cluster_grid import ClusterGrid
+from model.frustum import Frustum
+from model.gl_state import GL_STATE
+from model.light_clusters import LightClusters
 from model.obj_mesh import ObjMesh
+from model.profiler import Profiler
+from model.render_queue import RenderQueue
 from model.material import Material
-from model.player import Player
-from model.entity import Entity
-from model.pointlight import PointLight
-from model.shader import Shader
+from model.mesh import Mesh
+from model.texture_array import TextureArray
+from model.texture_manager import TextureManager
+from model.scene import Scene
+from model.shader import Shader, ShaderCompiler
+from model.stream_buffer import StreamBuffer
 
 
 class GraphicsEngine:
     """
     Draw entities
     """
-    __slots__ = ('meshes', 'materials', 'shaders')
+    __slots__ = ('meshes', 'textures', 'texture_array', 'materials', 'shaders', 'compiler', 'ready', 'pipelines',
+                 'draw_states',
+                 'draw_meshes', 'draw_materials', 'queue', 'projection', 'light_buffer', 'light_clusters',
+                 'instances', 'drawn', 'culled', 'state_changes', 'uploaded', 'uploaded_scene', 'profiler')
 
-    def __init__(self):
+    def __init__(self, profiler: Profiler = None, aspect: float = WIDTH / HEIGHT):
+        """
+        Initialize the engine
+        :param profiler: Profiler timing the render passes, a disabled one is used if not given
+        :param aspect: Width over height of the images rendered
+        """
         self._set_up_opengl()
 
-        self._create_assets()
+        self.profiler = profiler if profiler is not None else Profiler()
+
+        # Number of instances drawn and culled during the last frame
+        self.drawn = 0
+        self.culled = 0
+
+        # Number of pipeline, material and mesh changes, of draw calls, of uniform uploads issued and skipped
+        # because the value did not change, and of GL state changes issued and elided, during the last frame
+        self.state_changes: dict[str, int] = dict.fromkeys(
+            ('pipeline', 'material', 'mesh', 'draw', 'uniform', 'uniform_skipped', 'gl_state', 'gl_state_elided'), 0
+        )
 
-        self._set_onetime_uniforms()
+        # Entity types, rows and versions of the rows of the instances last uploaded in each mesh,
+        # with the stamp of the stream buffer they were written with
+        self.uploaded: dict[int, tuple[np.ndarray, np.ndarray, np.ndarray, tuple[int, int]]] = {}
+
+        # Scene the uploaded instances were read from, rows and versions of another scene's stores can be equal
+        self.uploaded_scene: Scene | None = None
+
+        self.projection = pyrr.matrix44.create_perspective_projection(
+            fovy=FOVY, aspect=aspect,
+            near=NEAR, far=FAR, dtype=np.float32
+        )
+
+        # Pipelines whose program is linked and set up, the others are skipped until their program is ready
+        self.ready: set[int] = set()
+
+        self._create_assets()
 
-        self._get_uniform_locations()
+        self._prepare_pipelines()
 
     @staticmethod
     def _set_up_opengl() -> None:
@@ -33,14 +77,21 @@ class GraphicsEngine:
         Initialize OpenGL
         """
         glClearColor(BG_RED, BG_GREEN, BG_BLUE, 1.0)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_BLEND)
+        GL_STATE.set_capability(GL_DEPTH_TEST, True)
+        GL_STATE.set_capability(GL_BLEND, True)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
     def _create_assets(self) -> None:
         """
         Create all the assets to draw
         """
+        # Decode every image in the background while the other assets are created
+        self.textures = TextureManager(TEXTURE_BUDGET)
+        self.textures.preload(
+            ['textures/wood.jpg', 'textures/medkit.png', 'textures/light.png'],
+            TEXTURE_DECODE_WORKERS
+        )
+
         # Create resources and shaders
         self.meshes: dict[int, ObjMesh] = {
             ENTITY_TYPE['CUBE']: ObjMesh('objects/cube.obj'),
@@ -49,167 +100,399 @@ class GraphicsEngine:
 
         }
 
-        self.materials: dict[int, Material] = {
-            ENTITY_TYPE['CUBE']: Material('textures/wood.jpg'),
-            ENTITY_TYPE['MEDKIT']: Material('textures/medkit.png'),
-            ENTITY_TYPE['POINTLIGHT']: Material('textures/light.png'),
-        }
-
+        defines = (f'MAX_LIGHTS {MAX_LIGHTS}',)
+        if INSTANCED_RENDERING:
+            defines += ('INSTANCED',)
+        if TEXTURE_ARRAY:
+            defines += ('TEXTURE_ARRAY',)
+        if CLUSTERED_LIGHTING:
+            defines += ('CLUSTERED_LIGHTING',)
+        # Every program is submitted before any is linked, and none is waited for
+        self.compiler = ShaderCompiler()
         self.shaders: dict[int, Shader] = {
             PIPELINE_TYPE['STANDARD']: Shader(
                 'shaders/vertex.vert',
-                'shaders/fragment.frag'
+                'shaders/fragment.frag',
+                defines,
+                self.compiler
             ),
             PIPELINE_TYPE['EMISSIVE']: Shader(
                 'shaders/vertex_light.vert',
-                'shaders/fragment_light.frag'
+                'shaders/fragment_light.frag',
+                defines,
+                self.compiler
             )
         }
+        self.compiler.link()
 
-    def _set_onetime_uniforms(self) -> None:
+        # Created last so the background decoding overlaps mesh loading and shader compilation
+        self.texture_array = TextureArray(self.textures, TEXTURE_ARRAY_SIZE) if TEXTURE_ARRAY else None
+        self.materials: dict[int, Material] = {
+            ENTITY_TYPE['CUBE']: Material('textures/wood.jpg', self.textures, self.texture_array),
+            ENTITY_TYPE['MEDKIT']: Material('textures/medkit.png', self.textures, self.texture_array),
+            ENTITY_TYPE['POINTLIGHT']: Material('textures/light.png', self.textures, self.texture_array),
+        }
+
+        # Pipeline drawing each entity type
+        self.pipelines: dict[int, int] = {
+            ENTITY_TYPE['CUBE']: PIPELINE_TYPE['STANDARD'],
+            ENTITY_TYPE['MEDKIT']: PIPELINE_TYPE['STANDARD'],
+            ENTITY_TYPE['POINTLIGHT']: PIPELINE_TYPE['EMISSIVE'],
+        }
+        self.draw_states = self._create_draw_states()
+        self.queue = RenderQueue()
+        self.instances = StreamBuffer(STREAM_BUFFER_SIZE, FRAMES_IN_FLIGHT) if INSTANCED_RENDERING else None
+
+        self.light_buffer = None
+        self.light_clusters = None
+        if CLUSTERED_LIGHTING:
+            self.light_clusters = LightClusters(ClusterGrid(CLUSTER_GRID, NEAR, FAR, self.projection))
+        else:
+            self.light_buffer = LightBuffer(MAX_LIGHTS, UNIFORM_BLOCK_BINDING['LIGHTS'])
+
+    def _create_draw_states(self) -> dict[int, tuple[int, bool, int, int]]:
         """
-        Sets up the data once when needed
+        Returns the state each entity type is drawn with, as (pipeline, sprite, material, mesh) for the render queue.
+        Materials binding the same texture share an identifier, so do entity types sharing a mesh.
         """
-        # Define projection and other uniforms
-        projection_transform = pyrr.matrix44.create_perspective_projection(
-            fovy=45, aspect=WIDTH / HEIGHT,
-            near=0.1, far=10, dtype=np.float32
-        )
+        self.draw_meshes: list[Mesh] = []
+        self.draw_materials: list[Material] = []
+        mesh_ids: dict[int, int] = {}
+        material_ids: dict[int, int] = {}
 
-        for shader in self.shaders.values():
-            shader.use()
-            glUniform1i(glGetUniformLocation(shader.program, "imageTexture"), 0)
-            glUniformMatrix4fv(
-                glGetUniformLocation(shader.program, "projection"),
-                1, GL_FALSE, projection_transform
-            )
+        draw_states = {}
+        for entity_type, pipeline in self.pipelines.items():
+            mesh = self.meshes[entity_type]
+            if id(mesh) not in mesh_ids:
+                mesh_ids[id(mesh)] = len(self.draw_meshes)
+                self.draw_meshes.append(mesh)
 
-    def _get_uniform_locations(self) -> None:
-        """
-        Store the location of shader uniforms
-        """
-        shader = self.shaders[PIPELINE_TYPE['STANDARD']]
-        shader.use()
+            material = self.materials[entity_type]
+            texture = material.array if material.array is not None else material.texture
+            if id(texture) not in material_ids:
+                material_ids[id(texture)] = len(self.draw_materials)
+                self.draw_materials.append(material)
 
-        shader.cache_single_location(UNIFORM_TYPE['CAMERA_POS'], 'cameraPosition')
-        shader.cache_single_location(UNIFORM_TYPE['MODEL'], 'model')
-        shader.cache_single_location(UNIFORM_TYPE['VIEW'], 'view')
+            sprite = entity_type in BILLBOARD_TYPES
+            draw_states[entity_type] = (pipeline, sprite, material_ids[id(texture)], mesh_ids[id(mesh)])
 
-        for i in range(8):
-            shader.cache_multi_location(
-                UNIFORM_TYPE['LIGHT_COLOR'], f'Lights[{i}].color'
-            )
-            shader.cache_multi_location(
-                UNIFORM_TYPE['LIGHT_POS'], f'Lights[{i}].position'
-            )
-            shader.cache_multi_location(
-                UNIFORM_TYPE['LIGHT_STRENGTH'], f'Lights[{i}].strength'
-            )
+        return draw_states
 
-        shader = self.shaders[PIPELINE_TYPE['EMISSIVE']]
-        shader.use()
+    def _prepare_pipelines(self) -> None:
+        """
+        Set up the pipelines whose program became ready
+        """
+        for pipeline, shader in self.shaders.items():
+            if pipeline not in self.ready and self.compiler.is_ready(shader):
+                self._set_onetime_uniforms(pipeline)
+                self.ready.add(pipeline)
 
-        shader.cache_single_location(UNIFORM_TYPE['MODEL'], 'model')
-        shader.cache_single_location(UNIFORM_TYPE['VIEW'], 'view')
-        shader.cache_single_location(UNIFORM_TYPE['TINT'], 'tint')
+    def wait_for_shaders(self) -> None:
+        """
+        Wait until every program is ready, for callers that need every pipeline from the first frame
+        """
+        self.compiler.finish_all()
+        self._prepare_pipelines()
 
-    def render(self, player: Player, entities: dict[int, list[Entity]], lights: list[PointLight]) -> None:
+    def _set_onetime_uniforms(self, pipeline: int) -> None:
+        """
+        Sets up the data once when needed
+        :param pipeline: Pipeline whose program is set up
+        """
+        # Define projection and other uniforms
+        shader = self.shaders[pipeline]
+        shader.use()
+        shader.set_int('imageTexture', 0)
+        shader.set_mat4('projection', self.projection)
+
+        if pipeline == PIPELINE_TYPE['STANDARD']:
+            if self.light_clusters is not None:
+                for name, unit in LightClusters.TEXTURE_UNITS.items():
+                    shader.set_int(name, unit)
+                shader.set_ivec3('clusterGrid', CLUSTER_GRID)
+                shader.set_vec2('clusterDepth', self.light_clusters.grid.depth_parameters())
+            else:
+                shader.bind_uniform_block('LightBlock', UNIFORM_BLOCK_BINDING['LIGHTS'])
+
+        # Light sprites are always billboards
+        if pipeline == PIPELINE_TYPE['EMISSIVE']:
+            shader.set_int('billboard', GPU_BILLBOARDS)
+
+    def render(self, scene: Scene) -> None:
         """
-        Draw everything on the screen
-        :param player: The camera
-        :param entities: Every entity to draw
-        :param lights: Every light in the scene
+        Draw everything in the current framebuffer, presenting it is left to the caller
+        :param scene: The scene holding the camera, the entities and the lights
         """
+        player = scene.player
+
         # Clear screen
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
-        # Draw
-        view = player.get_view_transform()
-        shader = self.shaders[PIPELINE_TYPE['STANDARD']]
-        shader.use()
+        if len(self.ready) < len(self.shaders):
+            self._prepare_pipelines()
 
-        glUniformMatrix4fv(
-            shader.fetch_single_location(UNIFORM_TYPE['VIEW']),
-            1,
-            GL_FALSE,
-            view
-        )
+        if self.instances is not None:
+            self.instances.begin_frame()
 
-        glUniform3fv(
-            shader.fetch_single_location(UNIFORM_TYPE['CAMERA_POS']),
-            1,
-            player.position
-        )
+        if scene is not self.uploaded_scene:
+            self.uploaded.clear()
+            self.uploaded_scene = scene
+
+        view = player.get_view_transform()
+        with self.profiler.scope('culling'):
+            visible = self._cull(scene, view)
 
         # Standard Lighting
-        for i, light in enumerate(lights):
-            glUniform3fv(
-                shader.fetch_multi_location(UNIFORM_TYPE['LIGHT_POS'], i),
-                1,
-                light.position
-            )
-            glUniform3fv(
-                shader.fetch_multi_location(UNIFORM_TYPE['LIGHT_COLOR'], i),
-                1,
-                light.color
-            )
-            glUniform1f(shader.fetch_multi_location(
-                UNIFORM_TYPE['LIGHT_STRENGTH'], i),
-                light.strength
-            )
+        with self.profiler.scope('lighting upload', gpu=True):
+            lights = scene.transforms[ENTITY_TYPE['POINTLIGHT']]
+            if self.light_clusters is not None:
+                self.light_clusters.update(lights, view)
+                self.light_clusters.use()
+            else:
+                self.light_buffer.update(lights)
 
-        # Entities
-        for entity_type, ent in entities.items():
-            if entity_type not in self.materials:
-                continue
+        with self.profiler.scope('render queue'):
+            self._fill_queue(scene, view, visible)
 
-            material = self.materials[entity_type]
-            material.use()
+        self._draw_queue(scene, view, player.position)
+
+        # Uploads of the pipelines set up at the start of the frame are counted too
+        for shader in self.shaders.values():
+            issued, skipped = shader.reset_counts()
+            self.state_changes['uniform'] += issued
+            self.state_changes['uniform_skipped'] += skipped
+        self.state_changes['gl_state'], self.state_changes['gl_state_elided'] = GL_STATE.reset_counts()
+
+        if self.instances is not None:
+            self.instances.end_frame()
+
+    def get_bounding_radii(self) -> dict[int, float]:
+        """
+        Returns the radius of a sphere around the origin holding the mesh of each entity type, in any orientation
+        """
+        return {
+            entity_type: float(np.linalg.norm(mesh.center)) + mesh.radius
+            for entity_type, mesh in self.meshes.items()
+        }
+
+    def _cull(self, scene: Scene, view: np.ndarray) -> dict[int, np.ndarray]:
+        """
+        Returns the rows of the transform store of each entity type whose bounding sphere is in the view frustum.
+        The spatial index of the scene gives the candidates, then their bounding spheres are all tested at once.
+        :param scene: The scene holding the entities and their transforms
+        :param view: View transform
+        """
+        entity_types = [entity_type for entity_type in scene.transforms if entity_type in self.meshes]
+        total = sum(scene.transforms[entity_type].count for entity_type in entity_types)
+
+        if not FRUSTUM_CULLING or total == 0:
+            self.drawn, self.culled = total, 0
+            return {entity_type: np.arange(scene.transforms[entity_type].count) for entity_type in entity_types}
+
+        frustum = Frustum(view @ self.projection)
+        candidates = scene.query_frustum(frustum)
+        counts = [len(candidates[entity_type]) for entity_type in entity_types]
+
+        centers = np.empty((sum(counts), 3), dtype=np.float32)
+        radii = np.empty(sum(counts), dtype=np.float32)
+        start = 0
+        for entity_type, count in zip(entity_types, counts):
+            models = scene.transforms[entity_type].models[candidates[entity_type]]
             mesh = self.meshes[entity_type]
-            mesh.arm_for_drawing()
+            end = start + count
+            if GPU_BILLBOARDS and entity_type in BILLBOARD_TYPES:
+                # The quad turns around its origin in the vertex shader, whatever its model rotation
+                centers[start:end] = models[:, 3, :3]
+                radii[start:end] = np.linalg.norm(mesh.center) + mesh.radius
+            else:
+                centers[start:end] = mesh.center @ models[:, :3, :3] + models[:, 3, :3]
+                radii[start:end] = mesh.radius
+            start = end
+
+        mask = frustum.intersects_spheres(centers, radii)
+        self.drawn = int(np.count_nonzero(mask))
+        self.culled = total - self.drawn
+
+        offsets = np.cumsum(counts) - counts
+        return {
+            entity_type: candidates[entity_type][mask[offset:offset + count]]
+            for entity_type, offset, count in zip(entity_types, offsets, counts)
+        }
 
-            for entity in ent:
-                glUniformMatrix4fv(
-                    shader.fetch_single_location(UNIFORM_TYPE['MODEL']),
-                    1,
-                    GL_FALSE,
-                    entity.get_model_transform()
-                )
+    def _fill_queue(self, scene: Scene, view: np.ndarray, visible: dict[int, np.ndarray]) -> None:
+        """
+        Submit the visible entities to the render queue and sort it
+        :param scene: The scene holding the entities and their transforms
+        :param view: View transform
+        :param visible: Rows of the visible entities of each type
+        """
+        self.queue.clear()
+        for entity_type, rows in visible.items():
+            if entity_type not in self.draw_states or len(rows) == 0:
+                continue
 
-                mesh.draw()
+            # Distance in front of the camera, the view looks down its -z axis
+            positions = scene.transforms[entity_type].models[rows, 3, :3]
+            depths = -(positions @ view[:3, 2] + view[3, 2])
 
-        # Emissive lighting
-        shader = self.shaders[PIPELINE_TYPE['EMISSIVE']]
+            keys = RenderQueue.pack_keys(*self.draw_states[entity_type], (depths - NEAR) / (FAR - NEAR))
+            self.queue.submit(keys, entity_type, rows)
+
+        self.queue.sort()
+
+    def _draw_queue(self, scene: Scene, view: np.ndarray, camera_position: np.ndarray) -> None:
+        """
+        Draw the sorted render queue, the pipeline, material and mesh are only changed when the state of the items does
+        :param scene: The scene holding the entities and their transforms
+        :param view: View transform
+        :param camera_position: Position of the camera
+        """
+        self.state_changes = dict.fromkeys(self.state_changes, 0)
+        material = mesh = None
+
+        runs = [(RenderQueue.unpack_state(state), start, end) for state, start, end in self.queue.runs()]
+        for pipeline, pipeline_runs in groupby(runs, key=lambda run: run[0][0]):
+            if pipeline not in self.ready:
+                continue
+
+            with self.profiler.scope(PIPELINE_PASS[pipeline], gpu=True):
+                shader = self._use_pipeline(pipeline, view, camera_position)
+
+                for (_, sprite, material_id, mesh_id), start, end in pipeline_runs:
+                    if material_id != material:
+                        material = material_id
+                        self.draw_materials[material].use()
+                        self.state_changes['material'] += 1
+
+                    if mesh_id != mesh:
+                        mesh = mesh_id
+                        self.draw_meshes[mesh].arm_for_drawing()
+                        self.state_changes['mesh'] += 1
+
+                    if pipeline == PIPELINE_TYPE['STANDARD']:
+                        shader.set_int('billboard', GPU_BILLBOARDS and sprite)
+
+                    if INSTANCED_RENDERING:
+                        self._draw_run_instanced(scene, pipeline, self.draw_meshes[mesh], start, end)
+                    else:
+                        self._draw_run(scene, shader, pipeline, self.draw_meshes[mesh], start, end)
+
+    def _use_pipeline(self, pipeline: int, view: np.ndarray, camera_position: np.ndarray) -> Shader:
+        """
+        Use the shader of a pipeline with the camera of the frame, and returns it
+        :param pipeline: Pipeline to draw with
+        :param view: View transform
+        :param camera_position: Position of the camera
+        """
+        shader = self.shaders[pipeline]
         shader.use()
+        self.state_changes['pipeline'] += 1
 
-        glUniformMatrix4fv(
-            shader.fetch_single_location(UNIFORM_TYPE['VIEW']),
-            1, GL_FALSE,
-            view
-        )
+        shader.set_mat4('view', view)
+        shader.set_vec3('cameraPosition', camera_position)
 
-        material = self.materials[ENTITY_TYPE['POINTLIGHT']]
-        material.use()
-        mesh = self.meshes[ENTITY_TYPE['POINTLIGHT']]
-        mesh.arm_for_drawing()
+        return shader
 
-        for light in lights:
-            glUniform3fv(
-                shader.fetch_single_location(UNIFORM_TYPE['TINT']),
-                1,
-                light.color
-            )
-            glUniformMatrix4fv(
-                shader.fetch_single_location(UNIFORM_TYPE['MODEL']),
-                1,
-                GL_FALSE,
-                light.get_model_transform()
-            )
+    def _draw_run(self, scene: Scene, shader: Shader, pipeline: int, mesh: Mesh, start: int, end: int) -> None:
+        """
+        Draw a run of queued items one draw call at a time
+        :param scene: The scene holding the entities and their transforms
+        :param shader: Shader in use
+        :param pipeline: Pipeline drawing the items
+        :param mesh: Mesh of the items, armed for drawing
+        :param start: Index of the first item of the run in the queue
+        :param end: Index past the last item of the run
+        """
+        types = self.queue.types[start:end]
+        rows = self.queue.rows[start:end]
+        models = np.ascontiguousarray(self._gather(scene, types, rows, 'models'), dtype=np.float32)
+        colors = None
+        if pipeline == PIPELINE_TYPE['EMISSIVE']:
+            colors = np.ascontiguousarray(self._gather(scene, types, rows, 'colors'), dtype=np.float32)
+
+        # The values are uploaded from the address of their row, the arrays stay alive until the end of the run
+        model_address = models.ctypes.data
+        color_address = None if colors is None else colors.ctypes.data
+        for i in range(end - start):
+            if color_address is not None:
+                shader.upload_vec3('tint', color_address + 12 * i)
+            shader.upload_mat4('model', model_address + 64 * i)
 
             mesh.draw()
+        self.state_changes['draw'] += end - start
 
-        # Display
-        glFlush()
+    def _draw_run_instanced(self, scene: Scene, pipeline: int, mesh: Mesh, start: int, end: int) -> None:
+        """
+        Draw a run of queued items with a single instanced draw call
+        :param scene: The scene holding the entities and their transforms
+        :param pipeline: Pipeline drawing the items
+        :param mesh: Mesh of the items, armed for drawing
+        :param start: Index of the first item of the run in the queue
+        :param end: Index past the last item of the run
+        """
+        types = self.queue.types[start:end]
+        rows = self.queue.rows[start:end]
+
+        if not self._is_uploaded(scene, mesh, types, rows):
+            colors = None
+            if pipeline == PIPELINE_TYPE['EMISSIVE']:
+                colors = self._gather(scene, types, rows, 'colors')
+
+            layers = None
+            if self.texture_array is not None:
+                layers = np.empty(end - start, dtype=np.float32)
+                for entity_type in np.unique(types):
+                    layers[types == entity_type] = self.materials[entity_type].layer
+
+            offsets = self.instances.write(self._gather(scene, types, rows, 'models'), colors, layers)
+            mesh.bind_instances(self.instances.buffer, *offsets)
+
+        mesh.draw_instanced(end - start)
+        self.state_changes['draw'] += 1
+
+    @staticmethod
+    def _gather(scene: Scene, types: np.ndarray, rows: np.ndarray, column: str) -> np.ndarray:
+        """
+        Returns a column of the transform stores for queued items, in queue order
+        :param scene: The scene holding the transform stores
+        :param types: Entity type of each item
+        :param rows: Row of each item in the store of its type
+        :param column: Name of the store array to read
+        """
+        entity_types = np.unique(types)
+        if len(entity_types) == 1:
+            return getattr(scene.transforms[int(entity_types[0])], column)[rows]
+
+        first = getattr(scene.transforms[int(entity_types[0])], column)
+        values = np.empty((len(rows),) + first.shape[1:], dtype=first.dtype)
+        for entity_type in entity_types:
+            selected = types == entity_type
+            values[selected] = getattr(scene.transforms[int(entity_type)], column)[rows[selected]]
+        return values
+
+    def _is_uploaded(self, scene: Scene, mesh: Mesh, types: np.ndarray, rows: np.ndarray) -> bool:
+        """
+        Returns whether the instances of a mesh are already uploaded, that is when the same items were uploaded
+        by the last draw of the mesh, none of them changed since and the stream buffer still holds them,
+        otherwise the items are remembered as uploaded. Uploaded instances are declared to the stream buffer
+        as drawn again, so they are not overwritten while the frame reads them
+        :param scene: The scene holding the transforms
+        :param mesh: Mesh drawn
+        :param types: Entity type of each item
+        :param rows: Row of each item in the store of its type
+        """
+        versions = self._gather(scene, types, rows, 'versions')
+        uploaded = self.uploaded.get(id(mesh))
+        if (uploaded is not None
+                and np.array_equal(uploaded[0], types)
+                and np.array_equal(uploaded[1], rows)
+                and np.array_equal(uploaded[2], versions)
+                and self.instances.is_live(uploaded[3])):
+            self.instances.use(uploaded[3])
+            return True
+
+        self.uploaded[id(mesh)] = (types.copy(), rows.copy(), versions, self.instances.stamp())
+        return False
 
     def quit(self) -> None:
         """
@@ -219,5 +502,16 @@ class GraphicsEngine:
             mesh.destroy()
         for material in self.materials.values():
             material.destroy()
+        if self.texture_array is not None:
+            self.texture_array.destroy()
+        if self.instances is not None:
+            self.instances.destroy()
+        self.textures.destroy()
+        if self.light_clusters is not None:
+            self.light_clusters.destroy()
+        else:
+            self.light_buffer.destroy()
         for shader in self.shaders.values():
             shader.destroy()
+        self.compiler.destroy()
+        self.profiler.destroy()